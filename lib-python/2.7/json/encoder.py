@@ -206,6 +206,15 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        if (_pypyjson_encode is not None and self.ensure_ascii and
+                self.indent is None and not self.sort_keys and
+                self.encoding == 'utf-8' and
+                type(self.item_separator) is str and
+                type(self.key_separator) is str):
+            # common case, done at interp-level
+            return _pypyjson_encode(o, self, self.check_circular,
+                                    self.allow_nan, self.skipkeys,
+                                    self.item_separator, self.key_separator)
         if self.check_circular:
             markers = {}
         else:
@@ -536,3 +545,7 @@ try:
     from _pypyjson import raw_encode_basestring_ascii
 except ImportError:
     pass
+try:
+    from _pypyjson import encode as _pypyjson_encode
+except ImportError:
+    _pypyjson_encode = None
@@ -195,7 +195,16 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
         BoolOption("withsmalllong", "use a version of 'long' in a C long long",
                    default=False),
 
-        BoolOption("withstrbuf", "use strings optimized for addition (ver 2)",
+        BoolOption("withstrbuf",
+                   "use strings and unicodes optimized for addition (ver 2)",
+                   default=False),
+
+        BoolOption("withstrslice",
+                   "use strings and unicodes optimized for slicing",
+                   default=False),
+
+        BoolOption("withcompactunicode",
+                   "store ASCII-only unicodes with one byte per character",
                    default=False),
 
         BoolOption("withprebuiltchar",
@@ -211,6 +220,13 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "use specialised tuples",
                    default=False),
 
+        BoolOption("withspecialisedtuplelist",
+                   "store lists of specialised tuples of ints or floats "
+                   "unboxed",
+                   default=False,
+                   requires=[("objspace.std.withspecialisedtuple", True),
+                             ("objspace.std.withliststrategies", True)]),
+
         BoolOption("withcelldict",
                    "use dictionaries that are optimized for being used as module dicts",
                    default=False,
@@ -223,6 +239,12 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                              ("objspace.std.withtypeversion", True),
                        ]),
 
+        BoolOption("withunboxedattributes",
+                   "store int and float instance attributes that are "
+                   "written to repeatedly in mutable cells",
+                   default=False,
+                   requires=[("objspace.std.withmapdict", True)]),
+
         BoolOption("withrangelist",
                    "enable special range list implementation that does not "
                    "actually create the full list until the resulting "
@@ -231,6 +253,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
         BoolOption("withliststrategies",
                    "enable optimized ways to store lists of primitives ",
                    default=True),
+        BoolOption("withcopyonwrite",
+                   "let copies of lists and dicts share their storage "
+                   "until one of them is mutated",
+                   default=False),
 
         BoolOption("withtypeversion",
                    "version type objects when changing them",
@@ -299,6 +325,7 @@ def set_pypy_opt_level(config, level):
         #config.objspace.std.suggest(newshortcut=True)
         config.objspace.std.suggest(withspecialisedtuple=True)
         config.objspace.std.suggest(withidentitydict=True)
+        config.objspace.std.suggest(withcopyonwrite=True)
         #if not IS_64_BITS:
         #    config.objspace.std.suggest(withsmalllong=True)
 
@@ -314,6 +341,7 @@ def set_pypy_opt_level(config, level):
         config.objspace.std.suggest(withrangelist=True)
         config.objspace.std.suggest(withprebuiltchar=True)
         config.objspace.std.suggest(withmapdict=True)
+        config.objspace.std.suggest(withcopyonwrite=True)
         if not IS_64_BITS:
             config.objspace.std.suggest(withsmalllong=True)
 
@@ -106,6 +106,8 @@ class Module(MixedModule):
             if self.space.config.objspace.std.withmapdict:
                 self.extra_interpdef('mapdict_cache_counter',
                                      'interp_magic.mapdict_cache_counter')
+                self.extra_interpdef('mapdict_global_cache_counter',
+                                'interp_magic.mapdict_global_cache_counter')
         PYC_MAGIC = get_pyc_magic(self.space)
         self.extra_interpdef('PYC_MAGIC', 'space.wrap(%d)' % PYC_MAGIC)
         #
@@ -39,8 +39,7 @@ def reset_method_cache_counter(space):
     cache.hits = {}
     if space.config.objspace.std.withmapdict:
         cache = space.fromcache(MapAttrCache)
-        cache.misses = {}
-        cache.hits = {}
+        cache.reset_counters()
 
 @unwrap_spec(name=str)
 def mapdict_cache_counter(space, name):
@@ -52,6 +51,18 @@ def mapdict_cache_counter(space, name):
     return space.newtuple([space.newint(cache.hits.get(name, 0)),
                            space.newint(cache.misses.get(name, 0))])
 
+def mapdict_global_cache_counter(space):
+    """Return a tuple (index_cache_hits, index_cache_misses,
+    megamorphic_sites) summed over all attribute names.  The last item is
+    the number of bytecode positions that stopped using their own inline
+    cache because they saw too many different maps."""
+    assert space.config.objspace.std.withmethodcachecounter
+    assert space.config.objspace.std.withmapdict
+    cache = space.fromcache(MapAttrCache)
+    return space.newtuple([space.newint(cache.total_hits),
+                           space.newint(cache.total_misses),
+                           space.newint(cache.megamorphic_sites)])
+
 def builtinify(space, w_func):
     from pypy.interpreter.function import Function, BuiltinFunction
     func = space.interp_w(Function, w_func)
@@ -7,6 +7,8 @@ class Module(MixedModule):
 
     interpleveldefs = {
         'loads' : 'interp_decoder.loads',
+        'IncrementalDecoder' : 'interp_decoder.W_IncrementalDecoder',
         'raw_encode_basestring_ascii':
             'interp_encoder.raw_encode_basestring_ascii',
+        'encode': 'interp_encoder.encode',
         }
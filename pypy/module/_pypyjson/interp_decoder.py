@@ -3,7 +3,10 @@ from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.objectmodel import specialize
 from rpython.rlib import rfloat, runicode
 from rpython.rtyper.lltypesystem import lltype, rffi
+from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
 from pypy.interpreter import unicodehelper
 
 OVF_DIGITS = len(str(sys.maxint))
@@ -42,8 +45,36 @@ def strslice2unicode_latin1(s, start, end):
         ll_res.chars[i] = cast_primitive(UniChar, ch)
     return hlunicode(ll_res)
 
-TYPE_UNKNOWN = 0
-TYPE_STRING = 1
+# Objects in a JSON document very often have the same keys in the same
+# order, e.g. in an array of records.  While decoding, we build a tree of
+# "shapes", similar to the maps of mapdict: each Shape stands for a
+# sequence of keys, and knows the key that came next the last time we
+# went through it.  When the same key follows again, it is recognized by
+# comparing the raw bytes in place, without decoding, allocating or
+# hashing anything, and the same W_UnicodeObject is used for it.
+
+MAX_SHAPE_TRANSITIONS = 32
+
+class Shape(object):
+    def __init__(self, key, w_key):
+        self.key = key                  # the raw utf-8 key
+        self.w_key = w_key
+        self.transitions = None         # raw key -> Shape, or None
+        self.single_next = None         # last Shape reached from here
+        self.predicted_length = 0       # see JSONDecoder.decode_object
+
+    def get_next(self, decoder, key):
+        if self.transitions is None:
+            self.transitions = {}
+        shape = self.transitions.get(key, None)
+        if shape is None:
+            if len(self.transitions) >= MAX_SHAPE_TRANSITIONS:
+                return None     # too many different keys, stop tracking
+            shape = Shape(key, decoder.intern_key(key))
+            self.transitions[key] = shape
+        self.single_next = shape
+        return shape
+
 class JSONDecoder(object):
     def __init__(self, space, s):
         self.space = space
@@ -55,7 +86,9 @@ class JSONDecoder(object):
         self.ll_chars = rffi.str2charp(s)
         self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
         self.pos = 0
-        self.last_type = TYPE_UNKNOWN
+        self.root_shape = Shape(None, None)
+        self.shape = None
+        self.key_cache = {}
 
     def close(self):
         rffi.free_charp(self.ll_chars)
@@ -255,12 +288,16 @@ class JSONDecoder(object):
             self.pos = i+1
             return w_dict
         #
+        shape = self.root_shape
+        first_shape = None
+        count = 0
         while True:
             # parse a key: value
-            self.last_type = TYPE_UNKNOWN
-            w_name = self.decode_any(i)
-            if self.last_type != TYPE_STRING:
+            if self.ll_chars[i] != '"':
                 self._raise("Key name must be string for object starting at char %d", start)
+            self.shape = shape
+            w_name = self.decode_key(i+1)
+            shape = self.shape
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             if ch != ':':
@@ -270,20 +307,77 @@ class JSONDecoder(object):
             #
             w_value = self.decode_any(i)
             self.space.setitem(w_dict, w_name, w_value)
+            count += 1
+            if count == 1 and shape is not None:
+                # objects starting with the same key probably have the
+                # same length too: make room for all the items at once
+                first_shape = shape
+                if shape.predicted_length > 1:
+                    self._prepare_dict(w_dict, shape.predicted_length - 1)
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             i += 1
             if ch == '}':
                 self.pos = i
+                if first_shape is not None:
+                    first_shape.predicted_length = count
                 return w_dict
             elif ch == ',':
-                pass
+                i = self.skip_whitespace(i)
             elif ch == '\0':
                 self._raise("Unterminated object starting at char %d", start)
             else:
                 self._raise("Unexpected '%s' when decoding object (char %d)",
                             ch, self.pos)
 
+    def _prepare_dict(self, w_dict, num_extra):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        if isinstance(w_dict, W_DictMultiObject):
+            w_dict.strategy.prepare_update(w_dict, num_extra)
+
+    def intern_key(self, key):
+        w_key = self.key_cache.get(key, None)
+        if w_key is None:
+            content_unicode = unicodehelper.decode_utf8(self.space, key)
+            w_key = self.space.wrap(content_unicode)
+            self.key_cache[key] = w_key
+        return w_key
+
+    def _key_matches(self, i, key):
+        for j in range(len(key)):
+            if self.ll_chars[i+j] != key[j]:
+                return False
+        return self.ll_chars[i+len(key)] == '"'
+
+    def decode_key(self, i):
+        """Decode the key starting just after the quote at 'i-1', following
+        'self.shape' and updating it to the Shape of the key (or None if
+        the keys of this object are not tracked)."""
+        shape = self.shape
+        if shape is not None:
+            nextshape = shape.single_next
+            if nextshape is not None and self._key_matches(i, nextshape.key):
+                self.pos = i + len(nextshape.key) + 1
+                self.shape = nextshape
+                return nextshape.w_key
+        start = i
+        while True:
+            ch = self.ll_chars[i]
+            i += 1
+            if ch == '"':
+                break
+            elif ch == '\\' or ch < '\x20':
+                # escape sequences, errors: take the general path
+                self.shape = None
+                return self.decode_string(start)
+        key = self.getslice(start, i-1)
+        self.pos = i
+        if shape is not None:
+            shape = shape.get_next(self, key)
+            self.shape = shape
+            if shape is not None:
+                return shape.w_key
+        return self.intern_key(key)
 
     def decode_string(self, i):
         start = i
@@ -304,7 +398,6 @@ class JSONDecoder(object):
                     # latin1, and we already checked that all the chars are <
                     # 128)
                     content_unicode = strslice2unicode_latin1(self.s, start, i-1)
-                self.last_type = TYPE_STRING
                 self.pos = i
                 return self.space.wrap(content_unicode)
             elif ch == '\\':
@@ -325,7 +418,6 @@ class JSONDecoder(object):
             if ch == '"':
                 content_utf8 = builder.build()
                 content_unicode = unicodehelper.decode_utf8(self.space, content_utf8)
-                self.last_type = TYPE_STRING
                 self.pos = i
                 return self.space.wrap(content_unicode)
             elif ch == '\\':
@@ -387,6 +479,9 @@ def loads(space, w_s):
         raise OperationError(space.w_TypeError,
                              space.wrap("Expected utf8-encoded str, got unicode"))
     s = space.str_w(w_s)
+    return _decode_document(space, s)
+
+def _decode_document(space, s):
     decoder = JSONDecoder(space, s)
     try:
         w_res = decoder.decode_any(0)
@@ -399,3 +494,181 @@ def loads(space, w_s):
         return w_res
     finally:
         decoder.close()
+
+
+# ____________________________________________________________
+# Incremental decoding
+#
+# The decoder above needs the whole document in memory.  The
+# W_IncrementalDecoder below only does a cheap scan of the chunks it is
+# fed, to find where each top-level value (or, in 'items' mode, each
+# element of the top-level array) ends; only the text of the value that
+# is still incomplete is kept around, and each complete value is then
+# decoded with the normal JSONDecoder.
+
+def is_scalar_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ':' or ch == '"' or
+            ch == '[' or ch == ']' or ch == '{' or ch == '}')
+
+ITEMS_START = 0    # expecting the opening '['
+ITEMS_FIRST = 1    # just after '[': expecting a value or ']'
+ITEMS_VALUE = 2    # just after ',': expecting a value
+ITEMS_COMMA = 3    # just after a value: expecting ',' or ']'
+ITEMS_DONE = 4     # after the closing ']': only whitespace is allowed
+
+class W_IncrementalDecoder(W_Root):
+    def __init__(self, space, items):
+        self.space = space
+        self.items = items
+        self.items_state = ITEMS_START
+        self.builder = StringBuilder()
+        self.in_value = False     # inside a value that is not complete yet
+        self.in_string = False
+        self.escape = False
+        self.scalar = False       # the current value is a number or constant
+        self.depth = 0
+        self.closed = False
+
+    @specialize.arg(1)
+    def _raise(self, msg, *args):
+        raise oefmt(self.space.w_ValueError, msg, *args)
+
+    def _start_value(self, ch):
+        self.in_value = True
+        if ch == '"':
+            self.in_string = True
+        elif ch == '[' or ch == '{':
+            self.depth = 1
+        else:
+            self.scalar = True
+
+    def _emit(self, data, start, end, result):
+        self.builder.append_slice(data, start, end)
+        s = self.builder.build()
+        self.builder = StringBuilder()
+        self.in_value = False
+        self.scalar = False
+        if self.items:
+            self.items_state = ITEMS_COMMA
+        result.append(_decode_document(self.space, s))
+
+    def _between_values(self, ch):
+        """Handle a non-whitespace character seen outside any value.
+        Returns True if 'ch' starts a new value."""
+        if not self.items:
+            if ch == ',' or ch == ':' or ch == ']' or ch == '}':
+                self._raise("Unexpected '%s' between JSON values", ch)
+            return True
+        state = self.items_state
+        if state == ITEMS_START:
+            if ch != '[':
+                self._raise("Expected '[' at the start of the array, got '%s'",
+                            ch)
+            self.items_state = ITEMS_FIRST
+            return False
+        elif state == ITEMS_FIRST:
+            if ch == ']':
+                self.items_state = ITEMS_DONE
+                return False
+        elif state == ITEMS_COMMA:
+            if ch == ',':
+                self.items_state = ITEMS_VALUE
+            elif ch == ']':
+                self.items_state = ITEMS_DONE
+            else:
+                self._raise("Unexpected '%s' when decoding array", ch)
+            return False
+        elif state == ITEMS_DONE:
+            self._raise("Extra data after the end of the array: '%s'", ch)
+        if ch == ',' or ch == ':' or ch == ']' or ch == '}':
+            self._raise("Unexpected '%s' when decoding array", ch)
+        return True
+
+    def _scan(self, data, result):
+        if self.in_value:
+            start = 0
+        else:
+            start = -1
+        i = 0
+        while i < len(data):
+            ch = data[i]
+            if not self.in_value:
+                if not is_whitespace(ch) and self._between_values(ch):
+                    start = i
+                    self._start_value(ch)
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._emit(data, start, i + 1, result)
+            elif self.scalar:
+                if is_scalar_end(ch):
+                    self._emit(data, start, i, result)
+                    continue      # 'ch' is not part of the value
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '[' or ch == '{':
+                self.depth += 1
+            elif ch == ']' or ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self._emit(data, start, i + 1, result)
+            i += 1
+        if self.in_value:
+            self.builder.append_slice(data, start, len(data))
+
+    def _check_open(self):
+        if self.closed:
+            self._raise("I/O operation on a closed decoder")
+
+    @unwrap_spec(data='bufferstr')
+    def descr_feed(self, data):
+        """feed(data) -> list
+
+        Decode a chunk of utf8-encoded JSON text and return the list of
+        the values that are now complete."""
+        self._check_open()
+        result = []
+        self._scan(data, result)
+        return self.space.newlist(result)
+
+    def descr_close(self):
+        """close() -> list
+
+        Signal the end of the input and return the list of the values
+        that were still pending.  Raise ValueError if the input stops in
+        the middle of a value."""
+        self._check_open()
+        self.closed = True
+        result = []
+        if self.in_value:
+            if not self.scalar:
+                self._raise("Unterminated JSON value at the end of the input")
+            self._emit('', 0, 0, result)
+        if self.items and self.items_state != ITEMS_DONE:
+            self._raise("Unterminated array at the end of the input")
+        return self.space.newlist(result)
+
+
+@unwrap_spec(items=bool)
+def W_IncrementalDecoder___new__(space, w_subtype, items=False):
+    w_self = space.allocate_instance(W_IncrementalDecoder, w_subtype)
+    self = space.interp_w(W_IncrementalDecoder, w_self)
+    W_IncrementalDecoder.__init__(self, space, items)
+    return w_self
+
+W_IncrementalDecoder.typedef = TypeDef(
+    '_pypyjson.IncrementalDecoder',
+    __new__ = interp2app(W_IncrementalDecoder___new__),
+    feed = interp2app(W_IncrementalDecoder.descr_feed),
+    close = interp2app(W_IncrementalDecoder.descr_close),
+    __doc__ = """IncrementalDecoder(items=False)
+
+Decode a stream of utf8-encoded JSON text that arrives in chunks.  By
+default the stream is a sequence of top-level values separated by
+whitespace, like JSON-lines.  With items=True the stream is a single
+top-level array, and its elements are returned one by one.""")
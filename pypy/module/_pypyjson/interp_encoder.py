@@ -1,6 +1,9 @@
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.runicode import str_decode_utf_8
+from rpython.rlib.rfloat import formatd, isnan, isinf, DTSF_ADD_DOT_0
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
 
 
 HEX = '0123456789abcdef'
@@ -19,23 +22,12 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
 def raw_encode_basestring_ascii(space, w_string):
     if space.isinstance_w(w_string, space.w_str):
         s = space.str_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
-        else:
+        first = _first_special_char(s)
+        if first < 0:
             # the input is a string with only non-special ascii chars
             return w_string
-
-        eh = unicodehelper.decode_error_handler(space)
-        u = str_decode_utf_8(
-                s, len(s), None, final=True, errorhandler=eh,
-                allow_surrogates=True)[0]
-        sb = StringBuilder(len(u))
-        sb.append_slice(s, 0, first)
+        sb = StringBuilder(len(s))
+        _escape_str_ascii(space, s, first, sb)
     else:
         # We used to check if 'u' contains only safe characters, and return
         # 'w_string' directly.  But this requires an extra pass over all
@@ -46,8 +38,28 @@ def raw_encode_basestring_ascii(space, w_string):
         # string here --- only one pass.
         u = space.unicode_w(w_string)
         sb = StringBuilder(len(u))
-        first = 0
+        _escape_unicode_ascii(u, 0, sb)
+    res = sb.build()
+    return space.wrap(res)
+
+def _first_special_char(s):
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
+        else:
+            return i
+    return -1
+
+def _escape_str_ascii(space, s, first, sb):
+    eh = unicodehelper.decode_error_handler(space)
+    u = str_decode_utf_8(
+            s, len(s), None, final=True, errorhandler=eh,
+            allow_surrogates=True)[0]
+    sb.append_slice(s, 0, first)
+    _escape_unicode_ascii(u, first, sb)
 
+def _escape_unicode_ascii(u, first, sb):
     for i in range(first, len(u)):
         c = u[i]
         if c <= u'~':
@@ -78,5 +90,250 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
-    return space.wrap(res)
+
+class JSONEncoder(object):
+    """Interp-level version of the common path of json.JSONEncoder.encode():
+    ensure_ascii=True, no indent, no sort_keys and the default encoding.
+    The only call back to app-level is for the 'default' method of the
+    app-level encoder, for objects that are not natively serializable."""
+
+    def __init__(self, space, w_encoder, check_circular, allow_nan,
+                 skipkeys, item_separator, key_separator):
+        self.space = space
+        self.w_encoder = w_encoder
+        self.check_circular = check_circular
+        self.allow_nan = allow_nan
+        self.skipkeys = skipkeys
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.markers_w = []
+        self.sb = StringBuilder()
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            for w_marker in self.markers_w:
+                if w_marker is w_obj:
+                    raise oefmt(self.space.w_ValueError,
+                                "Circular reference detected")
+            self.markers_w.append(w_obj)
+
+    def unmark(self):
+        if self.check_circular:
+            self.markers_w.pop()
+
+    def encode_string(self, w_string):
+        space = self.space
+        sb = self.sb
+        sb.append('"')
+        if space.isinstance_w(w_string, space.w_str):
+            s = space.str_w(w_string)
+            first = _first_special_char(s)
+            if first < 0:
+                sb.append(s)
+            else:
+                _escape_str_ascii(space, s, first, sb)
+        else:
+            _escape_unicode_ascii(space.unicode_w(w_string), 0, sb)
+        sb.append('"')
+
+    def floatstr(self, x):
+        if isnan(x):
+            text = 'NaN'
+        elif isinf(x):
+            if x > 0.0:
+                text = 'Infinity'
+            else:
+                text = '-Infinity'
+        else:
+            return formatd(x, 'r', 0, DTSF_ADD_DOT_0)
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", text)
+        return text
+
+    def encode_float(self, w_float):
+        space = self.space
+        x = space.float_w(w_float)
+        if not isnan(x) and not isinf(x) and not space.is_w(
+                space.type(w_float), space.w_float):
+            # a subclass of float: use its repr(), like json.encoder
+            self.sb.append(space.str_w(space.repr(w_float)))
+        else:
+            self.sb.append(self.floatstr(x))
+
+    def encode(self, w_obj):
+        space = self.space
+        w_type = space.type(w_obj)
+        if space.is_w(w_type, space.w_str) or space.is_w(w_type,
+                                                          space.w_unicode):
+            self.encode_string(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.sb.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.sb.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.sb.append('false')
+        elif space.is_w(w_type, space.w_int):
+            self.sb.append(str(space.int_w(w_obj)))
+        elif space.is_w(w_type, space.w_float):
+            self.sb.append(self.floatstr(space.float_w(w_obj)))
+        elif space.is_w(w_type, space.w_list) or space.is_w(w_type,
+                                                             space.w_tuple):
+            self.encode_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.encode_dict(w_obj)
+        else:
+            self.encode_other(w_obj)
+
+    def encode_other(self, w_obj):
+        # the same checks as above, for subclasses of the builtin types
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_basestring):
+            self.encode_string(w_obj)
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            self.sb.append(space.str_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.encode_float(w_obj)
+        elif (space.isinstance_w(w_obj, space.w_list) or
+              space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(w_obj)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj)
+        else:
+            self.mark(w_obj)
+            w_res = space.call_method(self.w_encoder, 'default', w_obj)
+            self.encode(w_res)
+            self.unmark()
+
+    def encode_list(self, w_list):
+        space = self.space
+        sb = self.sb
+        # the lists of ints and floats are read without boxing the items
+        intlist = space.listview_int(w_list)
+        if intlist is not None:
+            sb.append('[')
+            for i in range(len(intlist)):
+                if i > 0:
+                    sb.append(self.item_separator)
+                sb.append(str(intlist[i]))
+            sb.append(']')
+            return
+        floatlist = space.listview_float(w_list)
+        if floatlist is not None:
+            sb.append('[')
+            for i in range(len(floatlist)):
+                if i > 0:
+                    sb.append(self.item_separator)
+                sb.append(self.floatstr(floatlist[i]))
+            sb.append(']')
+            return
+        items_w = space.listview(w_list)
+        if not items_w:
+            sb.append('[]')
+            return
+        self.mark(w_list)
+        sb.append('[')
+        for i in range(len(items_w)):
+            if i > 0:
+                sb.append(self.item_separator)
+            self.encode(items_w[i])
+        sb.append(']')
+        self.unmark()
+
+    def encode_dict(self, w_dict):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        space = self.space
+        sb = self.sb
+        if space.len_w(w_dict) == 0:
+            sb.append('{}')
+            return
+        self.mark(w_dict)
+        sb.append('{')
+        # string-keyed dicts: read the keys without boxing them
+        keys, values_w = space.view_as_kwargs(w_dict)
+        if keys is not None:
+            for i in range(len(keys)):
+                if i > 0:
+                    sb.append(self.item_separator)
+                key = keys[i]
+                sb.append('"')
+                first = _first_special_char(key)
+                if first < 0:
+                    sb.append(key)
+                else:
+                    _escape_str_ascii(space, key, first, sb)
+                sb.append('"')
+                sb.append(self.key_separator)
+                self.encode(values_w[i])
+        elif (space.is_w(space.type(w_dict), space.w_dict) and
+                  isinstance(w_dict, W_DictMultiObject)):
+            iteritems = w_dict.iteritems()
+            first = True
+            while True:
+                w_key, w_value = iteritems.next_item()
+                if w_key is None:
+                    break
+                first = self.encode_item(w_key, w_value, first)
+        else:
+            # a subclass of dict, which might override iteritems()
+            w_iter = space.iter(space.call_method(w_dict, 'iteritems'))
+            first = True
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError, e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview(w_item, 2)
+                first = self.encode_item(w_key, w_value, first)
+        sb.append('}')
+        self.unmark()
+
+    def encode_item(self, w_key, w_value, first):
+        space = self.space
+        sb = self.sb
+        if space.isinstance_w(w_key, space.w_basestring):
+            key = None
+        # JavaScript is weakly typed for these, so it makes sense to
+        # also allow them.  Many encoders seem to do something like this.
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self.floatstr(space.float_w(w_key))
+        elif space.is_w(w_key, space.w_True):
+            key = 'true'
+        elif space.is_w(w_key, space.w_False):
+            key = 'false'
+        elif space.is_w(w_key, space.w_None):
+            key = 'null'
+        elif (space.isinstance_w(w_key, space.w_int) or
+              space.isinstance_w(w_key, space.w_long)):
+            key = space.str_w(space.str(w_key))
+        elif self.skipkeys:
+            return first
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            sb.append(self.item_separator)
+        if key is None:
+            self.encode_string(w_key)
+        else:
+            sb.append('"')
+            sb.append(key)
+            sb.append('"')
+        sb.append(self.key_separator)
+        self.encode(w_value)
+        return False
+
+
+@unwrap_spec(check_circular=bool, allow_nan=bool, skipkeys=bool,
+             item_separator=str, key_separator=str)
+def encode(space, w_obj, w_encoder, check_circular=True, allow_nan=True,
+           skipkeys=False, item_separator=', ', key_separator=': '):
+    """Encode 'w_obj' to a JSON str, with the options of json.JSONEncoder.
+    Objects that cannot be serialized are passed to w_encoder.default()."""
+    encoder = JSONEncoder(space, w_encoder, check_circular, allow_nan,
+                          skipkeys, item_separator, key_separator)
+    encoder.encode(w_obj)
+    return space.wrap(encoder.sb.build())
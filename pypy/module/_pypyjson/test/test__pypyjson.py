@@ -10,7 +10,41 @@ def test_skip_whitespace():
     assert dec.skip_whitespace(8) == len(s)
     dec.close()
 
-    
+class TestShapes(object):
+    spaceconfig = {"objspace.usemodules._pypyjson": True}
+
+    def test_repeated_keys_are_shared(self):
+        space = self.space
+        s = '[{"a": 1, "bb": 2}, {"a": 3, "bb": 4}, {"a": 5, "b": 6}]'
+        dec = JSONDecoder(space, s)
+        try:
+            w_res = dec.decode_any(0)
+        finally:
+            dec.close()
+        shape_a = dec.root_shape.single_next
+        assert shape_a.key == 'a'
+        assert shape_a.predicted_length == 2
+        assert sorted(shape_a.transitions) == ['b', 'bb']
+        assert shape_a.single_next.key == 'b'
+        assert (shape_a.transitions['bb'].w_key is
+                dec.key_cache['bb'])
+        assert space.unwrap(w_res) == [{'a': 1, 'bb': 2}, {'a': 3, 'bb': 4},
+                                       {'a': 5, 'b': 6}]
+
+    def test_too_many_transitions(self):
+        from pypy.module._pypyjson.interp_decoder import MAX_SHAPE_TRANSITIONS
+        space = self.space
+        n = MAX_SHAPE_TRANSITIONS + 5
+        s = '[%s]' % ', '.join(['{"k%d": %d}' % (i, i) for i in range(n)])
+        dec = JSONDecoder(space, s)
+        try:
+            w_res = dec.decode_any(0)
+        finally:
+            dec.close()
+        assert len(dec.root_shape.transitions) == MAX_SHAPE_TRANSITIONS
+        assert len(dec.key_cache) == n
+        assert space.unwrap(w_res) == [{'k%d' % i: i} for i in range(n)]
+
 
 class AppTest(object):
     spaceconfig = {"objspace.usemodules._pypyjson": True}
@@ -164,6 +198,24 @@ class AppTest(object):
         raises(ValueError, _pypyjson.loads, '{"key"')
         raises(ValueError, _pypyjson.loads, '{"key": 42')
 
+    def test_decode_object_same_keys(self):
+        import _pypyjson
+        s = ('[{"a": 1, "b": {"a": 2, "c": 3}}, {"a": 4, "b": {"a": 5}},'
+             ' {"ab": 6, "a": 7}, {"a\\u00e0": 8, "b": 9},'
+             ' {"\xc3\xa0": 10}, {"\xc3\xa0" : 11 , "a":12}, {"a": 13}]')
+        res = _pypyjson.loads(s)
+        assert res == [{'a': 1, 'b': {'a': 2, 'c': 3}},
+                       {'a': 4, 'b': {'a': 5}},
+                       {'ab': 6, 'a': 7},
+                       {u'a\xe0': 8, 'b': 9},
+                       {u'\xe0': 10},
+                       {u'\xe0': 11, 'a': 12},
+                       {'a': 13}]
+        assert type(res[4].keys()[0]) is unicode
+        raises(ValueError, _pypyjson.loads, '[{"a": 1}, {"a": 2, "a')
+        raises(ValueError, _pypyjson.loads, '[{"a": 1}, {"a" 2}]')
+        raises(ValueError, _pypyjson.loads, '[{"a": 1}, {"a": 2,}]')
+
     def test_decode_object_nonstring_key(self):
         import _pypyjson
         raises(ValueError, "_pypyjson.loads('{42: 43}')")
@@ -190,6 +242,63 @@ class AppTest(object):
         s = '["\ttab\tcharacter\tin\tstring\t"]'
         raises(ValueError, "_pypyjson.loads(s)")
 
+    def test_incremental_decoder(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('{"a": [1, 2') == []
+        assert dec.feed(', "x\\"}"]}\n"hel') == [{'a': [1, 2, 'x"}']}]
+        assert dec.feed('lo" 42') == [u'hello']
+        assert dec.feed(' true\n1') == [42, True]
+        assert dec.feed('.5') == []
+        assert dec.close() == [1.5]
+        raises(ValueError, dec.feed, '1')
+
+    def test_incremental_decoder_one_char_at_a_time(self):
+        import _pypyjson
+        s = '[1, {"b": null}] "\\u1234" 3.25e2 {}'
+        dec = _pypyjson.IncrementalDecoder()
+        res = []
+        for c in s:
+            res += dec.feed(c)
+        res += dec.close()
+        assert res == [[1, {'b': None}], u'\u1234', 325.0, {}]
+
+    def test_incremental_decoder_errors(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder()
+        raises(ValueError, dec.feed, '{"a" 1}')
+        dec = _pypyjson.IncrementalDecoder()
+        raises(ValueError, dec.feed, ', 1')
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('[1, 2') == []
+        raises(ValueError, dec.close)
+        dec = _pypyjson.IncrementalDecoder()
+        dec.feed('tru')
+        raises(ValueError, dec.close)
+
+    def test_incremental_decoder_items(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        assert dec.feed(' [ 1') == []
+        assert dec.feed(', "a"  ,[2, 3]') == [1, u'a', [2, 3]]
+        assert dec.feed(', {"k": "]"}, 4') == [{'k': ']'}]
+        assert dec.feed(']  ') == [4]
+        assert dec.close() == []
+        #
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        assert dec.feed('[]') == []
+        assert dec.close() == []
+        #
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '{}')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '[1,]')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '[1] 2')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        dec.feed('[1, 2')
+        raises(ValueError, dec.close)
+
     def test_raw_encode_basestring_ascii(self):
         import _pypyjson
         def check(s):
@@ -208,3 +317,66 @@ class AppTest(object):
         assert check("a\"c") == "a\\\"c"
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
+
+    def test_encode(self):
+        import _pypyjson
+        class Enc(object):
+            def default(self, o):
+                if isinstance(o, set):
+                    return sorted(o)
+                raise TypeError("not serializable")
+        def enc(o, **kwds):
+            return _pypyjson.encode(o, Enc(), **kwds)
+        assert enc(None) == 'null'
+        assert enc([True, False]) == '[true, false]'
+        assert enc(42) == '42'
+        assert enc(1 << 70) == str(1 << 70)
+        assert enc(1.5) == '1.5'
+        assert enc(1e300 * 1e300) == 'Infinity'
+        assert enc([float('nan'), -1e300 * 1e300]) == '[NaN, -Infinity]'
+        raises(ValueError, enc, float('nan'), allow_nan=False)
+        assert enc("a\"b\xc3\xa0") == '"a\\"b\\u00e0"'
+        assert enc(u"\u1234\n") == '"\\u1234\\n"'
+        assert enc([1, 2, 3]) == '[1, 2, 3]'
+        assert enc([1.5, 2.0]) == '[1.5, 2.0]'
+        assert enc((1, "x", [])) == '[1, "x", []]'
+        assert enc({}) == '{}'
+        assert enc({"a": [1, {}]}) == '{"a": [1, {}]}'
+        assert enc({1: 2}) == '{"1": 2}'
+        assert enc({1.5: None, None: 2}) in ('{"1.5": null, "null": 2}',
+                                             '{"null": 2, "1.5": null}')
+        assert enc({u"\xe0": 1}) == '{"\\u00e0": 1}'
+        assert enc([1, {"a": 2}], item_separator=',',
+                   key_separator=':') == '[1,{"a":2}]'
+        assert enc(set([3, 1])) == '[1, 3]'
+        raises(TypeError, enc, object())
+        raises(TypeError, enc, {(1, 2): 3})
+        assert enc({(1, 2): 3, "a": 4}, skipkeys=True) == '{"a": 4}'
+
+    def test_encode_subclasses(self):
+        import _pypyjson
+        class MyInt(int):
+            def __str__(self):
+                return "7"
+        class MyList(list):
+            def __iter__(self):
+                return iter([5])
+        class MyDict(dict):
+            def iteritems(self):
+                return iter([("k", "v")])
+        assert _pypyjson.encode([MyInt(3), MyList([1, 2]), MyDict(x=1)],
+                                None) == '[7, [5], {"k": "v"}]'
+
+    def test_encode_circular(self):
+        import _pypyjson
+        l = [1]
+        l.append(l)
+        raises(ValueError, _pypyjson.encode, l, None)
+        d = {}
+        d["d"] = [d]
+        raises(ValueError, _pypyjson.encode, d, None)
+        x = [1]
+        assert _pypyjson.encode([x, x], None) == '[[1], [1]]'
+        y = [[]]
+        assert _pypyjson.encode([y, y], None) == '[[[]], [[]]]'
+
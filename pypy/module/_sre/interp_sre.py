@@ -6,13 +6,14 @@ from pypy.interpreter.typedef import make_weakref_descr
 from pypy.interpreter.gateway import interp2app, unwrap_spec, WrappedDefault
 from pypy.interpreter.error import OperationError
 from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.buffer import StringBuffer
 from rpython.rlib import jit
 
 # ____________________________________________________________
 #
 # Constants and exposed functions
 
-from rpython.rlib.rsre import rsre_core
+from rpython.rlib.rsre import rsre_core, rsre_nfa, rsre_prefilter
 from rpython.rlib.rsre.rsre_char import MAGIC, CODESIZE, MAXREPEAT, getlower, set_unicode_db
 
 
@@ -36,6 +37,8 @@ def slice_w(space, ctx, start, end, w_default):
     if 0 <= start <= end:
         if isinstance(ctx, rsre_core.BufMatchContext):
             return space.wrap(ctx._buffer.getslice(start, end, 1, end-start))
+        elif isinstance(ctx, rsre_core.RawMatchContext):
+            return space.wrap(ctx._buffer.getslice(start, end, 1, end-start))
         elif isinstance(ctx, rsre_core.UnicodeMatchContext):
             return space.wrap(ctx._unicodestr[start:end])
         else:
@@ -73,14 +76,22 @@ def import_re(space):
     w_import = space.getattr(w_builtin, space.wrap("__import__"))
     return space.call_function(w_import, space.wrap("re"))
 
+def refresh_raw_address(ctx):
+    # between two searches in the same buffer, e.g. in finditer() or in
+    # sub() with a callable, app-level code may have resized an array.array
+    if isinstance(ctx, rsre_core.RawMatchContext):
+        ctx.refresh_address()
+
 def matchcontext(space, ctx):
     try:
+        refresh_raw_address(ctx)
         return rsre_core.match_context(ctx)
     except rsre_core.Error, e:
         raise OperationError(space.w_RuntimeError, space.wrap(e.msg))
 
 def searchcontext(space, ctx):
     try:
+        refresh_raw_address(ctx)
         return rsre_core.search_context(ctx)
     except rsre_core.Error, e:
         raise OperationError(space.w_RuntimeError, space.wrap(e.msg))
@@ -90,7 +101,8 @@ def searchcontext(space, ctx):
 # SRE_Pattern class
 
 class W_SRE_Pattern(W_Root):
-    _immutable_fields_ = ["code", "flags", "num_groups", "w_groupindex"]
+    _immutable_fields_ = ["code", "flags", "num_groups", "w_groupindex",
+                          "prefilter", "nfa"]
 
     def cannot_copy_w(self):
         space = self.space
@@ -98,8 +110,8 @@ class W_SRE_Pattern(W_Root):
                              space.wrap("cannot copy this pattern object"))
 
     def make_ctx(self, w_string, pos=0, endpos=sys.maxint):
-        """Make a BufMatchContext or a UnicodeMatchContext for searching
-        in the given w_string object."""
+        """Make a BufMatchContext, a RawMatchContext or a
+        UnicodeMatchContext for searching in the given w_string object."""
         space = self.space
         if pos < 0:
             pos = 0
@@ -111,8 +123,8 @@ class W_SRE_Pattern(W_Root):
                 pos = len(unicodestr)
             if endpos > len(unicodestr):
                 endpos = len(unicodestr)
-            return rsre_core.UnicodeMatchContext(self.code, unicodestr,
-                                                 pos, endpos, self.flags)
+            ctx = rsre_core.UnicodeMatchContext(self.code, unicodestr,
+                                                pos, endpos, self.flags)
         else:
             buf = space.readbuf_w(w_string)
             size = buf.getlength()
@@ -121,8 +133,20 @@ class W_SRE_Pattern(W_Root):
                 pos = size
             if endpos > size:
                 endpos = size
-            return rsre_core.BufMatchContext(self.code, buf,
-                                             pos, endpos, self.flags)
+            ctx = None
+            if not isinstance(buf, StringBuffer):
+                # read directly the memory of mmaps, arrays, etc.
+                try:
+                    ctx = rsre_core.RawMatchContext(self.code, buf,
+                                                    pos, endpos, self.flags)
+                except ValueError:
+                    pass     # no raw address, e.g. a bytearray
+            if ctx is None:
+                ctx = rsre_core.BufMatchContext(self.code, buf,
+                                                pos, endpos, self.flags)
+        ctx.prefilter = self.prefilter
+        ctx.nfa = self.nfa
+        return ctx
 
     def getmatch(self, ctx, found):
         if found:
@@ -298,6 +322,9 @@ def SRE_Pattern__new__(space, w_subtype, w_pattern, flags, w_code,
     srepat.w_pattern = w_pattern      # the original uncompiled pattern
     srepat.flags = flags
     srepat.code = code
+    srepat.prefilter = rsre_prefilter.compute_prefilter(code)
+    # patterns at risk of exponential backtracking use the NFA engine
+    srepat.nfa = rsre_nfa.compile_nfa(code)
     srepat.num_groups = groups
     srepat.w_groupindex = w_groupindex
     srepat.w_indexgroup = w_indexgroup
@@ -481,6 +508,8 @@ class W_SRE_Match(W_Root):
         ctx = self.ctx
         if isinstance(ctx, rsre_core.BufMatchContext):
             return space.wrap(ctx._buffer.as_str())
+        elif isinstance(ctx, rsre_core.RawMatchContext):
+            return space.wrap(ctx._buffer.as_str())
         elif isinstance(ctx, rsre_core.UnicodeMatchContext):
             return space.wrap(ctx._unicodestr)
         else:
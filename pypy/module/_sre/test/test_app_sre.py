@@ -108,7 +108,7 @@ class AppTestSrePattern:
 
 
 class AppTestSreMatch:
-    spaceconfig = dict(usemodules=('array', ))
+    spaceconfig = dict(usemodules=('array', 'mmap'))
 
     def test_copy(self):
         import re
@@ -267,6 +267,31 @@ class AppTestSreMatch:
         m = re.match('hel+', a)
         assert m.end() == 4
 
+    def test_finditer_array_resized(self):
+        import re, array
+        a = array.array('c', 'ab1 cd22 ef333')
+        res = []
+        for m in re.finditer(r'(\w+?)(\d+)', a):
+            res.append(m.groups())
+            a.extend('x' * 1000)     # reallocates the array
+        assert res == [('ab', '1'), ('cd', '22'), ('ef', '333')]
+        it = re.finditer(r'\d', a)
+        next(it)
+        del a[5:]
+        raises(RuntimeError, next, it)
+
+    def test_search_mmap(self):
+        import re, mmap
+        m = mmap.mmap(-1, 16)
+        m.write('foo ERROR: bar\n')
+        match = re.search(r'ERROR: (\w+)', m)
+        assert match.span() == (4, 14)
+        assert match.group(1) == 'bar'
+        assert match.string == m[:]
+        assert re.findall(r'[a-z]+', m, re.I) == ['foo', 'ERROR', 'bar']
+        m.close()
+        raises(ValueError, re.search, 'x', m)
+
     def test_match_typeerror(self):
         import re
         raises(TypeError, re.match, 'hel+', list('hello'))
@@ -988,3 +1013,17 @@ class AppTestOptimizations:
         import re
         assert re.search(".+ab", "wowowowawoabwowo")
         assert None == re.search(".+ab", "wowowaowowo")
+
+    def test_nfa_engine(self):
+        import re
+        # these would take forever with a backtracking engine
+        s = "a" * 1000 + "!"
+        assert re.match("(a+)+$", s) is None
+        assert re.search("(?:a|aa)*b", s) is None
+        m = re.match("((a)+)+!", s)
+        assert m.span() == (0, 1001)
+        assert m.group(1) == "a" * 1000
+        assert m.group(2) == "a"
+        assert m.lastindex == 1
+        assert re.findall("(?:\w+\s?)+!", "ab cd! ef!") == ["ab cd!", "ef!"]
+        assert re.sub("(x+y?)+", "-", "axxyxb") == "a-b"
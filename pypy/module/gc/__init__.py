@@ -32,5 +32,6 @@ class Module(MixedModule):
                 'get_typeids_z': 'referents.get_typeids_z',
                 'get_typeids_list': 'referents.get_typeids_list',
                 'GcRef': 'referents.W_GcRef',
+                'get_stats': 'interp_gc.get_stats',
                 })
         MixedModule.__init__(self, space, w_name)
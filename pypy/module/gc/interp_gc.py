@@ -48,6 +48,18 @@ def enable_finalizers(space):
 def disable_finalizers(space):
     space.user_del_action.finalizers_lock_count += 1
 
+def get_stats(space):
+    """Return a dict with statistics about the GC.  A value is -1 if the
+    GC in use doesn't keep that statistic.
+    """
+    w_result = space.newdict()
+    for name, stat_no in [('total_memory', rgc.TOTAL_MEMORY),
+                          ('major_collections', rgc.MAJOR_COLLECTIONS),
+                          ('pages_swept', rgc.PAGES_SWEPT),
+                          ('pages_swept_lazily', rgc.PAGES_SWEPT_LAZILY)]:
+        space.setitem_str(w_result, name, space.wrap(rgc.get_stats(stat_no)))
+    return w_result
+
 # ____________________________________________________________
 
 @unwrap_spec(filename='str0')
@@ -7,6 +7,14 @@ class AppTestGC(object):
         gc.collect() # mostly a "does not crash" kind of test
         gc.collect(0) # mostly a "does not crash" kind of test
 
+    def test_get_stats(self):
+        import gc
+        stats = gc.get_stats()
+        assert sorted(stats) == ['major_collections', 'pages_swept',
+                                 'pages_swept_lazily', 'total_memory']
+        for value in stats.values():
+            assert isinstance(value, int)
+
     def test_disable_finalizers(self):
         import gc
 
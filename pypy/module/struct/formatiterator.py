@@ -1,5 +1,5 @@
 from rpython.rlib import jit
-from rpython.rlib.objectmodel import specialize
+from rpython.rlib.objectmodel import specialize, newlist_hint
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.rstruct.error import StructError
 from rpython.rlib.rstruct.formatiterator import FormatIterator
@@ -32,6 +32,11 @@ class PackFormatIterator(FormatIterator):
         pad = (-self.result.getlength()) & mask
         self.result.append_multiple_char('\x00', pad)
 
+    def seek(self, offset):
+        pad = offset - self.result.getlength()
+        if pad > 0:
+            self.result.append_multiple_char('\x00', pad)
+
     def finished(self):
         if self.args_index != len(self.args_w):
             raise StructError("too many arguments for struct format")
@@ -125,6 +130,9 @@ class UnpackFormatIterator(FormatIterator):
     def align(self, mask):
         self.pos = (self.pos + mask) & ~mask
 
+    def seek(self, offset):
+        self.pos = offset
+
     def finished(self):
         if self.pos != self.length:
             raise StructError("unpack str size too long for format")
@@ -140,3 +148,96 @@ class UnpackFormatIterator(FormatIterator):
     @specialize.argtype(1)
     def appendobj(self, value):
         self.result_w.append(self.space.wrap(value))
+
+
+class Column(object):
+    """The values of one field of the format, for all the records.
+    Integers and floats are kept unwrapped."""
+
+    def __init__(self):
+        self.ints = None
+        self.floats = None
+        self.items_w = None
+
+    def wrap(self, space):
+        if self.ints is not None:
+            return space.newlist_int(self.ints)
+        if self.floats is not None:
+            return space.newlist_float(self.floats)
+        if self.items_w is not None:
+            return space.newlist(self.items_w)
+        return space.newlist([])
+
+
+class ColumnUnpackFormatIterator(FormatIterator):
+    """Unpacks 'count' consecutive records of 'size' bytes each, and
+    collects the values of each field of the format into a Column.
+    """
+    def __init__(self, space, buf, size, count, fieldcount):
+        self.space = space
+        self.buf = buf
+        self.size = size
+        self.count = count
+        self.start = 0          # offset of the current record in 'buf'
+        self.pos = 0            # position inside the current record
+        self.column_index = 0
+        self.columns = [Column() for i in range(fieldcount)]
+
+    def unpack_all(self, plan):
+        for i in range(self.count):
+            self.start = i * self.size
+            self.pos = 0
+            self.column_index = 0
+            self.execute(plan)
+
+    # See above comment on operate.
+    @jit.unroll_safe
+    @specialize.arg(1)
+    def operate(self, fmtdesc, repetitions):
+        if fmtdesc.needcount:
+            fmtdesc.unpack(self, repetitions)
+        else:
+            for i in range(repetitions):
+                fmtdesc.unpack(self)
+    _operate_is_specialized_ = True
+
+    def align(self, mask):
+        self.pos = (self.pos + mask) & ~mask
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def read(self, count):
+        end = self.pos + count
+        if end > self.size:
+            raise StructError("unpack str size too short for format")
+        start = self.start + self.pos
+        s = self.buf.getslice(start, start + count, 1, count)
+        self.pos = end
+        return s
+
+    @specialize.argtype(1)
+    def appendobj(self, value):
+        column = self.columns[self.column_index]
+        self.column_index += 1
+        if isinstance(value, bool):
+            self._append_w(column, self.space.wrap(value))
+        elif isinstance(value, int):
+            if column.ints is None:
+                column.ints = newlist_hint(self.count)
+            column.ints.append(value)
+        elif isinstance(value, float):
+            if column.floats is None:
+                column.floats = newlist_hint(self.count)
+            column.floats.append(value)
+        else:
+            self._append_w(column, self.space.wrap(value))
+
+    def _append_w(self, column, w_value):
+        if column.items_w is None:
+            column.items_w = newlist_hint(self.count)
+        column.items_w.append(w_value)
+
+    def wrap_columns(self):
+        space = self.space
+        return space.newtuple([column.wrap(space) for column in self.columns])
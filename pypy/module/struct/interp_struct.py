@@ -1,35 +1,60 @@
 from rpython.rlib import jit
 from rpython.rlib.buffer import SubBuffer
 from rpython.rlib.rstruct.error import StructError, StructOverflowError
-from rpython.rlib.rstruct.formatiterator import CalcSizeFormatIterator
+from rpython.rlib.rstruct.formatiterator import compile_format
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.typedef import TypeDef, interp_attrproperty
 from pypy.module.struct.formatiterator import (
-    PackFormatIterator, UnpackFormatIterator
+    PackFormatIterator, UnpackFormatIterator, ColumnUnpackFormatIterator
 )
 
 
+# like CPython, the cache of compiled formats is emptied when it is full
+MAX_CACHED_PLANS = 100
+
+
 class Cache:
     def __init__(self, space):
         self.error = space.new_exception_class("struct.error", space.w_Exception)
+        self.plans = {}     # {format: FormatPlan}
 
 
 def get_error(space):
     return space.fromcache(Cache).error
 
 
-def _calcsize(space, format):
-    fmtiter = CalcSizeFormatIterator()
+def struct_error(space, e):
+    if isinstance(e, StructOverflowError):
+        return OperationError(space.w_OverflowError, space.wrap(e.msg))
+    return OperationError(get_error(space), space.wrap(e.msg))
+
+
+@jit.elidable
+def get_plan(space, format):
+    """Return the FormatPlan for the given format string, compiling it
+    only the first time.  This is elidable even though it may fill the
+    cache: all the plans ever built for the same format are equivalent,
+    so it is fine to constant-fold the call to any of them."""
+    cache = space.fromcache(Cache)
     try:
-        fmtiter.interpret(format)
-    except StructOverflowError, e:
-        raise OperationError(space.w_OverflowError, space.wrap(e.msg))
+        return cache.plans[format]
+    except KeyError:
+        pass
+    try:
+        plan = compile_format(format)
     except StructError, e:
-        raise OperationError(get_error(space), space.wrap(e.msg))
-    return fmtiter.totalsize
+        raise struct_error(space, e)
+    if len(cache.plans) >= MAX_CACHED_PLANS:
+        cache.plans.clear()
+    cache.plans[format] = plan
+    return plan
+
+
+def _calcsize(space, format):
+    return get_plan(space, format).size
 
 
 @unwrap_spec(format=str)
@@ -37,30 +62,23 @@ def calcsize(space, format):
     return space.wrap(_calcsize(space, format))
 
 
-def _pack(space, format, args_w):
-    if jit.isconstant(format):
-        size = _calcsize(space, format)
-    else:
-        size = 8
-    fmtiter = PackFormatIterator(space, args_w, size)
+def _pack(space, plan, args_w):
+    fmtiter = PackFormatIterator(space, args_w, plan.size)
     try:
-        fmtiter.interpret(format)
-    except StructOverflowError, e:
-        raise OperationError(space.w_OverflowError, space.wrap(e.msg))
+        fmtiter.execute(plan)
     except StructError, e:
-        raise OperationError(get_error(space), space.wrap(e.msg))
+        raise struct_error(space, e)
     return fmtiter.result.build()
 
 
 @unwrap_spec(format=str)
 def pack(space, format, args_w):
-    return space.wrap(_pack(space, format, args_w))
+    return space.wrap(_pack(space, get_plan(space, format), args_w))
 
 
 # XXX inefficient
-@unwrap_spec(format=str, offset=int)
-def pack_into(space, format, w_buffer, offset, args_w):
-    res = _pack(space, format, args_w)
+def _pack_into(space, plan, w_buffer, offset, args_w):
+    res = _pack(space, plan, args_w)
     buf = space.writebuf_w(w_buffer)
     if offset < 0:
         offset += buf.getlength()
@@ -72,26 +90,28 @@ def pack_into(space, format, w_buffer, offset, args_w):
     buf.setslice(offset, res)
 
 
-def _unpack(space, format, buf):
+@unwrap_spec(format=str, offset=int)
+def pack_into(space, format, w_buffer, offset, args_w):
+    _pack_into(space, get_plan(space, format), w_buffer, offset, args_w)
+
+
+def _unpack(space, plan, buf):
     fmtiter = UnpackFormatIterator(space, buf)
     try:
-        fmtiter.interpret(format)
-    except StructOverflowError, e:
-        raise OperationError(space.w_OverflowError, space.wrap(e.msg))
+        fmtiter.execute(plan)
     except StructError, e:
-        raise OperationError(get_error(space), space.wrap(e.msg))
+        raise struct_error(space, e)
     return space.newtuple(fmtiter.result_w[:])
 
 
 @unwrap_spec(format=str)
 def unpack(space, format, w_str):
     buf = space.getarg_w('s*', w_str)
-    return _unpack(space, format, buf)
+    return _unpack(space, get_plan(space, format), buf)
 
 
-@unwrap_spec(format=str, offset=int)
-def unpack_from(space, format, w_buffer, offset=0):
-    size = _calcsize(space, format)
+def _unpack_from(space, plan, w_buffer, offset):
+    size = plan.size
     buf = space.getarg_w('z*', w_buffer)
     if buf is None:
         raise oefmt(get_error(space), "unpack_from requires a buffer argument")
@@ -102,15 +122,95 @@ def unpack_from(space, format, w_buffer, offset=0):
                     "unpack_from requires a buffer of at least %d bytes",
                     size)
     buf = SubBuffer(buf, offset, size)
-    return _unpack(space, format, buf)
+    return _unpack(space, plan, buf)
+
+
+@unwrap_spec(format=str, offset=int)
+def unpack_from(space, format, w_buffer, offset=0):
+    return _unpack_from(space, get_plan(space, format), w_buffer, offset)
+
+
+def _check_record_buffer(space, funcname, size, buf):
+    if size == 0:
+        raise oefmt(get_error(space),
+                    "cannot %s with a struct of length 0", funcname)
+    if buf.getlength() % size != 0:
+        raise oefmt(get_error(space),
+                    "%s requires a buffer length multiple of %d",
+                    funcname, size)
+
+
+def _iter_unpack(space, plan, w_buffer):
+    buf = space.getarg_w('s*', w_buffer)
+    _check_record_buffer(space, "iter_unpack", plan.size, buf)
+    return W_UnpackIter(plan, buf)
+
+
+@unwrap_spec(format=str)
+def iter_unpack(space, format, w_buffer):
+    """Return an iterator which unpacks the buffer one record at a time,
+    yielding tuples."""
+    return _iter_unpack(space, get_plan(space, format), w_buffer)
+
+
+def _unpack_many(space, plan, w_buffer):
+    size = plan.size
+    buf = space.getarg_w('s*', w_buffer)
+    _check_record_buffer(space, "unpack_many", size, buf)
+    fmtiter = ColumnUnpackFormatIterator(space, buf, size,
+                                         buf.getlength() // size,
+                                         plan.fieldcount)
+    try:
+        fmtiter.unpack_all(plan)
+    except StructError, e:
+        raise struct_error(space, e)
+    return fmtiter.wrap_columns()
+
+
+@unwrap_spec(format=str)
+def unpack_many(space, format, w_buffer):
+    """Unpack all the records of the buffer at once.  Return a tuple with
+    one list per field of the format, containing the values of this field
+    in all the records."""
+    return _unpack_many(space, get_plan(space, format), w_buffer)
+
+
+class W_UnpackIter(W_Root):
+    def __init__(self, plan, buf):
+        self.plan = plan
+        self.buf = buf
+        self.index = 0
+
+    def descr_iter(self, space):
+        return space.wrap(self)
+
+    def descr_next(self, space):
+        index = self.index
+        size = self.plan.size
+        if index + size > self.buf.getlength():
+            raise OperationError(space.w_StopIteration, space.w_None)
+        self.index = index + size
+        return _unpack(space, self.plan, SubBuffer(self.buf, index, size))
+
+    def descr_length_hint(self, space):
+        remaining = (self.buf.getlength() - self.index) // self.plan.size
+        return space.wrap(max(remaining, 0))
+
+W_UnpackIter.typedef = TypeDef("unpack_iterator",
+    __iter__=interp2app(W_UnpackIter.descr_iter),
+    next=interp2app(W_UnpackIter.descr_next),
+    __length_hint__=interp2app(W_UnpackIter.descr_length_hint),
+)
+W_UnpackIter.typedef.acceptable_as_base_class = False
 
 
 class W_Struct(W_Root):
-    _immutable_fields_ = ["format", "size"]
+    _immutable_fields_ = ["format", "size", "plan"]
 
     def __init__(self, space, format):
         self.format = format
-        self.size = _calcsize(space, format)
+        self.plan = get_plan(space, format)
+        self.size = self.plan.size
 
     @unwrap_spec(format=str)
     def descr__new__(space, w_subtype, format):
@@ -119,18 +219,25 @@ class W_Struct(W_Root):
         return self
 
     def descr_pack(self, space, args_w):
-        return pack(space, jit.promote_string(self.format), args_w)
+        return space.wrap(_pack(space, jit.promote(self.plan), args_w))
 
     @unwrap_spec(offset=int)
     def descr_pack_into(self, space, w_buffer, offset, args_w):
-        return pack_into(space, jit.promote_string(self.format), w_buffer, offset, args_w)
+        _pack_into(space, jit.promote(self.plan), w_buffer, offset, args_w)
 
     def descr_unpack(self, space, w_str):
-        return unpack(space, jit.promote_string(self.format), w_str)
+        buf = space.getarg_w('s*', w_str)
+        return _unpack(space, jit.promote(self.plan), buf)
 
     @unwrap_spec(offset=int)
     def descr_unpack_from(self, space, w_buffer, offset=0):
-        return unpack_from(space, jit.promote_string(self.format), w_buffer, offset)
+        return _unpack_from(space, jit.promote(self.plan), w_buffer, offset)
+
+    def descr_iter_unpack(self, space, w_buffer):
+        return _iter_unpack(space, jit.promote(self.plan), w_buffer)
+
+    def descr_unpack_many(self, space, w_buffer):
+        return _unpack_many(space, jit.promote(self.plan), w_buffer)
 
 W_Struct.typedef = TypeDef("Struct",
     __new__=interp2app(W_Struct.descr__new__.im_func),
@@ -141,7 +248,10 @@ W_Struct.typedef = TypeDef("Struct",
     unpack=interp2app(W_Struct.descr_unpack),
     pack_into=interp2app(W_Struct.descr_pack_into),
     unpack_from=interp2app(W_Struct.descr_unpack_from),
+    iter_unpack=interp2app(W_Struct.descr_iter_unpack),
+    unpack_many=interp2app(W_Struct.descr_unpack_many),
 )
 
 def clearcache(space):
-    """No-op on PyPy"""
+    """Clear the cache of compiled formats."""
+    space.fromcache(Cache).plans.clear()
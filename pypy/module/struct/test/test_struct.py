@@ -412,6 +412,78 @@ class AppTestStruct(object):
         assert s.unpack(s.pack(42)) == (42,)
         assert s.unpack_from(memoryview(s.pack(42))) == (42,)
 
+    def test_struct_object_plan(self):
+        struct = self.struct
+        s = struct.Struct('<bxH')
+        assert s.size == 4
+        assert s.pack(-1, 513) == '\xff\x00\x01\x02'
+        buf = bytearray(6)
+        s.pack_into(buf, 2, 3, 4)
+        assert buf == '\x00\x00\x03\x00\x04\x00'
+        assert s.unpack_from(buf, 2) == (3, 4)
+        raises(struct.error, s.pack, 1)
+        raises(struct.error, s.unpack, '\x00' * 5)
+
+    def test_format_cache(self):
+        struct = self.struct
+        formats = ['<%di' % i for i in range(1, 250)]
+        for fmt in formats:
+            assert struct.calcsize(fmt) == 4 * int(fmt[1:-1])
+        for fmt in formats:
+            n = int(fmt[1:-1])
+            assert struct.unpack(fmt, struct.pack(fmt, *range(n))) == \
+                tuple(range(n))
+        struct._clearcache()
+        assert struct.pack('<h', 1) == '\x01\x00'
+        raises(struct.error, struct.pack, 'z', 1)
+        raises(struct.error, struct.pack, 'z', 1)
+
+    def test_iter_unpack(self):
+        import array
+        struct = self.struct
+        data = struct.pack('<ih', 1, 2) + struct.pack('<ih', -3, 4)
+        it = struct.iter_unpack('<ih', data)
+        assert iter(it) is it
+        assert it.__length_hint__() == 2
+        assert next(it) == (1, 2)
+        assert it.__length_hint__() == 1
+        assert list(it) == [(-3, 4)]
+        raises(StopIteration, next, it)
+        s = struct.Struct('<ih')
+        a = array.array('c', data)
+        assert list(s.iter_unpack(a)) == [(1, 2), (-3, 4)]
+        assert list(s.iter_unpack('')) == []
+        raises(struct.error, struct.iter_unpack, '<ih', data[:-1])
+        raises(struct.error, struct.iter_unpack, '', 'abc')
+
+    def test_unpack_many(self):
+        struct = self.struct
+        data = (struct.pack('@bid?3s', 1, 2, 3.5, True, 'abc') +
+                struct.pack('@bid?3s', -4, 5, -6.0, False, 'xyz'))
+        res = struct.unpack_many('@bid?3s', data)
+        assert res == ([1, -4], [2, 5], [3.5, -6.0], [True, False],
+                       ['abc', 'xyz'])
+        s = struct.Struct('>QxH')
+        data = s.pack(2 ** 64 - 1, 7) + s.pack(0, 8)
+        assert s.unpack_many(data) == ([2 ** 64 - 1, 0], [7, 8])
+        assert s.unpack_many('') == ([], [])
+        raises(struct.error, s.unpack_many, data + 'x')
+        raises(struct.error, struct.unpack_many, '', 'abc')
+
+
+class AppTestStructColumns(object):
+    spaceconfig = dict(usemodules=['struct', '__pypy__'])
+
+    def test_unpack_many_strategies(self):
+        import struct
+        from __pypy__ import strategy
+        data = ''.join([struct.pack('=hd', i, i * 0.5) for i in range(10)])
+        ints, floats = struct.unpack_many('=hd', data)
+        assert ints == range(10)
+        assert floats == [i * 0.5 for i in range(10)]
+        assert strategy(ints) == "IntegerListStrategy"
+        assert strategy(floats) == "FloatListStrategy"
+
 
 class AppTestStructBuffer(object):
     spaceconfig = dict(usemodules=['struct', '__pypy__'])
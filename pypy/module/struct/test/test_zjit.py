@@ -0,0 +1,52 @@
+from rpython.jit.metainterp.test.support import LLJitMixin
+from rpython.rlib import jit
+from pypy.interpreter.baseobjspace import W_Root
+
+from pypy.module.struct import interp_struct
+
+
+class FakeSpace(object):
+    def __init__(self):
+        self.w_Exception = W_Root()
+        self.w_OverflowError = W_Root()
+        self.cache = interp_struct.Cache(self)
+
+    def new_exception_class(self, name, w_bases):
+        return W_Root()
+
+    def fromcache(self, cls):
+        assert cls is interp_struct.Cache
+        return self.cache
+
+    def wrap(self, x):
+        return W_Root()
+
+
+class TestStructJit(LLJitMixin):
+
+    def test_get_plan_cache_miss_while_tracing(self):
+        space = FakeSpace()
+
+        @jit.dont_look_inside
+        def clearcache():
+            interp_struct.clearcache(space)
+        driver = jit.JitDriver(greens=['format'], reds=['n', 'total'])
+
+        formats = ["iih", "q"]
+
+        def f(n, i):
+            format = formats[i]
+            total = 0
+            while n > 0:
+                driver.jit_merge_point(format=format, n=n, total=total)
+                # the cache misses in every iteration, including the
+                # ones being traced
+                clearcache()
+                total += interp_struct.get_plan(space, format).size
+                n -= 1
+            return total
+
+        res = self.meta_interp(f, [20, 0])
+        assert res == 20 * 10
+        # get_plan() is folded away: the only call left is clearcache()
+        self.check_simple_loop(call=1, call_pure=0, call_may_force=0)
@@ -469,6 +469,16 @@ class W_BytesObject(W_AbstractBytesObject):
     def _new(self, value):
         return W_BytesObject(value)
 
+    def _sliced(self, space, s, start, stop, orig_obj):
+        assert start >= 0
+        assert stop >= 0
+        if space.config.objspace.std.withstrslice:
+            from pypy.objspace.std.strsliceobject import (
+                W_StringSliceObject, slice_is_worth_a_view)
+            if slice_is_worth_a_view(len(s), start, stop):
+                return W_StringSliceObject(s, start, stop)
+        return W_BytesObject(s[start:stop])
+
     def _new_from_list(self, value):
         return W_BytesObject(''.join(value))
 
@@ -482,9 +492,9 @@ class W_BytesObject(W_AbstractBytesObject):
 
     @staticmethod
     def _use_rstr_ops(space, w_other):
-        from pypy.objspace.std.unicodeobject import W_UnicodeObject
+        from pypy.objspace.std.unicodeobject import W_AbstractUnicodeObject
         return (isinstance(w_other, W_BytesObject) or
-                isinstance(w_other, W_UnicodeObject))
+                isinstance(w_other, W_AbstractUnicodeObject))
 
     @staticmethod
     def _op_val(space, w_other):
@@ -589,57 +599,51 @@ class W_BytesObject(W_AbstractBytesObject):
         return mod_format(space, self, w_values, do_unicode=False)
 
     def descr_eq(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value == w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value == w_other.str_w(space))
         return space.newbool(self._value == w_other._value)
 
     def descr_ne(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value != w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value != w_other.str_w(space))
         return space.newbool(self._value != w_other._value)
 
     def descr_lt(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value < w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value < w_other.str_w(space))
         return space.newbool(self._value < w_other._value)
 
     def descr_le(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value <= w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value <= w_other.str_w(space))
         return space.newbool(self._value <= w_other._value)
 
     def descr_gt(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value > w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value > w_other.str_w(space))
         return space.newbool(self._value > w_other._value)
 
     def descr_ge(self, space, w_other):
-        if space.config.objspace.std.withstrbuf:
-            from pypy.objspace.std.strbufobject import W_StringBufferObject
-            if isinstance(w_other, W_StringBufferObject):
-                return space.newbool(self._value >= w_other.force())
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            # a string buffer or a string slice
+            return space.newbool(self._value >= w_other.str_w(space))
         return space.newbool(self._value >= w_other._value)
 
     # auto-conversion fun
@@ -692,12 +696,10 @@ class W_BytesObject(W_AbstractBytesObject):
     _StringMethods_descr_contains = descr_contains
     def descr_contains(self, space, w_sub):
         if space.isinstance_w(w_sub, space.w_unicode):
-            from pypy.objspace.std.unicodeobject import W_UnicodeObject
-            assert isinstance(w_sub, W_UnicodeObject)
             self_as_unicode = unicode_from_encoded_object(space, self, None,
                                                           None)
             return space.newbool(
-                self_as_unicode._value.find(w_sub._value) >= 0)
+                self_as_unicode._value.find(space.unicode_w(w_sub)) >= 0)
         return self._StringMethods_descr_contains(space, w_sub)
 
     _StringMethods_descr_replace = descr_replace
@@ -0,0 +1,448 @@
+"""Unicode strings that only contain ASCII characters, stored as a plain
+string with one byte per character (see the withcompactunicode option).
+"""
+
+from rpython.rlib.objectmodel import (compute_hash, compute_unique_id,
+    specialize)
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstring import endswith, rsplit, split, startswith
+
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.module.unicodedata import unicodedb
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.sliceobject import (W_SliceObject,
+    normalize_simple_slice, unwrap_start_stop)
+from pypy.objspace.std.strbufobject import delegate_to_forced
+from pypy.objspace.std.util import IDTAG_ASCII_UNICODE
+from pypy.objspace.std.unicodeobject import (W_AbstractUnicodeObject,
+    W_UnicodeObject, _get_encoding_and_errors, encode_object)
+
+
+def is_ascii(s):
+    for c in s:
+        if ord(c) >= 0x80:
+            return False
+    return True
+
+
+def _ascii_unicode_val(w_other):
+    # the ASCII characters of a unicode object, as a string, or None if it
+    # may contain other characters
+    if isinstance(w_other, W_ASCIIUnicodeObject):
+        return w_other._str
+    if isinstance(w_other, W_UnicodeObject):
+        u = w_other._value
+        for c in u:
+            if ord(c) >= 0x80:
+                return None
+        return u.encode('ascii')
+    return None
+
+def _ascii_op_val(w_other):
+    # like _ascii_unicode_val(), but also accepts the byte strings that
+    # convert to unicode with the default 'ascii' encoding
+    if type(w_other) is W_BytesObject:
+        if is_ascii(w_other._value):
+            return w_other._value
+        return None
+    return _ascii_unicode_val(w_other)
+
+def _isspace(c):
+    # the unicode whitespace characters, including '\x1c' to '\x1f'
+    return unicodedb.isspace(ord(c))
+
+def _split_whitespace(s, maxsplit, reverse):
+    res = []
+    if not reverse:
+        i = 0
+        while True:
+            while i < len(s) and _isspace(s[i]):
+                i += 1
+            if i == len(s):
+                break
+            if maxsplit == 0:
+                res.append(s[i:])
+                break
+            j = i
+            while j < len(s) and not _isspace(s[j]):
+                j += 1
+            res.append(s[i:j])
+            maxsplit -= 1
+            i = j
+    else:
+        i = len(s)
+        while True:
+            while i > 0 and _isspace(s[i - 1]):
+                i -= 1
+            assert i >= 0
+            if i == 0:
+                break
+            if maxsplit == 0:
+                res.append(s[:i])
+                break
+            j = i
+            while j > 0 and not _isspace(s[j - 1]):
+                j -= 1
+            assert j >= 0
+            res.append(s[j:i])
+            maxsplit -= 1
+            i = j
+        res.reverse()
+    return res
+
+
+class W_ASCIIUnicodeObject(W_AbstractUnicodeObject):
+    _immutable_fields_ = ['_str']
+
+    def __init__(self, s):
+        # 's' must only contain ASCII characters
+        self._str = s
+
+    def force(self):
+        # the result is not cached: keeping it would give up the
+        # memory savings as soon as any method not implemented here is
+        # called
+        return W_UnicodeObject(self._str.decode('ascii'))
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r)" % (w_self.__class__.__name__, w_self._str)
+
+    def unwrap(self, space):
+        return self._str.decode('ascii')
+
+    def is_w(self, space, w_other):
+        # unicode_w() returns a new unicode every time, so compare the
+        # underlying strings instead
+        if not isinstance(w_other, W_ASCIIUnicodeObject):
+            return False
+        if self is w_other:
+            return True
+        if self.user_overridden_class or w_other.user_overridden_class:
+            return False
+        return self._str is w_other._str
+
+    def immutable_unique_id(self, space):
+        if self.user_overridden_class:
+            return None
+        # tagged, because '_str' may also be the string of a bytes object
+        b = rbigint.fromint(compute_unique_id(self._str))
+        b = b.lshift(3).or_(rbigint.fromint(IDTAG_ASCII_UNICODE))
+        return space.newlong_from_rbigint(b)
+
+    def unicode_w(self, space):
+        return self._str.decode('ascii')
+
+    def str_w(self, space):
+        return self.force().str_w(space)
+
+    def charbuf_w(self, space):
+        return self.force().charbuf_w(space)
+
+    def readbuf_w(self, space):
+        return self.force().readbuf_w(space)
+
+    def ord(self, space):
+        if len(self._str) != 1:
+            raise oefmt(space.w_TypeError,
+                         "ord() expected a character, but string of length %d "
+                         "found", len(self._str))
+        return space.wrap(ord(self._str[0]))
+
+    def descr_len(self, space):
+        return space.wrap(len(self._str))
+
+    def descr_hash(self, space):
+        # same hash as the W_UnicodeObject with the same characters
+        x = compute_hash(self._str)
+        return space.wrap(x)
+
+    def descr_eq(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str == other)
+        return self.force().descr_eq(space, w_other)
+
+    def descr_ne(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str != other)
+        return self.force().descr_ne(space, w_other)
+
+    def descr_lt(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str < other)
+        return self.force().descr_lt(space, w_other)
+
+    def descr_le(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str <= other)
+        return self.force().descr_le(space, w_other)
+
+    def descr_gt(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str > other)
+        return self.force().descr_gt(space, w_other)
+
+    def descr_ge(self, space, w_other):
+        other = _ascii_unicode_val(w_other)
+        if other is not None:
+            return space.newbool(self._str >= other)
+        return self.force().descr_ge(space, w_other)
+
+    def descr_contains(self, space, w_sub):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            return space.newbool(self._str.find(sub) >= 0)
+        return self.force().descr_contains(space, w_sub)
+
+    def descr_find(self, space, w_sub, w_start=None, w_end=None):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            s = self._str
+            start, end = unwrap_start_stop(space, len(s), w_start, w_end)
+            return space.wrap(s.find(sub, start, end))
+        return self.force().descr_find(space, w_sub, w_start, w_end)
+
+    def descr_rfind(self, space, w_sub, w_start=None, w_end=None):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            s = self._str
+            start, end = unwrap_start_stop(space, len(s), w_start, w_end)
+            return space.wrap(s.rfind(sub, start, end))
+        return self.force().descr_rfind(space, w_sub, w_start, w_end)
+
+    def descr_index(self, space, w_sub, w_start=None, w_end=None):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            s = self._str
+            start, end = unwrap_start_stop(space, len(s), w_start, w_end)
+            res = s.find(sub, start, end)
+            if res < 0:
+                raise oefmt(space.w_ValueError,
+                            "substring not found in string.index")
+            return space.wrap(res)
+        return self.force().descr_index(space, w_sub, w_start, w_end)
+
+    def descr_rindex(self, space, w_sub, w_start=None, w_end=None):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            s = self._str
+            start, end = unwrap_start_stop(space, len(s), w_start, w_end)
+            res = s.rfind(sub, start, end)
+            if res < 0:
+                raise oefmt(space.w_ValueError,
+                            "substring not found in string.rindex")
+            return space.wrap(res)
+        return self.force().descr_rindex(space, w_sub, w_start, w_end)
+
+    def descr_count(self, space, w_sub, w_start=None, w_end=None):
+        sub = _ascii_op_val(w_sub)
+        if sub is not None:
+            s = self._str
+            start, end = unwrap_start_stop(space, len(s), w_start, w_end)
+            return space.newint(s.count(sub, start, end))
+        return self.force().descr_count(space, w_sub, w_start, w_end)
+
+    def descr_startswith(self, space, w_prefix, w_start=None, w_end=None):
+        s = self._str
+        start, end = unwrap_start_stop(space, len(s), w_start, w_end, True)
+        if space.isinstance_w(w_prefix, space.w_tuple):
+            prefixes_w = space.fixedview(w_prefix)
+        else:
+            prefixes_w = [w_prefix]
+        for w_p in prefixes_w:
+            prefix = _ascii_op_val(w_p)
+            if prefix is None:
+                return self.force().descr_startswith(space, w_prefix,
+                                                     w_start, w_end)
+            if startswith(s, prefix, start, end):
+                return space.w_True
+        return space.w_False
+
+    def descr_endswith(self, space, w_suffix, w_start=None, w_end=None):
+        s = self._str
+        start, end = unwrap_start_stop(space, len(s), w_start, w_end, True)
+        if space.isinstance_w(w_suffix, space.w_tuple):
+            suffixes_w = space.fixedview(w_suffix)
+        else:
+            suffixes_w = [w_suffix]
+        for w_p in suffixes_w:
+            suffix = _ascii_op_val(w_p)
+            if suffix is None:
+                return self.force().descr_endswith(space, w_suffix,
+                                                   w_start, w_end)
+            if endswith(s, suffix, start, end):
+                return space.w_True
+        return space.w_False
+
+    def _newlist(self, space, lst):
+        return space.newlist([W_ASCIIUnicodeObject(x) for x in lst])
+
+    @unwrap_spec(maxsplit=int)
+    def descr_split(self, space, w_sep=None, maxsplit=-1):
+        if space.is_none(w_sep):
+            return self._newlist(space,
+                                 _split_whitespace(self._str, maxsplit, False))
+        by = _ascii_op_val(w_sep)
+        if by is None:
+            return self.force().descr_split(space, w_sep, maxsplit)
+        if len(by) == 0:
+            raise oefmt(space.w_ValueError, "empty separator")
+        return self._newlist(space, split(self._str, by, maxsplit))
+
+    @unwrap_spec(maxsplit=int)
+    def descr_rsplit(self, space, w_sep=None, maxsplit=-1):
+        if space.is_none(w_sep):
+            return self._newlist(space,
+                                 _split_whitespace(self._str, maxsplit, True))
+        by = _ascii_op_val(w_sep)
+        if by is None:
+            return self.force().descr_rsplit(space, w_sep, maxsplit)
+        if len(by) == 0:
+            raise oefmt(space.w_ValueError, "empty separator")
+        return self._newlist(space, rsplit(self._str, by, maxsplit))
+
+    def _strip(self, space, w_chars, left, right):
+        s = self._str
+        if space.is_none(w_chars):
+            chars = None
+        else:
+            chars = _ascii_op_val(w_chars)
+            if chars is None:
+                w_forced = self.force()
+                if left and right:
+                    return w_forced.descr_strip(space, w_chars)
+                elif left:
+                    return w_forced.descr_lstrip(space, w_chars)
+                else:
+                    return w_forced.descr_rstrip(space, w_chars)
+        lpos = 0
+        rpos = len(s)
+        if left:
+            while lpos < rpos and (_isspace(s[lpos]) if chars is None
+                                   else s[lpos] in chars):
+                lpos += 1
+        if right:
+            while rpos > lpos and (_isspace(s[rpos - 1]) if chars is None
+                                   else s[rpos - 1] in chars):
+                rpos -= 1
+        assert rpos >= lpos    # annotator hint, don't remove
+        if lpos == 0 and rpos == len(s):
+            return self
+        return W_ASCIIUnicodeObject(s[lpos:rpos])
+
+    def descr_strip(self, space, w_chars=None):
+        return self._strip(space, w_chars, left=1, right=1)
+
+    def descr_lstrip(self, space, w_chars=None):
+        return self._strip(space, w_chars, left=1, right=0)
+
+    def descr_rstrip(self, space, w_chars=None):
+        return self._strip(space, w_chars, left=0, right=1)
+
+    def descr_lower(self, space):
+        return W_ASCIIUnicodeObject(self._str.lower())
+
+    def descr_upper(self, space):
+        return W_ASCIIUnicodeObject(self._str.upper())
+
+    @specialize.arg(2)
+    def _is_generic(self, space, func):
+        s = self._str
+        if len(s) == 0:
+            return space.w_False
+        for c in s:
+            if not func(ord(c)):
+                return space.w_False
+        return space.w_True
+
+    def descr_isalnum(self, space):
+        return self._is_generic(space, unicodedb.isalnum)
+
+    def descr_isalpha(self, space):
+        return self._is_generic(space, unicodedb.isalpha)
+
+    def descr_isdigit(self, space):
+        return self._is_generic(space, unicodedb.isdigit)
+
+    def descr_isdecimal(self, space):
+        return self._is_generic(space, unicodedb.isdecimal)
+
+    def descr_isnumeric(self, space):
+        return self._is_generic(space, unicodedb.isnumeric)
+
+    def descr_isspace(self, space):
+        return self._is_generic(space, unicodedb.isspace)
+
+    def descr_islower(self, space):
+        cased = False
+        for c in self._str:
+            if 'A' <= c <= 'Z':
+                return space.w_False
+            if 'a' <= c <= 'z':
+                cased = True
+        return space.newbool(cased)
+
+    def descr_isupper(self, space):
+        cased = False
+        for c in self._str:
+            if 'a' <= c <= 'z':
+                return space.w_False
+            if 'A' <= c <= 'Z':
+                cased = True
+        return space.newbool(cased)
+
+    def descr_add(self, space, w_other):
+        if isinstance(w_other, W_ASCIIUnicodeObject):
+            return W_ASCIIUnicodeObject(self._str + w_other._str)
+        return self.force().descr_add(space, w_other)
+
+    def descr_getitem(self, space, w_index):
+        s = self._str
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, len(s))
+            if sl == 0:
+                return W_UnicodeObject.EMPTY
+            elif step == 1:
+                assert start >= 0 and stop >= 0
+                return W_ASCIIUnicodeObject(s[start:stop])
+            return self.force().descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        if index < 0:
+            index += len(s)
+        if not 0 <= index < len(s):
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return W_ASCIIUnicodeObject(s[index])
+
+    def descr_getslice(self, space, w_start, w_stop):
+        s = self._str
+        start, stop = normalize_simple_slice(space, len(s), w_start, w_stop)
+        if start == stop:
+            return W_UnicodeObject.EMPTY
+        assert start >= 0 and stop >= 0
+        return W_ASCIIUnicodeObject(s[start:stop])
+
+    def descr_str(self, space):
+        return encode_object(space, self, None, None)
+
+    def descr_encode(self, space, w_encoding=None, w_errors=None):
+        encoding, errors = _get_encoding_and_errors(space, w_encoding,
+                                                    w_errors)
+        return encode_object(space, self, encoding, errors)
+
+
+delegate_to_forced(W_ASCIIUnicodeObject, W_UnicodeObject, None,
+                   ('__new__', '__len__', '__hash__', '__eq__', '__ne__',
+                    '__lt__', '__le__', '__gt__', '__ge__', '__contains__',
+                    '__add__', '__getitem__', '__getslice__', '__str__',
+                    'encode', 'find', 'rfind', 'index', 'rindex', 'count',
+                    'startswith', 'endswith', 'split', 'rsplit', 'strip',
+                    'lstrip', 'rstrip', 'lower', 'upper', 'isalnum',
+                    'isalpha', 'isdigit', 'isdecimal', 'isnumeric',
+                    'isspace', 'islower', 'isupper'))
+W_ASCIIUnicodeObject.typedef = W_UnicodeObject.typedef
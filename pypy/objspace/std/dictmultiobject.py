@@ -2,7 +2,10 @@
 
 from rpython.rlib import jit, rerased, objectmodel
 from rpython.rlib.debug import mark_dict_non_null
-from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
+from collections import OrderedDict
+from rpython.rlib.objectmodel import newlist_hint, r_ordereddict, specialize
+from rpython.rlib.rarithmetic import ovfcheck_float_to_int
+from rpython.rlib.rfloat import isnan
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -12,6 +15,8 @@ from pypy.interpreter.gateway import (
 from pypy.interpreter.mixedmodule import MixedModule
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
+from pypy.objspace.std.specialisedtupleobject import Cls_ii
+from pypy.objspace.std.tupleobject import W_AbstractTupleObject
 from pypy.objspace.std.util import negate
 
 
@@ -42,6 +47,10 @@ def w_dict_unrolling_heuristic(w_dct):
 
 
 class W_DictMultiObject(W_Root):
+    # True if the storage may be shared with another dict (only with the
+    # withcopyonwrite option).  It is copied before the next mutation.
+    dstorage_shared = False
+
     @staticmethod
     def allocate_and_init_instance(space, w_type=None, module=False,
                                    instance=False, strdict=False,
@@ -101,8 +110,34 @@ class W_DictMultiObject(W_Root):
             self.setitem(w_k, w_v)
 
     def setitem_str(self, key, w_value):
+        self.unshare_storage()
         self.strategy.setitem_str(self, key, w_value)
 
+    def share_storage_with(self, w_other):
+        """Make w_other use the same strategy and storage as self, marking
+        both dicts so that the storage is copied on the next mutation."""
+        w_other.strategy = self.strategy
+        w_other.dstorage = self.dstorage
+        self.dstorage_shared = True
+        w_other.dstorage_shared = True
+
+    def unshare_storage(self):
+        """Called before every mutation: if the storage may be shared with
+        another dict, replace it with a private copy."""
+        if self.dstorage_shared:
+            self.dstorage = self.strategy.get_storage_copy(self)
+            self.dstorage_shared = False
+
+    def clear(self):
+        if self.dstorage_shared:
+            # don't copy the shared storage just to empty it
+            strategy = self.space.fromcache(EmptyDictStrategy)
+            self.strategy = strategy
+            self.dstorage = strategy.get_empty_storage()
+            self.dstorage_shared = False
+            return
+        self.strategy.clear(self)
+
     @staticmethod
     def descr_new(space, w_dicttype, __args__):
         w_obj = W_DictMultiObject.allocate_and_init_instance(space, w_dicttype)
@@ -338,12 +373,12 @@ class W_DictMultiObject(W_Root):
 
 
 def _add_indirections():
-    dict_methods = "getitem getitem_str setitem setdefault \
-                    popitem delitem clear \
+    dict_methods = "getitem getitem_str \
                     length w_keys values items \
                     iterkeys itervalues iteritems \
                     listview_bytes listview_unicode listview_int \
                     view_as_kwargs".split()
+    mutating_dict_methods = "setitem setdefault popitem delitem".split()
 
     def make_method(method):
         def f(self, *args):
@@ -351,8 +386,17 @@ def _add_indirections():
         f.func_name = method
         return f
 
+    def make_mutating_method(method):
+        def f(self, *args):
+            self.unshare_storage()
+            return getattr(self.strategy, method)(self, *args)
+        f.func_name = method
+        return f
+
     for method in dict_methods:
         setattr(W_DictMultiObject, method, make_method(method))
+    for method in mutating_dict_methods:
+        setattr(W_DictMultiObject, method, make_mutating_method(method))
 
 _add_indirections()
 
@@ -528,6 +572,13 @@ class DictStrategy(object):
     def prepare_update(self, w_dict, num_extra):
         pass
 
+    # strategies whose storage is a plain (r_)dict can be shared between
+    # copies of a dict with the withcopyonwrite option
+    can_share_storage = False
+
+    def get_storage_copy(self, w_dict):
+        raise NotImplementedError
+
 
 class EmptyDictStrategy(DictStrategy):
     erase, unerase = rerased.new_erasing_pair("empty")
@@ -548,6 +599,10 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.fromcache(FloatDictStrategy).is_correct_type(w_key):
+            self.switch_to_float_strategy(w_dict)
+        elif self.space.fromcache(IntPairDictStrategy).is_correct_type(w_key):
+            self.switch_to_int_pair_strategy(w_dict)
         elif withidentitydict and w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -571,6 +626,18 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.strategy = strategy
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
+    def switch_to_int_pair_strategy(self, w_dict):
+        strategy = self.space.fromcache(IntPairDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -662,21 +729,30 @@ def _new_next(TP):
         if self.pos < self.len:
             result = getattr(self, 'next_' + TP + '_entry')()
             self.pos += 1
-            if self.strategy is self.dictimplementation.strategy:
+            if (self.strategy is self.dictimplementation.strategy and
+                    self.dstorage is self.dictimplementation.dstorage):
                 return result      # common case
             else:
-                # waaa, obscure case: the strategy changed, but not the
-                # length of the dict.  The (key, value) pair in 'result'
-                # might be out-of-date.  We try to explicitly look up
-                # the key in the dict.
-                if TP == 'key' or TP == 'value':
+                # waaa, obscure case: the strategy changed, or the storage
+                # was replaced (e.g. a shared storage that has been copied
+                # before a mutation), but not the length of the dict.  The
+                # value in 'result' might be out-of-date.  We try to
+                # explicitly look up the key in the dict.
+                if TP == 'key':
                     return result
-                w_key = result[0]
+                if TP == 'value':
+                    w_key = self.current_key()
+                    if w_key is None:
+                        return result
+                else:
+                    w_key = result[0]
                 w_value = self.dictimplementation.getitem(w_key)
                 if w_value is None:
                     self.len = -1   # Make this error state sticky
                     raise oefmt(space.w_RuntimeError,
                                 "dictionary changed during iteration")
+                if TP == 'value':
+                    return w_value
                 return (w_key, w_value)
         # no more entries
         self.dictimplementation = None
@@ -689,6 +765,7 @@ class BaseIteratorImplementation(object):
         self.space = space
         self.strategy = strategy
         self.dictimplementation = implementation
+        self.dstorage = implementation.dstorage
         self.len = implementation.length()
         self.pos = 0
 
@@ -707,6 +784,10 @@ class BaseKeyIterator(BaseIteratorImplementation):
 class BaseValueIterator(BaseIteratorImplementation):
     next_value = _new_next('value')
 
+    def current_key(self):
+        # the key of the value last returned, if the iterator knows it
+        return None
+
 class BaseItemIterator(BaseIteratorImplementation):
     next_item = _new_next('item')
 
@@ -738,16 +819,36 @@ def create_iterator_classes(dictimpl, override_next_item=None):
             else:
                 return None
 
-    class IterClassValues(BaseValueIterator):
-        def __init__(self, space, strategy, impl):
-            self.iterator = strategy.getitervalues(impl)
-            BaseIteratorImplementation.__init__(self, space, strategy, impl)
+    if dictimpl.can_share_storage:
+        # iterate over the items, to be able to look up the value again
+        # if the storage is copied in the middle of the iteration
+        class IterClassValues(BaseValueIterator):
+            def __init__(self, space, strategy, impl):
+                self.iterator = strategy.getiteritems(impl)
+                BaseIteratorImplementation.__init__(self, space, strategy,
+                                                    impl)
 
-        def next_value_entry(self):
-            for value in self.iterator:
-                return wrapvalue(self.space, value)
-            else:
-                return None
+            def next_value_entry(self):
+                for key, value in self.iterator:
+                    self.last_key = key
+                    return wrapvalue(self.space, value)
+                else:
+                    return None
+
+            def current_key(self):
+                return wrapkey(self.space, self.last_key)
+    else:
+        class IterClassValues(BaseValueIterator):
+            def __init__(self, space, strategy, impl):
+                self.iterator = strategy.getitervalues(impl)
+                BaseIteratorImplementation.__init__(self, space, strategy,
+                                                    impl)
+
+            def next_value_entry(self):
+                for value in self.iterator:
+                    return wrapvalue(self.space, value)
+                else:
+                    return None
 
     class IterClassItems(BaseItemIterator):
         def __init__(self, space, strategy, impl):
@@ -832,6 +933,7 @@ def create_iterator_classes(dictimpl, override_next_item=None):
                     return     # done
             else:
                 # Same strategy.
+                w_updatedict.unshare_storage()
                 self.prepare_update(w_updatedict, w_dict.length())
             #
             # Use setitem_untyped() to speed up copying without
@@ -856,6 +958,12 @@ create_iterator_classes(EmptyDictStrategy)
 # concrete subclasses of the above
 
 class AbstractTypedStrategy(object):
+    # The storage created by get_empty_storage() is an ordered dict, which
+    # the rtyper turns into the compact rordereddict layout (a small array
+    # of indexes into dense entries) rather than the sparse rdict one.
+    # Apart from giving insertion order, this makes all but the smallest
+    # dicts use much less memory and makes iteration walk the live
+    # entries only.
     _mixin_ = True
 
     @staticmethod
@@ -976,6 +1084,11 @@ class AbstractTypedStrategy(object):
     def setitem_untyped(self, dstorage, key, w_value):
         self.unerase(dstorage)[key] = w_value
 
+    can_share_storage = True
+
+    def get_storage_copy(self, w_dict):
+        return self.erase(self.unerase(w_dict.dstorage).copy())
+
 
 class ObjectDictStrategy(AbstractTypedStrategy, DictStrategy):
     erase, unerase = rerased.new_erasing_pair("object")
@@ -992,8 +1105,8 @@ class ObjectDictStrategy(AbstractTypedStrategy, DictStrategy):
         return True
 
     def get_empty_storage(self):
-        new_dict = r_dict(self.space.eq_w, self.space.hash_w,
-                          force_non_null=True)
+        new_dict = r_ordereddict(self.space.eq_w, self.space.hash_w,
+                                 force_non_null=True)
         return self.erase(new_dict)
 
     def _never_equal_to(self, w_lookup_type):
@@ -1027,7 +1140,7 @@ class BytesDictStrategy(AbstractTypedStrategy, DictStrategy):
         return space.is_w(space.type(w_obj), space.w_str)
 
     def get_empty_storage(self):
-        res = {}
+        res = OrderedDict()
         mark_dict_non_null(res)
         return self.erase(res)
 
@@ -1091,7 +1204,7 @@ class UnicodeDictStrategy(AbstractTypedStrategy, DictStrategy):
         return space.is_w(space.type(w_obj), space.w_unicode)
 
     def get_empty_storage(self):
-        res = {}
+        res = OrderedDict()
         mark_dict_non_null(res)
         return self.erase(res)
 
@@ -1153,7 +1266,7 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
         return self.space.int_w(wrapped)
 
     def get_empty_storage(self):
-        return self.erase({})
+        return self.erase(OrderedDict())
 
     def is_correct_type(self, w_obj):
         space = self.space
@@ -1179,6 +1292,127 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.wrap(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase(OrderedDict())
+
+    def is_correct_type(self, w_obj):
+        # NaNs are not equal to themselves, so they could not be found
+        # again in an unwrapped dict: they need the object strategy
+        space = self.space
+        return (space.is_w(space.type(w_obj), space.w_float) and
+                not isnan(space.float_w(w_obj)))
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_str) or
+                space.is_w(w_lookup_type, space.w_unicode) or
+                space.is_w(w_lookup_type, space.w_tuple)
+                )
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if space.is_w(space.type(w_key), space.w_int):
+            # an int can only be equal to the float with the same value,
+            # so look that float up instead of switching to ObjectDictStrategy
+            intval = space.int_w(w_key)
+            floatval = float(intval)
+            try:
+                exact = ovfcheck_float_to_int(floatval) == intval
+            except OverflowError:
+                exact = False
+            if not exact:
+                return None
+            return self.unerase(w_dict.dstorage).get(floatval, None)
+        return self._base_getitem(w_dict, w_key)
+
+    _base_getitem = func_with_new_name(AbstractTypedStrategy.getitem.im_func,
+                                       'float_base_getitem')
+
+    def wrapkey(space, key):
+        return space.wrap(key)
+
+create_iterator_classes(FloatDictStrategy)
+
+
+class IntPairDictStrategy(AbstractTypedStrategy, DictStrategy):
+    """Strategy for keys that are tuples of two ints, as used for sparse
+    matrices or graph edges.  The keys are stored as RPython tuples, so
+    lookups don't need space.hash_w() and space.eq_w()."""
+    erase, unerase = rerased.new_erasing_pair("intpair")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        space = self.space
+        x, y = unwrapped
+        return space.newtuple([space.wrap(x), space.wrap(y)])
+
+    def unwrap(self, wrapped):
+        if type(wrapped) is Cls_ii:
+            return (wrapped.value0, wrapped.value1)
+        space = self.space
+        assert isinstance(wrapped, W_AbstractTupleObject)
+        return (space.int_w(wrapped.getitem(space, 0)),
+                space.int_w(wrapped.getitem(space, 1)))
+
+    def get_empty_storage(self):
+        return self.erase(OrderedDict())
+
+    def is_correct_type(self, w_obj):
+        if type(w_obj) is Cls_ii:
+            return True
+        space = self.space
+        if not space.is_w(space.type(w_obj), space.w_tuple):
+            return False
+        assert isinstance(w_obj, W_AbstractTupleObject)
+        return (w_obj.length() == 2 and
+                space.is_w(space.type(w_obj.getitem(space, 0)), space.w_int)
+                and
+                space.is_w(space.type(w_obj.getitem(space, 1)), space.w_int))
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_str) or
+                space.is_w(w_lookup_type, space.w_unicode) or
+                space.is_w(w_lookup_type, space.w_int) or
+                space.is_w(w_lookup_type, space.w_float)
+                )
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if self.is_correct_type(w_key):
+            return self.unerase(w_dict.dstorage).get(self.unwrap(w_key), None)
+        if space.is_w(space.type(w_key), space.w_tuple):
+            assert isinstance(w_key, W_AbstractTupleObject)
+            if w_key.length() != 2:
+                return None     # tuples of other lengths are never equal
+        return self._base_getitem(w_dict, w_key)
+
+    _base_getitem = func_with_new_name(AbstractTypedStrategy.getitem.im_func,
+                                       'intpair_base_getitem')
+
+    def wrapkey(space, key):
+        x, y = key
+        return space.newtuple([space.wrap(x), space.wrap(y)])
+
+create_iterator_classes(IntPairDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
@@ -1195,6 +1429,12 @@ def update1(space, w_dict, w_data):
 
 
 def update1_dict_dict(space, w_dict, w_data):
+    if (space.config.objspace.std.withcopyonwrite and
+            w_data.strategy.can_share_storage and
+            w_dict.strategy is space.fromcache(EmptyDictStrategy)):
+        # copying into an empty dict, e.g. for copy() or dict(d)
+        w_data.share_storage_with(w_dict)
+        return
     w_data.strategy.rev_update1_dict_dict(w_data, w_dict)
 
 
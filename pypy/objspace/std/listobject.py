@@ -10,10 +10,11 @@ http://morepypy.blogspot.com/2011/10/more-compact-lists-with-list-strategies.htm
 import operator
 import sys
 
-from rpython.rlib import debug, jit, rerased
+from rpython.rlib import debug, jit, rerased, longlong2float
 from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.objectmodel import (
     import_from_mixin, instantiate, newlist_hint, resizelist_hint, specialize)
+from rpython.rlib.unroll import unrolling_iterable
 from rpython.tool.sourcetools import func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -30,6 +31,7 @@ from pypy.objspace.std.iterobject import (
     W_FastListIterObject, W_ReverseSeqIterObject)
 from pypy.objspace.std.sliceobject import (
     W_SliceObject, normalize_simple_slice, unwrap_start_stop)
+from pypy.objspace.std import specialisedtupleobject
 from pypy.objspace.std.tupleobject import W_AbstractTupleObject
 from pypy.objspace.std.unicodeobject import W_UnicodeObject
 from pypy.objspace.std.util import get_positive_index, negate
@@ -101,6 +103,23 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
     else:
         return space.fromcache(FloatListStrategy)
 
+    # check for specialised tuples of ints or of floats
+    strategy = get_specialised_tuple_list_strategy(space, list_w[0])
+    if strategy is not None:
+        for w_obj in list_w:
+            if not strategy.is_correct_type(w_obj):
+                break
+        else:
+            return strategy
+
+    # check for a mix of small ints and floats
+    int_or_float_strategy = space.fromcache(IntOrFloatListStrategy)
+    for w_obj in list_w:
+        if not int_or_float_strategy.is_correct_type(w_obj):
+            break
+    else:
+        return int_or_float_strategy
+
     return space.fromcache(ObjectListStrategy)
 
 
@@ -143,6 +162,9 @@ def list_unroll_condition(w_list1, space, w_list2):
 
 class W_ListObject(W_Root):
     strategy = None
+    # True if the storage may be shared with another list (only with the
+    # withcopyonwrite option).  It is copied before the next mutation.
+    lstorage_shared = False
 
     def __init__(self, space, wrappeditems, sizehint=-1):
         assert isinstance(wrappeditems, list)
@@ -182,6 +204,12 @@ class W_ListObject(W_Root):
         storage = strategy.erase(list_i)
         return W_ListObject.from_storage_and_strategy(space, storage, strategy)
 
+    @staticmethod
+    def newlist_float(space, list_f):
+        strategy = space.fromcache(FloatListStrategy)
+        storage = strategy.erase(list_f)
+        return W_ListObject.from_storage_and_strategy(space, storage, strategy)
+
     def __repr__(self):
         """ representation for debugging purposes """
         return "%s(%s, %s)" % (self.__class__.__name__, self.strategy,
@@ -214,6 +242,7 @@ class W_ListObject(W_Root):
         """Initializes listobject by iterating through the given list of
         wrapped items, unwrapping them if neccessary and creating a
         new erased object as storage"""
+        self.lstorage_shared = False
         self.strategy.init_from_list_w(self, list_w)
 
     def clear(self, space):
@@ -224,6 +253,7 @@ class W_ListObject(W_Root):
         else:
             strategy = space.fromcache(ObjectListStrategy)
         self.strategy = strategy
+        self.lstorage_shared = False
         strategy.clear(self)
 
     def clone(self):
@@ -231,6 +261,21 @@ class W_ListObject(W_Root):
         with the same strategy and a copy of the storage"""
         return self.strategy.clone(self)
 
+    def share_storage_with(self, w_other):
+        """Make w_other use the same strategy and storage as self, marking
+        both lists so that the storage is copied on the next mutation."""
+        w_other.strategy = self.strategy
+        w_other.lstorage = self.lstorage
+        self.lstorage_shared = True
+        w_other.lstorage_shared = True
+
+    def unshare_storage(self):
+        """Called before every mutation: if the storage may be shared with
+        another list, replace it with a private copy."""
+        if self.lstorage_shared:
+            self.lstorage = self.strategy.getstorage_copy(self)
+            self.lstorage_shared = False
+
     def _resize_hint(self, hint):
         """Ensure the underlying list has room for at least hint
         elements without changing the len() of the list"""
@@ -247,6 +292,7 @@ class W_ListObject(W_Root):
 
     def append(self, w_item):
         """L.append(object) -- append object to end"""
+        self.unshare_storage()
         self.strategy.append(self, w_item)
 
     def length(self):
@@ -315,50 +361,60 @@ class W_ListObject(W_Root):
 
     def inplace_mul(self, times):
         """Alters the list by multiplying its content by times."""
+        self.unshare_storage()
         self.strategy.inplace_mul(self, times)
 
     def deleteslice(self, start, step, length):
         """Deletes a slice from the list. Used in delitem and delslice.
         Arguments must be normalized (see getslice)."""
+        self.unshare_storage()
         self.strategy.deleteslice(self, start, step, length)
 
     def pop(self, index):
         """Pops an item from the list. Index must be normalized.
         May raise IndexError."""
+        self.unshare_storage()
         return self.strategy.pop(self, index)
 
     def pop_end(self):
         """ Pop the last element from the list."""
+        self.unshare_storage()
         return self.strategy.pop_end(self)
 
     def setitem(self, index, w_item):
         """Inserts a wrapped item at the given (unwrapped) index.
         May raise IndexError."""
+        self.unshare_storage()
         self.strategy.setitem(self, index, w_item)
 
     def setslice(self, start, step, slicelength, sequence_w):
         """Sets the slice of the list from start to start+step*slicelength to
         the sequence sequence_w.
         Used by setslice and setitem."""
+        self.unshare_storage()
         self.strategy.setslice(self, start, step, slicelength, sequence_w)
 
     def insert(self, index, w_item):
         """Inserts an item at the given position. Item must be wrapped,
         index not."""
+        self.unshare_storage()
         self.strategy.insert(self, index, w_item)
 
     def extend(self, w_iterable):
         '''L.extend(iterable) -- extend list by appending
         elements from the iterable'''
+        self.unshare_storage()
         self.strategy.extend(self, w_iterable)
 
     def reverse(self):
         """Reverses the list."""
+        self.unshare_storage()
         self.strategy.reverse(self)
 
     def sort(self, reverse):
         """Sorts the list ascending or descending depending on
         argument reverse. Argument must be unwrapped."""
+        self.unshare_storage()
         self.strategy.sort(self, reverse)
 
     # exposed to app-level
@@ -666,6 +722,8 @@ class W_ListObject(W_Root):
                     self.sort(reverse)
                     return
 
+        # the items are sorted in place
+        self.unshare_storage()
         sorter = sorterclass(self.getitems(), self.length())
         sorter.space = space
         sorter.w_cmp = w_cmp
@@ -840,6 +898,12 @@ class ListStrategy(object):
     def is_empty_strategy(self):
         return False
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        """Switch w_list away from this strategy because w_sample_item
+        cannot be stored in it.  The default is to use the object strategy,
+        but some strategies can switch to a more general unboxed one."""
+        w_list.switch_to_object_strategy()
+
 
 class EmptyListStrategy(ListStrategy):
     """EmptyListStrategy is used when a W_List withouth elements is created.
@@ -911,7 +975,9 @@ class EmptyListStrategy(ListStrategy):
         elif type(w_item) is W_FloatObject:
             strategy = self.space.fromcache(FloatListStrategy)
         else:
-            strategy = self.space.fromcache(ObjectListStrategy)
+            strategy = get_specialised_tuple_list_strategy(self.space, w_item)
+            if strategy is None:
+                strategy = self.space.fromcache(ObjectListStrategy)
 
         storage = strategy.get_empty_storage(self.get_sizehint())
         w_list.strategy = strategy
@@ -1311,6 +1377,9 @@ class AbstractUnwrappedStrategy(object):
         resizelist_hint(self.unerase(w_list.lstorage), hint)
 
     def copy_into(self, w_list, w_other):
+        if self.space.config.objspace.std.withcopyonwrite:
+            w_list.share_storage_with(w_other)
+            return
         w_other.strategy = self
         items = self.unerase(w_list.lstorage)[:]
         w_other.lstorage = self.erase(items)
@@ -1362,6 +1431,12 @@ class AbstractUnwrappedStrategy(object):
     def getslice(self, w_list, start, stop, step, length):
         if step == 1 and 0 <= start <= stop:
             l = self.unerase(w_list.lstorage)
+            if (start == 0 and stop == len(l) and
+                    self.space.config.objspace.std.withcopyonwrite):
+                w_copy = W_ListObject.from_storage_and_strategy(
+                        self.space, w_list.lstorage, self)
+                w_list.share_storage_with(w_copy)
+                return w_copy
             assert start >= 0
             assert stop >= 0
             sublist = l[start:stop]
@@ -1386,7 +1461,7 @@ class AbstractUnwrappedStrategy(object):
             self.unerase(w_list.lstorage).append(self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.append(w_item)
 
     def insert(self, w_list, index, w_item):
@@ -1396,7 +1471,7 @@ class AbstractUnwrappedStrategy(object):
             l.insert(index, self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.insert(index, w_item)
 
     def _extend_from_list(self, w_list, w_other):
@@ -1420,7 +1495,7 @@ class AbstractUnwrappedStrategy(object):
             except IndexError:
                 raise
         else:
-            w_list.switch_to_object_strategy()
+            self.switch_to_next_strategy(w_list, w_item)
             w_list.setitem(index, w_item)
 
     def setslice(self, w_list, start, step, slicelength, w_other):
@@ -1617,6 +1692,35 @@ class IntegerListStrategy(ListStrategy):
     def getitems_int(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        if type(w_sample_item) is W_FloatObject:
+            if self.switch_to_int_or_float_strategy(w_list):
+                # if w_sample_item happens to be the one NaN that cannot
+                # be stored there, IntOrFloatListStrategy will switch again
+                return
+        w_list.switch_to_object_strategy()
+
+    def switch_to_int_or_float_strategy(self, w_list):
+        """Try to switch w_list to IntOrFloatListStrategy.  Fails and
+        returns False if one of the ints does not fit in 32 bits."""
+        try:
+            longlong_list = self.int_2_float_or_int(w_list)
+        except ValueError:
+            return False
+        strategy = self.space.fromcache(IntOrFloatListStrategy)
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase(longlong_list)
+        return True
+
+    def int_2_float_or_int(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        result = newlist_hint(len(l))
+        for intval in l:
+            if not longlong2float.can_encode_int32(intval):
+                raise ValueError
+            result.append(longlong2float.encode_int32_into_longlong_nan(intval))
+        return result
+
 
     _base_extend_from_list = _extend_from_list
 
@@ -1627,6 +1731,12 @@ class IntegerListStrategy(ListStrategy):
             assert other is not None
             l += other
             return
+        if (w_other.strategy is self.space.fromcache(FloatListStrategy) or
+                w_other.strategy is
+                    self.space.fromcache(IntOrFloatListStrategy)):
+            if self.switch_to_int_or_float_strategy(w_list):
+                w_list.extend(w_other)
+                return
         return self._base_extend_from_list(w_list, w_other)
 
 
@@ -1670,6 +1780,130 @@ class FloatListStrategy(ListStrategy):
     def getitems_float(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        if type(w_sample_item) is W_IntObject:
+            intval = self.space.int_w(w_sample_item)
+            if longlong2float.can_encode_int32(intval):
+                if self.switch_to_int_or_float_strategy(w_list):
+                    return
+        w_list.switch_to_object_strategy()
+
+    def switch_to_int_or_float_strategy(self, w_list):
+        """Try to switch w_list to IntOrFloatListStrategy.  Fails and
+        returns False if one of the floats is the NaN used to box ints."""
+        try:
+            longlong_list = self.float_2_float_or_int(w_list)
+        except ValueError:
+            return False
+        strategy = self.space.fromcache(IntOrFloatListStrategy)
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase(longlong_list)
+        return True
+
+    def float_2_float_or_int(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        result = newlist_hint(len(l))
+        for floatval in l:
+            if not longlong2float.can_encode_float(floatval):
+                raise ValueError
+            result.append(longlong2float.float2longlong(floatval))
+        return result
+
+    _base_extend_from_list = _extend_from_list
+
+    def _extend_from_list(self, w_list, w_other):
+        if (w_other.strategy is self.space.fromcache(IntegerListStrategy) or
+                w_other.strategy is
+                    self.space.fromcache(IntOrFloatListStrategy)):
+            if self.switch_to_int_or_float_strategy(w_list):
+                w_list.extend(w_other)
+                return
+        return self._base_extend_from_list(w_list, w_other)
+
+
+class IntOrFloatListStrategy(ListStrategy):
+    """Stores a mix of ints and floats unboxed.  Each item is an r_int64:
+    either the bits of a float, or a 32-bit int encoded inside a
+    nonstandard NaN (see rpython.rlib.longlong2float).  This avoids
+    falling back to ObjectListStrategy for numeric lists like [1, 2.5]."""
+    import_from_mixin(AbstractUnwrappedStrategy)
+
+    _none_value = longlong2float.float2longlong(0.0)
+
+    def wrap(self, llval):
+        if longlong2float.is_int32_from_longlong_nan(llval):
+            intval = longlong2float.decode_int32_from_longlong_nan(llval)
+            return self.space.wrap(intval)
+        else:
+            floatval = longlong2float.longlong2float(llval)
+            return self.space.wrap(floatval)
+
+    def unwrap(self, w_int_or_float):
+        if type(w_int_or_float) is W_IntObject:
+            intval = self.space.int_w(w_int_or_float)
+            return longlong2float.encode_int32_into_longlong_nan(intval)
+        else:
+            floatval = self.space.float_w(w_int_or_float)
+            return longlong2float.float2longlong(floatval)
+
+    erase, unerase = rerased.new_erasing_pair("longlong")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def is_correct_type(self, w_obj):
+        if type(w_obj) is W_IntObject:
+            intval = self.space.int_w(w_obj)
+            return longlong2float.can_encode_int32(intval)
+        elif type(w_obj) is W_FloatObject:
+            floatval = self.space.float_w(w_obj)
+            return longlong2float.can_encode_float(floatval)
+        else:
+            return False
+
+    def list_is_correct_type(self, w_list):
+        return w_list.strategy is self.space.fromcache(IntOrFloatListStrategy)
+
+    def sort(self, w_list, reverse):
+        l = self.unerase(w_list.lstorage)
+        sorter = IntOrFloatSort(l, len(l))
+        sorter.sort()
+        if reverse:
+            l.reverse()
+
+    def _safe_find(self, w_list, obj, start, stop):
+        l = self.unerase(w_list.lstorage)
+        # careful: 0.0 == -0.0 and 42 == 42.0, although their encodings
+        # differ; as in FloatListStrategy, NaN is never found
+        fobj = longlong2float.maybe_decode_longlong_as_float(obj)
+        for i in range(start, min(stop, len(l))):
+            fval = longlong2float.maybe_decode_longlong_as_float(l[i])
+            if fval == fobj:
+                return i
+        raise ValueError
+
+    _base_extend_from_list = _extend_from_list
+
+    def _extend_from_list(self, w_list, w_other):
+        if w_other.strategy is self.space.fromcache(IntegerListStrategy):
+            try:
+                strategy = self.space.fromcache(IntegerListStrategy)
+                longlong_list = strategy.int_2_float_or_int(w_other)
+            except ValueError:
+                pass
+            else:
+                self.unerase(w_list.lstorage).extend(longlong_list)
+                return
+        elif w_other.strategy is self.space.fromcache(FloatListStrategy):
+            try:
+                strategy = self.space.fromcache(FloatListStrategy)
+                longlong_list = strategy.float_2_float_or_int(w_other)
+            except ValueError:
+                pass
+            else:
+                self.unerase(w_list.lstorage).extend(longlong_list)
+                return
+        return self._base_extend_from_list(w_list, w_other)
+
 
 class BytesListStrategy(ListStrategy):
     import_from_mixin(AbstractUnwrappedStrategy)
@@ -1734,6 +1968,283 @@ class UnicodeListStrategy(ListStrategy):
     def getitems_unicode(self, w_list):
         return self.unerase(w_list.lstorage)
 
+
+def make_specialised_tuple_list_strategy(tuplecls):
+    """Build a strategy for lists whose items are all instances of the
+    given specialised tuple class (see specialisedtupleobject.py).  The
+    fields of the tuples are stored unboxed as one RPython list per field
+    ("struct of arrays"); the tuple objects are only rebuilt on access."""
+    typetuple = tuplecls.typetuple
+    assert object not in typetuple
+    typelen = len(typetuple)
+    iter_n = unrolling_iterable(range(typelen))
+    name = ''.join([t.__name__[0] for t in typetuple])
+
+    class Columns(object):
+        def __init__(self, sizehint):
+            if sizehint < 0:
+                sizehint = 0
+            for i in iter_n:
+                setattr(self, 'col%s' % i, newlist_hint(sizehint))
+
+        def length(self):
+            return len(self.col0)
+
+        def copy(self):
+            result = Columns(0)
+            for i in iter_n:
+                setattr(result, 'col%s' % i, getattr(self, 'col%s' % i)[:])
+            return result
+
+        def append_tuple(self, w_tuple):
+            assert isinstance(w_tuple, tuplecls)
+            for i in iter_n:
+                getattr(self, 'col%s' % i).append(
+                    getattr(w_tuple, 'value%s' % i))
+
+        def lt(self, a, b):
+            # compare the tuples at indexes a and b, like tuple.__lt__
+            for i in iter_n:
+                col = getattr(self, 'col%s' % i)
+                if col[a] != col[b]:
+                    return col[a] < col[b]
+            return False
+
+    Columns.__name__ = 'Columns_' + name
+
+    SpecialisedTupleBaseTimSort = make_timsort_class()
+
+    class SpecialisedTupleSort(SpecialisedTupleBaseTimSort):
+        # sorts a list of indexes into self.columns
+        def lt(self, a, b):
+            return self.columns.lt(a, b)
+
+    class SpecialisedTupleListStrategy(ListStrategy):
+        erase, unerase = rerased.new_erasing_pair("specialisedtuple_" + name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def is_correct_type(self, w_obj):
+            return type(w_obj) is tuplecls
+
+        def wrap_item(self, columns, index):
+            w_tuple = instantiate(tuplecls)
+            w_tuple.space = self.space
+            for i in iter_n:
+                setattr(w_tuple, 'value%s' % i,
+                        getattr(columns, 'col%s' % i)[index])
+            return w_tuple
+
+        def init_from_list_w(self, w_list, list_w):
+            columns = Columns(len(list_w))
+            for w_item in list_w:
+                columns.append_tuple(w_item)
+            w_list.lstorage = self.erase(columns)
+
+        def get_empty_storage(self, sizehint):
+            return self.erase(Columns(sizehint))
+
+        def clone(self, w_list):
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, self.getstorage_copy(w_list), self)
+
+        def copy_into(self, w_list, w_other):
+            w_other.strategy = self
+            w_other.lstorage = self.getstorage_copy(w_list)
+
+        def getstorage_copy(self, w_list):
+            return self.erase(self.unerase(w_list.lstorage).copy())
+
+        def _resize_hint(self, w_list, hint):
+            columns = self.unerase(w_list.lstorage)
+            for i in iter_n:
+                resizelist_hint(getattr(columns, 'col%s' % i), hint)
+
+        def find(self, w_list, w_obj, start, stop):
+            if not self.is_correct_type(w_obj):
+                return ListStrategy.find(self, w_list, w_obj, start, stop)
+            assert isinstance(w_obj, tuplecls)
+            columns = self.unerase(w_list.lstorage)
+            for index in range(start, min(stop, columns.length())):
+                for i in iter_n:
+                    if (getattr(columns, 'col%s' % i)[index] !=
+                            getattr(w_obj, 'value%s' % i)):
+                        break
+                else:
+                    return index
+            raise ValueError
+
+        def length(self, w_list):
+            return self.unerase(w_list.lstorage).length()
+
+        def getitem(self, w_list, index):
+            columns = self.unerase(w_list.lstorage)
+            try:
+                columns.col0[index]
+            except IndexError:  # make RPython raise the exception
+                raise
+            return self.wrap_item(columns, index)
+
+        def getitems_copy(self, w_list):
+            columns = self.unerase(w_list.lstorage)
+            return [self.wrap_item(columns, index)
+                    for index in range(columns.length())]
+
+        getitems_unroll = func_with_new_name(getitems_copy, 'getitems_unroll')
+        getitems_fixedsize = func_with_new_name(getitems_copy,
+                                                'getitems_fixedsize')
+
+        def getslice(self, w_list, start, stop, step, length):
+            columns = self.unerase(w_list.lstorage)
+            result = Columns(0)
+            for i in iter_n:
+                col = getattr(columns, 'col%s' % i)
+                if step == 1 and 0 <= start <= stop:
+                    assert start >= 0
+                    assert stop >= 0
+                    subcol = col[start:stop]
+                else:
+                    subcol = [col[start + k * step] for k in range(length)]
+                setattr(result, 'col%s' % i, subcol)
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, self.erase(result), self)
+
+        def append(self, w_list, w_item):
+            if self.is_correct_type(w_item):
+                self.unerase(w_list.lstorage).append_tuple(w_item)
+                return
+            self.switch_to_next_strategy(w_list, w_item)
+            w_list.append(w_item)
+
+        def insert(self, w_list, index, w_item):
+            if self.is_correct_type(w_item):
+                assert isinstance(w_item, tuplecls)
+                columns = self.unerase(w_list.lstorage)
+                for i in iter_n:
+                    getattr(columns, 'col%s' % i).insert(
+                        index, getattr(w_item, 'value%s' % i))
+                return
+            self.switch_to_next_strategy(w_list, w_item)
+            w_list.insert(index, w_item)
+
+        def setitem(self, w_list, index, w_item):
+            if self.is_correct_type(w_item):
+                assert isinstance(w_item, tuplecls)
+                columns = self.unerase(w_list.lstorage)
+                for i in iter_n:
+                    col = getattr(columns, 'col%s' % i)
+                    try:
+                        col[index] = getattr(w_item, 'value%s' % i)
+                    except IndexError:
+                        raise
+                return
+            self.switch_to_next_strategy(w_list, w_item)
+            w_list.setitem(index, w_item)
+
+        def _extend_from_list(self, w_list, w_other):
+            if w_other.strategy is self:
+                columns = self.unerase(w_list.lstorage)
+                other = self.unerase(w_other.lstorage)
+                for i in iter_n:
+                    col = getattr(columns, 'col%s' % i)
+                    col += getattr(other, 'col%s' % i)[:]
+                return
+            elif w_other.strategy.is_empty_strategy():
+                return
+            w_other = w_other._temporarily_as_objects()
+            w_list.switch_to_object_strategy()
+            w_list.extend(w_other)
+
+        def setslice(self, w_list, start, step, slicelength, w_other):
+            # rare enough: do it on the wrapped tuples
+            w_list.switch_to_object_strategy()
+            w_list.setslice(start, step, slicelength, w_other)
+
+        def deleteslice(self, w_list, start, step, slicelength):
+            if slicelength == 0:
+                return
+            if step < 0:
+                start = start + step * (slicelength - 1)
+                step = -step
+            if step == 1:
+                stop = start + slicelength
+                assert start >= 0
+                assert stop >= 0
+                columns = self.unerase(w_list.lstorage)
+                for i in iter_n:
+                    del getattr(columns, 'col%s' % i)[start:stop]
+            else:
+                w_list.switch_to_object_strategy()
+                w_list.deleteslice(start, step, slicelength)
+
+        def pop(self, w_list, index):
+            if index < 0:
+                raise IndexError
+            w_item = self.getitem(w_list, index)
+            columns = self.unerase(w_list.lstorage)
+            for i in iter_n:
+                getattr(columns, 'col%s' % i).pop(index)
+            return w_item
+
+        def mul(self, w_list, times):
+            columns = self.unerase(w_list.lstorage)
+            result = Columns(0)
+            for i in iter_n:
+                setattr(result, 'col%s' % i,
+                        getattr(columns, 'col%s' % i) * times)
+            return W_ListObject.from_storage_and_strategy(
+                self.space, self.erase(result), self)
+
+        def inplace_mul(self, w_list, times):
+            columns = self.unerase(w_list.lstorage)
+            for i in iter_n:
+                col = getattr(columns, 'col%s' % i)
+                col *= times
+
+        def reverse(self, w_list):
+            columns = self.unerase(w_list.lstorage)
+            for i in iter_n:
+                getattr(columns, 'col%s' % i).reverse()
+
+        def sort(self, w_list, reverse):
+            columns = self.unerase(w_list.lstorage)
+            length = columns.length()
+            # sort the indexes, then move the fields of every column.
+            # Reverse sort stability is achieved like in descr_sort().
+            if reverse:
+                order = range(length - 1, -1, -1)
+            else:
+                order = range(length)
+            sorter = SpecialisedTupleSort(order, length)
+            sorter.columns = columns
+            sorter.sort()
+            if reverse:
+                order.reverse()
+            for i in iter_n:
+                col = getattr(columns, 'col%s' % i)
+                setattr(columns, 'col%s' % i, [col[k] for k in order])
+
+    SpecialisedTupleListStrategy.__name__ = (
+        'SpecialisedTupleListStrategy_' + name)
+    SpecialisedTupleListStrategy.tuplecls = tuplecls
+    return SpecialisedTupleListStrategy
+
+SpecialisedTupleListStrategy_ii = make_specialised_tuple_list_strategy(
+    specialisedtupleobject.Cls_ii)
+SpecialisedTupleListStrategy_ff = make_specialised_tuple_list_strategy(
+    specialisedtupleobject.Cls_ff)
+specialised_tuple_list_strategies = unrolling_iterable([
+    SpecialisedTupleListStrategy_ii, SpecialisedTupleListStrategy_ff])
+
+def get_specialised_tuple_list_strategy(space, w_obj):
+    """Return the strategy that stores lists of tuples of the same type as
+    w_obj unboxed, or None."""
+    if space.config.objspace.std.withspecialisedtuplelist:
+        for strategycls in specialised_tuple_list_strategies:
+            if type(w_obj) is strategycls.tuplecls:
+                return space.fromcache(strategycls)
+    return None
+
 # _______________________________________________________
 
 init_signature = Signature(['sequence'], None, None)
@@ -1766,6 +2277,7 @@ listrepr = app.interphook("listrepr")
 TimSort = make_timsort_class()
 IntBaseTimSort = make_timsort_class()
 FloatBaseTimSort = make_timsort_class()
+IntOrFloatBaseTimSort = make_timsort_class()
 StringBaseTimSort = make_timsort_class()
 UnicodeBaseTimSort = make_timsort_class()
 
@@ -1796,6 +2308,13 @@ class FloatSort(FloatBaseTimSort):
         return a < b
 
 
+class IntOrFloatSort(IntOrFloatBaseTimSort):
+    def lt(self, a, b):
+        fa = longlong2float.maybe_decode_longlong_as_float(a)
+        fb = longlong2float.maybe_decode_longlong_as_float(b)
+        return fa < fb
+
+
 class StringSort(StringBaseTimSort):
     def lt(self, a, b):
         return a < b
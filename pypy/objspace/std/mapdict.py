@@ -8,7 +8,8 @@ from pypy.objspace.std.dictmultiobject import (
     W_DictMultiObject, DictStrategy, ObjectDictStrategy, BaseKeyIterator,
     BaseValueIterator, BaseItemIterator, _never_equal_to_string
 )
-from pypy.objspace.std.typeobject import MutableCell
+from pypy.objspace.std.typeobject import (MutableCell, IntMutableCell,
+    FloatMutableCell)
 
 
 # ____________________________________________________________
@@ -40,7 +41,7 @@ class AbstractAttribute(object):
         ):
             return self._pure_mapdict_read_storage(obj, attr.storageindex)
         else:
-            return obj._mapdict_read_storage(attr.storageindex)
+            return attr._read_cell(obj._mapdict_read_storage(attr.storageindex))
 
     @jit.elidable
     def _pure_mapdict_read_storage(self, obj, storageindex):
@@ -52,7 +53,9 @@ class AbstractAttribute(object):
             return self.terminator._write_terminator(obj, selector, w_value)
         if not attr.ever_mutated:
             attr.ever_mutated = True
-        obj._mapdict_write_storage(attr.storageindex, w_value)
+        w_value = attr._write_cell(obj, w_value)
+        if w_value is not None:
+            obj._mapdict_write_storage(attr.storageindex, w_value)
         return True
 
     def delete(self, obj, selector):
@@ -98,6 +101,7 @@ class AbstractAttribute(object):
                 if space.config.objspace.std.withmethodcachecounter:
                     name = selector[0]
                     cache.hits[name] = cache.hits.get(name, 0) + 1
+                    cache.total_hits += 1
                 return attr
         attr = self._find_map_attr(selector)
         cache.attrs[attr_hash] = self
@@ -106,6 +110,7 @@ class AbstractAttribute(object):
         if space.config.objspace.std.withmethodcachecounter:
             name = selector[0]
             cache.misses[name] = cache.misses.get(name, 0) + 1
+            cache.total_misses += 1
         return attr
 
     def _find_map_attr(self, selector):
@@ -118,6 +123,12 @@ class AbstractAttribute(object):
     def copy(self, obj):
         raise NotImplementedError("abstract base class")
 
+    def _read_cell(self, w_cell):
+        raise NotImplementedError("abstract base class")
+
+    def _write_cell(self, obj, w_value):
+        raise NotImplementedError("abstract base class")
+
     def length(self):
         raise NotImplementedError("abstract base class")
 
@@ -275,7 +286,8 @@ class DevolvedDictTerminator(Terminator):
         return Terminator.set_terminator(self, obj, terminator)
 
 class PlainAttribute(AbstractAttribute):
-    _immutable_fields_ = ['selector', 'storageindex', 'back', 'ever_mutated?']
+    _immutable_fields_ = ['selector', 'storageindex', 'back', 'ever_mutated?',
+                          'can_contain_mutable_cell?']
 
     def __init__(self, selector, back):
         AbstractAttribute.__init__(self, back.space, back.terminator)
@@ -284,6 +296,42 @@ class PlainAttribute(AbstractAttribute):
         self.back = back
         self._size_estimate = self.length() * NUM_DIGITS_POW2
         self.ever_mutated = False
+        self.can_contain_mutable_cell = False
+
+    def _read_cell(self, w_cell):
+        if not self.can_contain_mutable_cell:
+            return w_cell
+        return unwrap_mutable_cell(self.space, w_cell)
+
+    def _write_cell(self, obj, w_value):
+        # With the withunboxedattributes option, an int or float dict
+        # attribute that is written to more than once is stored in a
+        # mutable cell, which the following writes of a value of the same
+        # type update in place: in a loop, the JIT then doesn't need to
+        # allocate the W_IntObject or W_FloatObject.  Returns None if the
+        # cell was updated, or else what must be put in the storage.
+        if (not self.space.config.objspace.std.withunboxedattributes or
+                self.selector[1] != DICT):
+            return w_value
+        from pypy.objspace.std.intobject import W_IntObject
+        from pypy.objspace.std.floatobject import W_FloatObject
+        if type(w_value) is W_IntObject:
+            w_cell = obj._mapdict_read_storage(self.storageindex)
+            if isinstance(w_cell, IntMutableCell):
+                w_cell.intvalue = w_value.intval
+                return None
+            w_value = IntMutableCell(w_value.intval)
+        elif type(w_value) is W_FloatObject:
+            w_cell = obj._mapdict_read_storage(self.storageindex)
+            if isinstance(w_cell, FloatMutableCell):
+                w_cell.floatvalue = w_value.floatval
+                return None
+            w_value = FloatMutableCell(w_value.floatval)
+        else:
+            return w_value
+        if not self.can_contain_mutable_cell:
+            self.can_contain_mutable_cell = True
+        return w_value
 
     def _copy_attr(self, obj, new_obj):
         w_value = self.read(obj, self.selector)
@@ -322,7 +370,8 @@ class PlainAttribute(AbstractAttribute):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.selector[1] == DICT:
             w_attr = space.wrap(self.selector[0])
-            dict_w[w_attr] = obj._mapdict_read_storage(self.storageindex)
+            dict_w[w_attr] = self._read_cell(
+                obj._mapdict_read_storage(self.storageindex))
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -336,6 +385,12 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %r>" % (self.selector, self.storageindex, self.back)
 
+def unwrap_mutable_cell(space, w_value):
+    if space.config.objspace.std.withunboxedattributes:
+        if isinstance(w_value, MutableCell):
+            return w_value.unwrap_cell(space)
+    return w_value
+
 def _become(w_obj, new_obj):
     # this is like the _become method, really, but we cannot use that due to
     # RPython reasons
@@ -350,8 +405,14 @@ class MapAttrCache(object):
         self.selectors = [self._empty_selector] * SIZE
         self.cached_attrs = [None] * SIZE
         if space.config.objspace.std.withmethodcachecounter:
-            self.hits = {}
-            self.misses = {}
+            self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = {}
+        self.misses = {}
+        self.total_hits = 0
+        self.total_misses = 0
+        self.megamorphic_sites = 0
 
     def clear(self):
         for i in range(len(self.attrs)):
@@ -807,9 +868,11 @@ class MapDictIteratorItems(BaseItemIterator):
 class CacheEntry(object):
     version_tag = None
     storageindex = 0
+    attr = None     # the attribute at 'storageindex', for LOAD_ATTR
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
+    refills = 0
 
     def is_valid_for_obj(self, w_obj):
         map = w_obj._get_mapdict_map()
@@ -834,19 +897,48 @@ INVALID_CACHE_ENTRY = CacheEntry()
 INVALID_CACHE_ENTRY.map_wref = weakref.ref(_invalid_cache_entry_map)
                                  # different from any real map ^^^
 
+# A code object position whose cache entry had to be refilled with a
+# different map MEGAMORPHIC_LIMIT times in a row sees too many different
+# maps.  Refilling it with the same map (because the type changed) starts
+# counting again; the hits are not counted, to keep them fast.  Its entry is replaced by MEGAMORPHIC_CACHE_ENTRY, which never
+# matches and is never refilled: from then on the lookups at that position
+# go directly to the global MapAttrCache and MethodCache, without
+# allocating a new weakref on every miss.
+MEGAMORPHIC_LIMIT = 50
+MEGAMORPHIC_CACHE_ENTRY = CacheEntry()
+MEGAMORPHIC_CACHE_ENTRY.map_wref = weakref.ref(_invalid_cache_entry_map)
+
 def init_mapdict_cache(pycode):
     num_entries = len(pycode.co_names_w)
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, attr, w_method=None):
     entry = pycode._mapdict_caches[nameindex]
+    if entry is MEGAMORPHIC_CACHE_ENTRY:
+        if pycode.space.config.objspace.std.withmethodcachecounter:
+            entry.failure_counter += 1
+        return
     if entry is INVALID_CACHE_ENTRY:
         entry = CacheEntry()
         pycode._mapdict_caches[nameindex] = entry
+    elif entry.map_wref() is map:
+        entry.refills = 0
+    elif entry.refills >= MEGAMORPHIC_LIMIT:
+        pycode._mapdict_caches[nameindex] = MEGAMORPHIC_CACHE_ENTRY
+        space = pycode.space
+        if space.config.objspace.std.withmethodcachecounter:
+            space.fromcache(MapAttrCache).megamorphic_sites += 1
+        return
+    else:
+        entry.refills += 1
     entry.map_wref = weakref.ref(map)
     entry.version_tag = version_tag
-    entry.storageindex = storageindex
+    if attr is not None:
+        entry.storageindex = attr.storageindex
+    else:
+        entry.storageindex = -1
+    entry.attr = attr
     entry.w_method = w_method
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
@@ -858,7 +950,8 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
-        return w_obj._mapdict_read_storage(entry.storageindex)
+        return entry.attr._read_cell(
+            w_obj._mapdict_read_storage(entry.storageindex))
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
 
@@ -902,8 +995,9 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                 if attr is not None:
                     # Note that if map.terminator is a DevolvedDictTerminator,
                     # map.find_map_attr will always return None if selector[1]==DICT.
-                    _fill_cache(pycode, nameindex, map, version_tag, attr.storageindex)
-                    return w_obj._mapdict_read_storage(attr.storageindex)
+                    _fill_cache(pycode, nameindex, map, version_tag, attr)
+                    return attr._read_cell(
+                        w_obj._mapdict_read_storage(attr.storageindex))
     if space.config.objspace.std.withmethodcachecounter:
         INVALID_CACHE_ENTRY.failure_counter += 1
     return space.getattr(w_obj, w_name)
@@ -937,7 +1031,7 @@ def LOOKUP_METHOD_mapdict_fill_cache_method(space, pycode, name, nameindex,
         name, version_tag)
     if w_method is None or isinstance(w_method, MutableCell):
         return
-    _fill_cache(pycode, nameindex, map, version_tag, -1, w_method)
+    _fill_cache(pycode, nameindex, map, version_tag, None, w_method)
 
 # XXX fix me: if a function contains a loop with both LOAD_ATTR and
 # XXX LOOKUP_METHOD on the same attribute name, it keeps trashing and
@@ -19,7 +19,7 @@ from pypy.objspace.std.noneobject import W_NoneObject
 from pypy.objspace.std.setobject import W_FrozensetObject, W_SetObject
 from pypy.objspace.std.tupleobject import W_AbstractTupleObject
 from pypy.objspace.std.typeobject import W_TypeObject
-from pypy.objspace.std.unicodeobject import W_UnicodeObject
+from pypy.objspace.std.unicodeobject import W_AbstractUnicodeObject
 
 
 TYPE_NULL      = '0'
@@ -394,7 +394,7 @@ def unmarshal_pycode(space, u, tc):
                   name, firstlineno, lnotab, freevars, cellvars)
 
 
-@marshaller(W_UnicodeObject)
+@marshaller(W_AbstractUnicodeObject)
 def marshal_unicode(space, w_unicode, m):
     s = unicodehelper.encode_utf8(space, space.unicode_w(w_unicode))
     m.atom_str(TYPE_UNICODE, s)
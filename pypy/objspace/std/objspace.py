@@ -31,7 +31,8 @@ from pypy.objspace.std.setobject import W_SetObject, W_FrozensetObject
 from pypy.objspace.std.sliceobject import W_SliceObject
 from pypy.objspace.std.tupleobject import W_AbstractTupleObject, W_TupleObject
 from pypy.objspace.std.typeobject import W_TypeObject, TypeCache
-from pypy.objspace.std.unicodeobject import W_UnicodeObject, wrapunicode
+from pypy.objspace.std.unicodeobject import (
+    W_AbstractUnicodeObject, W_UnicodeObject, wrapunicode)
 
 
 class StdObjSpace(ObjSpace):
@@ -80,8 +81,14 @@ class StdObjSpace(ObjSpace):
             W_TypeObject.typedef: W_TypeObject,
             W_UnicodeObject.typedef: W_UnicodeObject,
         }
-        if self.config.objspace.std.withstrbuf:
+        if (self.config.objspace.std.withstrbuf or
+                self.config.objspace.std.withstrslice):
             builtin_type_classes[W_BytesObject.typedef] = W_AbstractBytesObject
+            builtin_type_classes[W_UnicodeObject.typedef] = \
+                W_AbstractUnicodeObject
+        if self.config.objspace.std.withcompactunicode:
+            builtin_type_classes[W_UnicodeObject.typedef] = \
+                W_AbstractUnicodeObject
 
         self.builtin_types = {}
         self._interplevel_classes = {}
@@ -291,6 +298,9 @@ class StdObjSpace(ObjSpace):
     def newlist_int(self, list_i):
         return W_ListObject.newlist_int(self, list_i)
 
+    def newlist_float(self, list_f):
+        return W_ListObject.newlist_float(self, list_f)
+
     def newdict(self, module=False, instance=False, kwargs=False,
                 strdict=False):
         return W_DictMultiObject.allocate_and_init_instance(
@@ -475,8 +485,10 @@ class StdObjSpace(ObjSpace):
     def listview_float(self, w_obj):
         if type(w_obj) is W_ListObject:
             return w_obj.getitems_float()
-        # dict and set don't have FloatStrategy, so we can just ignore them
+        # dict doesn't have a FloatStrategy, so we can just ignore it
         # for now
+        if type(w_obj) is W_SetObject or type(w_obj) is W_FrozensetObject:
+            return w_obj.listview_float()
         if isinstance(w_obj, W_ListObject) and self._uses_list_iter(w_obj):
             return w_obj.getitems_float()
         return None
@@ -4,11 +4,13 @@ from pypy.interpreter.error import OperationError
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
 from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.floatobject import W_FloatObject
 from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.unicodeobject import W_UnicodeObject
 
 from rpython.rlib.objectmodel import r_dict
 from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.rfloat import isnan
 from rpython.rlib import rerased, jit
 
 
@@ -91,6 +93,10 @@ class W_BaseSetObject(W_Root):
         """ If this is an int set return its contents as a list of uwnrapped ints. Otherwise return None. """
         return self.strategy.listview_int(self)
 
+    def listview_float(self):
+        """ If this is a float set return its contents as a list of uwnrapped floats. Otherwise return None. """
+        return self.strategy.listview_float(self)
+
     def get_storage_copy(self):
         """ Returns a copy of the storage. Needed when we want to clone all elements from one set and
         put them into another. """
@@ -676,6 +682,9 @@ class SetStrategy(object):
     def listview_int(self, w_set):
         return None
 
+    def listview_float(self, w_set):
+        return None
+
     #def erase(self, storage):
     #    raise NotImplementedError
 
@@ -773,6 +782,8 @@ class EmptySetStrategy(SetStrategy):
     def add(self, w_set, w_key):
         if type(w_key) is W_IntObject:
             strategy = self.space.fromcache(IntegerSetStrategy)
+        elif self.space.fromcache(FloatSetStrategy).is_correct_type(w_key):
+            strategy = self.space.fromcache(FloatSetStrategy)
         elif type(w_key) is W_BytesObject:
             strategy = self.space.fromcache(BytesSetStrategy)
         elif type(w_key) is W_UnicodeObject:
@@ -1223,6 +1234,8 @@ class BytesSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1262,6 +1275,8 @@ class UnicodeSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1319,6 +1334,50 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
         return IntegerIteratorImplementation(self.space, self, w_set)
 
 
+class FloatSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                  name='set(float).intersect')
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def get_empty_dict(self):
+        return {}
+
+    def listview_float(self, w_set):
+        return self.unerase(w_set.sstorage).keys()
+
+    def is_correct_type(self, w_key):
+        # NaNs are not equal to themselves, so an unwrapped dict could not
+        # find them again; sets containing them use the object strategy
+        return (type(w_key) is W_FloatObject and
+                not isnan(self.space.float_w(w_key)))
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(BytesSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def unwrap(self, w_item):
+        return self.space.float_w(w_item)
+
+    def wrap(self, item):
+        return self.space.wrap(item)
+
+    def iter(self, w_set):
+        return FloatIteratorImplementation(self.space, self, w_set)
+
+
 class ObjectSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("object")
     erase = staticmethod(erase)
@@ -1390,6 +1449,8 @@ class IdentitySetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        if strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         if strategy is self.space.fromcache(BytesSetStrategy):
             return False
         if strategy is self.space.fromcache(UnicodeSetStrategy):
@@ -1495,6 +1556,18 @@ class IntegerIteratorImplementation(IteratorImplementation):
         else:
             return None
 
+class FloatIteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        d = strategy.unerase(w_set.sstorage)
+        self.iterator = d.iterkeys()
+
+    def next_entry(self):
+        for key in self.iterator:
+            return self.space.wrap(key)
+        else:
+            return None
+
 class IdentityIteratorImplementation(IteratorImplementation):
     def __init__(self, space, strategy, w_set):
         IteratorImplementation.__init__(self, space, strategy, w_set)
@@ -1586,6 +1659,18 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
         w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
         return
 
+    floatlist = space.listview_float(w_iterable)
+    if floatlist is not None:
+        for floatval in floatlist:
+            if isnan(floatval):
+                break
+        else:
+            strategy = space.fromcache(FloatSetStrategy)
+            w_set.strategy = strategy
+            w_set.sstorage = strategy.get_storage_from_unwrapped_list(
+                floatlist)
+            return
+
     iterable_w = space.listview(w_iterable)
 
     if len(iterable_w) == 0:
@@ -1607,6 +1692,16 @@ def _pick_correct_strategy(space, w_set, iterable_w):
         w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
         return
 
+    # check for floats
+    float_strategy = space.fromcache(FloatSetStrategy)
+    for w_item in iterable_w:
+        if not float_strategy.is_correct_type(w_item):
+            break
+    else:
+        w_set.strategy = float_strategy
+        w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
+        return
+
     # check for strings
     for w_item in iterable_w:
         if type(w_item) is not W_BytesObject:
@@ -116,6 +116,7 @@ def make_specialised_class(typetuple):
 
     cls.__name__ = ('W_SpecialisedTupleObject_' +
                     ''.join([t.__name__[0] for t in typetuple]))
+    cls.typetuple = typetuple
     _specialisations.append(cls)
     return cls
 
@@ -4,9 +4,11 @@ import py
 
 from pypy.objspace.std.bytesobject import (W_AbstractBytesObject,
     W_BytesObject, StringBuffer)
+from pypy.objspace.std.unicodeobject import (W_AbstractUnicodeObject,
+    W_UnicodeObject)
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.error import OperationError
-from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstring import StringBuilder, UnicodeBuilder
 
 
 class W_StringBufferObject(W_AbstractBytesObject):
@@ -26,6 +28,12 @@ class W_StringBufferObject(W_AbstractBytesObject):
         else:
             return self.w_str._value
 
+    def _cleanup_(self):
+        # a prebuilt buffer (e.g. made by app-level code running at startup)
+        # cannot keep its builder, which is not a valid prebuilt constant
+        self.force()
+        self.builder = None
+
     def __repr__(w_self):
         """ representation for debugging purposes """
         return "%s(%r[:%d])" % (
@@ -37,23 +45,34 @@ class W_StringBufferObject(W_AbstractBytesObject):
     def str_w(self, space):
         return self.force()
 
+    charbuf_w = str_w
+
     def buffer_w(self, space, flags):
         return StringBuffer(self.force())
 
     def readbuf_w(self, space):
         return StringBuffer(self.force())
 
+    def ord(self, space):
+        self.force()
+        return self.w_str.ord(space)
+
     def descr_len(self, space):
         return space.wrap(self.length)
 
     def descr_add(self, space, w_other):
+        if (space.isinstance_w(w_other, space.w_unicode) or
+                space.isinstance_w(w_other, space.w_bytearray)):
+            self.force()
+            return self.w_str.descr_add(space, w_other)
         try:
             other = W_BytesObject._op_val(space, w_other)
         except OperationError as e:
             if e.match(space, space.w_TypeError):
                 return space.w_NotImplemented
             raise
-        if self.builder.getlength() != self.length:
+        if (self.builder is None or
+                self.builder.getlength() != self.length):
             builder = StringBuilder()
             builder.append(self.force())
         else:
@@ -67,33 +86,124 @@ class W_StringBufferObject(W_AbstractBytesObject):
         return self
 
 
-delegation_dict = {}
-for key, value in W_BytesObject.typedef.rawdict.iteritems():
-    if not isinstance(value, interp2app):
-        continue
-    if key in ('__len__', '__add__', '__str__'):
-        continue
-
-    func = value._code._bltin
-    args = inspect.getargs(func.func_code)
-    if args.varargs or args.keywords:
-        raise TypeError("Varargs and keywords not supported in unwrap_spec")
-    argspec = ', '.join([arg for arg in args.args[1:]])
-    func_code = py.code.Source("""
-    def f(self, %(args)s):
+class W_UnicodeBufferObject(W_AbstractUnicodeObject):
+    """The unicode version of W_StringBufferObject: the result of adding
+    unicode strings, which can be extended in-place by the next addition
+    as long as nobody else did so first."""
+    w_unicode = None
+
+    def __init__(self, builder):
+        self.builder = builder             # UnicodeBuilder
+        self.length = builder.getlength()
+
+    def force(self):
+        if self.w_unicode is None:
+            s = self.builder.build()
+            if self.length < len(s):
+                s = s[:self.length]
+            self.w_unicode = W_UnicodeObject(s)
+            return s
+        else:
+            return self.w_unicode._value
+
+    def _cleanup_(self):
+        # a prebuilt buffer (e.g. made by app-level code running at startup)
+        # cannot keep its builder, which is not a valid prebuilt constant
+        self.force()
+        self.builder = None
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r[:%d])" % (
+            w_self.__class__.__name__, w_self.builder, w_self.length)
+
+    def unwrap(self, space):
+        return self.force()
+
+    def unicode_w(self, space):
+        return self.force()
+
+    def str_w(self, space):
         self.force()
-        return self.w_str.%(func_name)s(%(args)s)
-    """ % {'args': argspec, 'func_name': func.func_name})
-    d = {}
-    exec func_code.compile() in d
-    f = d['f']
-    f.func_defaults = func.func_defaults
-    f.__module__ = func.__module__
-    # necessary for unique identifiers for pickling
-    f.func_name = func.func_name
-    unwrap_spec_ = getattr(func, 'unwrap_spec', None)
-    if unwrap_spec_ is not None:
-        f = unwrap_spec(**unwrap_spec_)(f)
-    setattr(W_StringBufferObject, func.func_name, f)
+        return self.w_unicode.str_w(space)
+
+    charbuf_w = str_w
+
+    def readbuf_w(self, space):
+        self.force()
+        return self.w_unicode.readbuf_w(space)
+
+    def ord(self, space):
+        self.force()
+        return self.w_unicode.ord(space)
+
+    def descr_len(self, space):
+        return space.wrap(self.length)
 
+    def descr_add(self, space, w_other):
+        try:
+            other = W_UnicodeObject._op_val(space, w_other)
+        except OperationError as e:
+            if e.match(space, space.w_TypeError):
+                return space.w_NotImplemented
+            raise
+        if (self.builder is None or
+                self.builder.getlength() != self.length):
+            builder = UnicodeBuilder()
+            builder.append(self.force())
+        else:
+            builder = self.builder
+        builder.append(other)
+        return W_UnicodeBufferObject(builder)
+
+
+def delegate_to_forced(cls, W_Forced, forced_attr, skip):
+    """Add to 'cls' all the methods of the typedef of 'W_Forced', apart from
+    the ones listed in 'skip', as methods that force the buffer and call
+    the same method on the resulting object.  This object is found in the
+    attribute 'forced_attr' after calling force(), or if 'forced_attr' is
+    None, it is the result of force() itself."""
+    for key, value in W_Forced.typedef.rawdict.iteritems():
+        if not isinstance(value, interp2app):
+            continue
+        if key in skip:
+            continue
+
+        func = value._code._bltin
+        args = inspect.getargs(func.func_code)
+        if args.varargs or args.keywords:
+            raise TypeError("Varargs and keywords not supported in unwrap_spec")
+        argspec = ', '.join([arg for arg in args.args[1:]])
+        if forced_attr is None:
+            source = """
+            def f(self, %(args)s):
+                return self.force().%(func_name)s(%(args)s)
+            """
+        else:
+            source = """
+            def f(self, %(args)s):
+                self.force()
+                return self.%(forced_attr)s.%(func_name)s(%(args)s)
+            """
+        func_code = py.code.Source(source % {
+            'args': argspec, 'func_name': func.func_name,
+            'forced_attr': forced_attr})
+        d = {}
+        exec func_code.compile() in d
+        f = d['f']
+        f.func_defaults = func.func_defaults
+        f.__module__ = func.__module__
+        # necessary for unique identifiers for pickling
+        f.func_name = func.func_name
+        unwrap_spec_ = getattr(func, 'unwrap_spec', None)
+        if unwrap_spec_ is not None:
+            f = unwrap_spec(**unwrap_spec_)(f)
+        setattr(cls, func.func_name, f)
+
+delegate_to_forced(W_StringBufferObject, W_BytesObject, 'w_str',
+                   ('__len__', '__add__', '__str__'))
 W_StringBufferObject.typedef = W_BytesObject.typedef
+
+delegate_to_forced(W_UnicodeBufferObject, W_UnicodeObject, 'w_unicode',
+                   ('__new__', '__len__', '__add__'))
+W_UnicodeBufferObject.typedef = W_UnicodeObject.typedef
@@ -0,0 +1,199 @@
+"""Slices of str and unicode objects that share the characters of the string
+they were taken from instead of copying them (see the withstrslice option).
+"""
+
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.bytesobject import (W_AbstractBytesObject,
+    W_BytesObject, StringBuffer, wrapchar)
+from pypy.objspace.std.sliceobject import (W_SliceObject,
+    normalize_simple_slice)
+from pypy.objspace.std.strbufobject import delegate_to_forced
+from pypy.objspace.std.unicodeobject import (W_AbstractUnicodeObject,
+    W_UnicodeObject)
+
+
+def slice_is_worth_a_view(length, start, stop):
+    # XXX heuristic: only share the characters of the original string if
+    # the slice is long enough for the copy to matter, and if it is not so
+    # small compared to the original string that it would keep a lot of
+    # otherwise dead memory alive
+    return stop - start > length // 5 + 40
+
+
+class W_StringSliceObject(W_AbstractBytesObject):
+    w_str = None
+
+    def __init__(self, str, start, stop):
+        assert 0 <= start <= stop <= len(str)
+        self.str = str
+        self.start = start
+        self.stop = stop
+
+    def force(self):
+        if self.w_str is None:
+            start = self.start
+            stop = self.stop
+            assert start >= 0 and stop >= 0
+            s = self.str[start:stop]
+            self.w_str = W_BytesObject(s)
+            # don't keep the original string alive any longer
+            self.str = s
+            self.start = 0
+            self.stop = len(s)
+            return s
+        else:
+            return self.w_str._value
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r[%d:%d])" % (
+            w_self.__class__.__name__, w_self.str, w_self.start, w_self.stop)
+
+    def unwrap(self, space):
+        return self.force()
+
+    def str_w(self, space):
+        return self.force()
+
+    charbuf_w = str_w
+
+    def buffer_w(self, space, flags):
+        space.check_buf_flags(flags, True)
+        return StringBuffer(self.force())
+
+    def readbuf_w(self, space):
+        return StringBuffer(self.force())
+
+    def ord(self, space):
+        self.force()
+        return self.w_str.ord(space)
+
+    def _subslice(self, start, stop):
+        start += self.start
+        stop += self.start
+        if slice_is_worth_a_view(len(self.str), start, stop):
+            return W_StringSliceObject(self.str, start, stop)
+        assert start >= 0 and stop >= 0
+        return W_BytesObject(self.str[start:stop])
+
+    def descr_len(self, space):
+        return space.wrap(self.stop - self.start)
+
+    def descr_getitem(self, space, w_index):
+        length = self.stop - self.start
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, length)
+            if sl == 0:
+                return W_BytesObject.EMPTY
+            elif step == 1:
+                return self._subslice(start, stop)
+            self.force()
+            return self.w_str.descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return wrapchar(space, self.str[self.start + index])
+
+    def descr_getslice(self, space, w_start, w_stop):
+        start, stop = normalize_simple_slice(space, self.stop - self.start,
+                                             w_start, w_stop)
+        if start == stop:
+            return W_BytesObject.EMPTY
+        return self._subslice(start, stop)
+
+
+class W_UnicodeSliceObject(W_AbstractUnicodeObject):
+    """The unicode version of W_StringSliceObject."""
+    w_unicode = None
+
+    def __init__(self, str, start, stop):
+        assert 0 <= start <= stop <= len(str)
+        self.str = str
+        self.start = start
+        self.stop = stop
+
+    def force(self):
+        if self.w_unicode is None:
+            start = self.start
+            stop = self.stop
+            assert start >= 0 and stop >= 0
+            s = self.str[start:stop]
+            self.w_unicode = W_UnicodeObject(s)
+            # don't keep the original string alive any longer
+            self.str = s
+            self.start = 0
+            self.stop = len(s)
+            return s
+        else:
+            return self.w_unicode._value
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r[%d:%d])" % (
+            w_self.__class__.__name__, w_self.str, w_self.start, w_self.stop)
+
+    def unwrap(self, space):
+        return self.force()
+
+    def unicode_w(self, space):
+        return self.force()
+
+    def str_w(self, space):
+        self.force()
+        return self.w_unicode.str_w(space)
+
+    charbuf_w = str_w
+
+    def readbuf_w(self, space):
+        self.force()
+        return self.w_unicode.readbuf_w(space)
+
+    def ord(self, space):
+        self.force()
+        return self.w_unicode.ord(space)
+
+    def _subslice(self, start, stop):
+        start += self.start
+        stop += self.start
+        if slice_is_worth_a_view(len(self.str), start, stop):
+            return W_UnicodeSliceObject(self.str, start, stop)
+        assert start >= 0 and stop >= 0
+        return W_UnicodeObject(self.str[start:stop])
+
+    def descr_len(self, space):
+        return space.wrap(self.stop - self.start)
+
+    def descr_getitem(self, space, w_index):
+        length = self.stop - self.start
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, length)
+            if sl == 0:
+                return W_UnicodeObject.EMPTY
+            elif step == 1:
+                return self._subslice(start, stop)
+            self.force()
+            return self.w_unicode.descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return W_UnicodeObject(self.str[self.start + index])
+
+    def descr_getslice(self, space, w_start, w_stop):
+        start, stop = normalize_simple_slice(space, self.stop - self.start,
+                                             w_start, w_stop)
+        if start == stop:
+            return W_UnicodeObject.EMPTY
+        return self._subslice(start, stop)
+
+
+delegate_to_forced(W_StringSliceObject, W_BytesObject, 'w_str',
+                   ('__len__', '__getitem__', '__getslice__'))
+W_StringSliceObject.typedef = W_BytesObject.typedef
+
+delegate_to_forced(W_UnicodeSliceObject, W_UnicodeObject, 'w_unicode',
+                   ('__new__', '__len__', '__getitem__', '__getslice__'))
+W_UnicodeSliceObject.typedef = W_UnicodeObject.typedef
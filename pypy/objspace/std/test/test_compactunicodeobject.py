@@ -0,0 +1,175 @@
+from pypy.objspace.std.test import test_unicodeobject
+from pypy.objspace.std.compactunicodeobject import (W_ASCIIUnicodeObject,
+    is_ascii)
+
+
+def test_is_ascii():
+    assert is_ascii("")
+    assert is_ascii("abc\x7f")
+    assert not is_ascii("abc\x80")
+
+
+class TestCompactUnicodeObject:
+    spaceconfig = {"objspace.std.withcompactunicode": True}
+
+    def test_decode_encode_share_the_string(self):
+        space = self.space
+        s = "hello world" * 10
+        w_s = space.wrap(s)
+        for encoding in ["ascii", "utf-8"]:
+            w_u = space.call_method(w_s, "decode", space.wrap(encoding))
+            assert isinstance(w_u, W_ASCIIUnicodeObject)
+            assert w_u._str is s
+            for encoding in ["ascii", "utf-8", "latin-1"]:
+                w_t = space.call_method(w_u, "encode", space.wrap(encoding))
+                assert space.str_w(w_t) is s
+
+    def test_identity(self):
+        space = self.space
+        w_s = space.wrap("hello")
+        w_u1 = space.call_method(w_s, "decode", space.wrap("ascii"))
+        w_u2 = space.call_method(w_s, "decode", space.wrap("ascii"))
+        assert isinstance(w_u1, W_ASCIIUnicodeObject)
+        assert space.is_w(w_u1, w_u2)
+        assert not space.is_w(w_u1, space.wrap(u"hello"))
+        w_id = space.id(w_u1)
+        assert space.eq_w(space.id(w_u1), w_id)
+        assert space.eq_w(space.id(w_u2), w_id)
+        assert not space.eq_w(space.id(w_s), w_id)
+        w_u3 = space.call_method(space.wrap("hello"), "decode",
+                                 space.wrap("ascii"))
+        if not space.is_w(w_u1, w_u3):
+            assert not space.eq_w(space.id(w_u3), w_id)
+
+    def test_non_ascii(self):
+        space = self.space
+        w_u = space.call_method(space.wrap("caf\xc3\xa9"), "decode",
+                                space.wrap("utf-8"))
+        assert not isinstance(w_u, W_ASCIIUnicodeObject)
+        assert space.unicode_w(w_u) == u"caf\xe9"
+
+
+    def test_methods_do_not_force(self, monkeypatch):
+        def force(self):
+            raise AssertionError("should not decode the string again")
+        monkeypatch.setattr(W_ASCIIUnicodeObject, "force", force)
+        space = self.space
+        w_u = space.call_method(space.wrap(" ab,cab\x1c"), "decode",
+                                space.wrap("ascii"))
+        assert isinstance(w_u, W_ASCIIUnicodeObject)
+        w = space.wrap
+        for i in range(3):
+            assert space.int_w(space.call_method(w_u, "find", w(u"ab"),
+                                                 w(2))) == 5
+            assert space.int_w(space.call_method(w_u, "rfind", w("ab"))) == 5
+            assert space.int_w(space.call_method(w_u, "count", w(u"a"))) == 2
+            assert space.is_true(space.call_method(w_u, "startswith",
+                                                   w(u"ab"), w(1)))
+            assert space.is_true(space.call_method(
+                w_u, "endswith", space.newtuple([w(u"x"), w(u"b\x1c")])))
+            assert space.is_true(space.contains(w_u, w(u",c")))
+            assert space.is_true(space.lt(w_u, w(u"b")))
+            assert not space.is_true(space.call_method(w_u, "isalpha"))
+            assert space.is_true(space.call_method(w_u, "islower"))
+            for meth in ["strip", "lower", "upper"]:
+                w_res = space.call_method(w_u, meth)
+                assert isinstance(w_res, W_ASCIIUnicodeObject)
+            assert space.unicode_w(space.call_method(w_u, "strip")) == (
+                u"ab,cab")
+            w_list = space.call_method(w_u, "split", w(u","))
+            assert space.unwrap(w_list) == [u" ab", u"cab\x1c"]
+            w_list = space.call_method(w_u, "split")
+            assert space.unwrap(w_list) == [u"ab,cab"]
+
+
+class AppTestCompactUnicode(test_unicodeobject.AppTestUnicodeString):
+    spaceconfig = {"objspace.std.withcompactunicode": True,
+                   "usemodules": ('unicodedata',)}
+
+    def test_basic(self):
+        import __pypy__
+        u = "hello".decode("ascii")
+        assert type(u) is unicode
+        assert 'W_ASCIIUnicodeObject' in __pypy__.internal_repr(u)
+        assert u == u"hello"
+        assert u"hello" == u
+        assert u != u"world"
+        assert hash(u) == hash(u"hello")
+        assert {u: 1}[u"hello"] == 1
+        assert len(u) == 5
+        assert ord(u[1]) == ord(u"e")
+        assert u[-1] == u"o"
+        raises(IndexError, "u[5]")
+        assert u[1:3] == u"el"
+        assert u[::2] == u"hlo"
+        assert u.__getslice__(1, 1) == u""
+
+    def test_operations(self):
+        import __pypy__
+        u = "abc".decode("utf-8")
+        v = "def".decode("utf-8")
+        w = u + v
+        assert 'W_ASCIIUnicodeObject' in __pypy__.internal_repr(w)
+        assert w == u"abcdef"
+        assert u + u"\xe9" == u"abc\xe9"
+        assert u"\xe9" + u == u"\xe9abc"
+        assert "x" + u == u"xabc"
+        assert u.upper() == u"ABC"
+        assert u.split(u"b") == [u"a", u"c"]
+        assert u"b" in u
+        assert str(u) == "abc"
+        assert u.encode("utf-16") == u"abc".encode("utf-16")
+        assert int("42".decode("ascii")) == 42
+        assert u"%s!" % u == u"abc!"
+        assert repr(u) == "u'abc'"
+
+    def test_non_ascii_decode(self):
+        import __pypy__
+        u = "caf\xc3\xa9".decode("utf-8")
+        assert 'W_ASCIIUnicodeObject' not in __pypy__.internal_repr(u)
+        assert u == u"caf\xe9"
+        raises(UnicodeDecodeError, "caf\xc3\xa9".decode, "ascii")
+
+    def test_methods(self):
+        samples = ["", " ", "abc", "  Hello, World \t\n", "a\x1cb\x1f ",
+                   "x,y,,z", "ABC", "abc1", "123", "  a  b  c  ", "aXa"]
+        args = [u"", u"a", u"b", u",", u"a ", u"\xe9", "a", "abc",
+                u"\u1234", (u"a", u"x"), (u"q", u"\xe9")]
+        for s in samples:
+            u = s.decode("ascii")
+            p = unicode(s)
+            for meth in ["strip", "lstrip", "rstrip", "lower", "upper",
+                         "split", "rsplit", "isalnum", "isalpha",
+                         "isdigit", "isdecimal", "isnumeric", "isspace",
+                         "islower", "isupper"]:
+                assert getattr(u, meth)() == getattr(p, meth)(), (s, meth)
+            for maxsplit in [0, 1, 2]:
+                assert u.split(None, maxsplit) == p.split(None, maxsplit)
+                assert u.rsplit(None, maxsplit) == p.rsplit(None, maxsplit)
+            for arg in args:
+                for meth in ["startswith", "endswith"]:
+                    assert getattr(u, meth)(arg) == getattr(p, meth)(arg)
+                    assert (getattr(u, meth)(arg, 1, -1) ==
+                            getattr(p, meth)(arg, 1, -1))
+                if isinstance(arg, tuple):
+                    continue
+                for meth in ["find", "rfind", "count"]:
+                    assert getattr(u, meth)(arg) == getattr(p, meth)(arg)
+                    assert (getattr(u, meth)(arg, 1, -1) ==
+                            getattr(p, meth)(arg, 1, -1))
+                assert (arg in u) == (arg in p)
+                for meth in ["strip", "lstrip", "rstrip"]:
+                    assert getattr(u, meth)(arg) == getattr(p, meth)(arg)
+                if arg:
+                    for meth in ["split", "rsplit"]:
+                        assert getattr(u, meth)(arg) == getattr(p, meth)(arg)
+                        assert (getattr(u, meth)(arg, 1) ==
+                                getattr(p, meth)(arg, 1))
+                for op in ["__eq__", "__ne__", "__lt__", "__le__", "__gt__",
+                           "__ge__"]:
+                    assert getattr(u, op)(arg) == getattr(p, op)(arg)
+        raises(ValueError, u"abc".split, u"")
+        raises(ValueError, "abc".decode("ascii").index, u"x")
+        raises(ValueError, "abc".decode("ascii").rindex, "x")
+        raises(TypeError, "abc".decode("ascii").find, 42)
+        raises(UnicodeDecodeError, "abc".decode("ascii").find, "\xe9")
@@ -5,6 +5,24 @@ from pypy.objspace.std.dictmultiobject import (W_DictMultiObject,
     BytesDictStrategy, ObjectDictStrategy)
 
 
+class TestW_DictObjectCopyOnWrite(object):
+    spaceconfig = {"objspace.std.withcopyonwrite": True}
+
+    def test_copy_shares_storage(self):
+        space = self.space
+        w = space.wrap
+        d = space.newdict()
+        d.initialize_content([(w(1), w(2)), (w(3), w(4))])
+        d2 = space.call_method(d, 'copy')
+        assert d2.strategy is d.strategy
+        assert d2.dstorage is d.dstorage
+        assert d.dstorage_shared and d2.dstorage_shared
+        space.setitem(d2, w(5), w(6))
+        assert d2.dstorage is not d.dstorage
+        assert space.len_w(d) == 2
+        assert space.len_w(d2) == 3
+
+
 class TestW_DictObject(object):
     def test_empty(self):
         d = self.space.newdict()
@@ -683,6 +701,80 @@ class AppTest_DictMultiObject(AppTest_DictObject):
         setattr(a, s, 123)
         assert holder.seen is s
 
+class AppTest_DictObjectWithCopyOnWrite(AppTest_DictMultiObject):
+    """Run the dict object tests with copy-on-write copies enabled."""
+    spaceconfig = {"objspace.std.withcopyonwrite": True}
+
+    def test_copies_are_independent(self):
+        d = {1: 2, 3: 4}
+        for d2 in [d.copy(), dict(d)]:
+            d2[5] = 6
+            del d2[1]
+            assert d == {1: 2, 3: 4}
+            assert d2 == {3: 4, 5: 6}
+        d2 = d.copy()
+        d.clear()
+        assert d2 == {1: 2, 3: 4}
+        d = {'a': 1}
+        d2 = d.copy()
+        d2.update({'b': 2})
+        d.setdefault('c', 3)
+        assert d == {'a': 1, 'c': 3}
+        assert d2 == {'a': 1, 'b': 2}
+
+    def test_mutate_copy_while_iterating(self):
+        d = dict.fromkeys(range(5), 0)
+        d2 = d.copy()
+        result = []
+        for key, value in d2.iteritems():
+            result.append(value)
+            d2[4] = 42
+        assert result == [0, 0, 0, 0, 42]
+        assert d[4] == 0
+
+    def test_copy_after_iterator_creation(self):
+        d = {1: 1, 2: 2, 3: 3}
+        it = d.iteritems()
+        assert next(it) == (1, 1)
+        c = d.copy()
+        d[2] = 20
+        d[3] = 30
+        assert list(it) == [(2, 20), (3, 30)]
+        assert c == {1: 1, 2: 2, 3: 3}
+        #
+        d = {1: 1, 2: 2, 3: 3}
+        it = d.itervalues()
+        assert next(it) == 1
+        c = d.copy()
+        d[2] = 20
+        d[3] = 30
+        assert list(it) == [20, 30]
+        assert c == {1: 1, 2: 2, 3: 3}
+
+    def test_itervalues_of_shared_storage(self):
+        e = dict({1: 1, 2: 2, 3: 3})
+        it = e.itervalues()
+        assert next(it) == 1
+        e[2] = 20
+        e[3] = 30
+        assert list(it) == [20, 30]
+        #
+        e = dict({1.5: 1, 2.5: 2})
+        it = e.itervalues()
+        next(it)
+        e.update({1.5: 10, 2.5: 20})
+        assert list(it) == [20]
+
+    def test_clear_shared_storage(self):
+        d = {1: 2, 3: 4}
+        d2 = d.copy()
+        d.clear()
+        assert d == {}
+        assert d2 == {1: 2, 3: 4}
+        d[5] = 6
+        assert d == {5: 6}
+
+
 class AppTestDictViews:
     def test_dictview(self):
         d = {1: 2, 3: 4}
@@ -986,6 +1078,66 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "hi"
+        d[-0.0] = "zero"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[1.5] == "hi"
+        assert d[0.0] == "zero" and d[0] == "zero"
+        assert d.keys() == [1.5, -0.0]
+        assert 2.5 not in d and 2 not in d and "a" not in d
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[0.0] = "zero again"
+        assert d.keys() == [1.5, -0.0]
+        assert d.values() == ["hi", "zero again"]
+        d[3] = "three"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[3.0] == "three"
+        #
+        nan = float('nan')
+        d = {nan: 42}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[nan] == 42
+
+    def test_empty_to_int_pair(self):
+        d = {}
+        d[1, 2] = "a"
+        d[(3, -4)] = "b"
+        assert "IntPairDictStrategy" in self.get_strategy(d)
+        assert d[1, 2] == "a"
+        assert d.get((3, -4)) == "b"
+        assert (2, 1) not in d and 12 not in d and (1, 2, 3) not in d
+        assert "IntPairDictStrategy" in self.get_strategy(d)
+        assert d.items() == [((1, 2), "a"), ((3, -4), "b")]
+        assert [type(x) for x in d.keys()[0]] == [int, int]
+        assert d.pop((1, 2)) == "a"
+        d[(1.0, 2)] = "c"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[1, 2] == "c"
+        #
+        d = {(1, True): 5}
+        assert "IntPairDictStrategy" not in self.get_strategy(d)
+
+    def test_insertion_order(self):
+        for keys in [[u"c", u"a", u"b"], ["x", "ab", "a", "b"],
+                     [1000, 3, -17, 8], [2.5, -1.0, 1e100],
+                     [(5, 1), (1, 5), (0, 0)]]:
+            d = {}
+            for key in keys:
+                d[key] = key
+            assert d.keys() == keys
+            assert d.values() == keys
+            del d[keys[0]]
+            d[keys[0]] = 42
+            assert d.keys() == keys[1:] + keys[:1]
+        d = {}
+        for key in [5, 1, 3]:
+            d[key] = None
+        d["x"] = None        # switches to the object strategy
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d.keys() == [5, 1, 3, "x"]
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
@@ -1014,6 +1166,10 @@ class AppTestStrategies(object):
         raises(RuntimeError, list, it)
 
 
+class AppTestStrategiesSpecialisedTuple(AppTestStrategies):
+    spaceconfig = {"objspace.std.withspecialisedtuple": True}
+
+
 class FakeWrapper(object):
     hash_count = 0
     def unwrap(self, space):
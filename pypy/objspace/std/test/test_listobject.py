@@ -1442,6 +1442,74 @@ class AppTestListObject(object):
         assert ([5] >  [N]) is False
         assert ([5] >= [N]) is False
 
+    def test_mixed_int_and_float(self):
+        l = [1, 2, 3]
+        l.append(4.5)
+        l.insert(0, -0.0)
+        assert l == [0, 1, 2, 3, 4.5]
+        assert [type(x) for x in l] == [float, int, int, int, float]
+        assert l.index(4.5) == 4
+        assert l.index(1.0) == 1
+        assert 0 in l and 4 not in l
+        assert l.count(0.0) == 1
+        l.sort(reverse=True)
+        assert l == [4.5, 3, 2, 1, -0.0]
+        l.extend([5, 6.25])
+        assert l[-2:] == [5, 6.25]
+        assert type(l[-2]) is int
+        l.append(2 ** 100)
+        l.append('x')
+        assert l == [4.5, 3, 2, 1, 0.0, 5, 6.25, 2 ** 100, 'x']
+        #
+        l = [1.5, float('inf')]
+        l.append(-7)
+        assert l == [1.5, float('inf'), -7]
+        l[1] = 3
+        assert l * 2 == [1.5, 3, -7, 1.5, 3, -7]
+        assert l[::-1] == [-7, 3, 1.5]
+        del l[0]
+        assert l.pop() == -7 and type(l[0]) is int
+
+    def test_list_of_pairs(self):
+        l = [(3, 4), (1, 2), (3, -1)]
+        l.append((0, 5))
+        l.insert(1, (7, 7))
+        assert l == [(3, 4), (7, 7), (1, 2), (3, -1), (0, 5)]
+        assert l[-1] == (0, 5) and type(l[-1]) is tuple
+        x, y = l[2]
+        assert (x, y) == (1, 2)
+        assert l.index((3, -1)) == 3
+        assert (3, -1.0) in l and (2, 1) not in l and [3, -1] not in l
+        l.sort()
+        assert l == [(0, 5), (1, 2), (3, -1), (3, 4), (7, 7)]
+        l.sort(reverse=True)
+        assert l == [(7, 7), (3, 4), (3, -1), (1, 2), (0, 5)]
+        assert l[1:3] == [(3, 4), (3, -1)]
+        assert l[::-2] == [(0, 5), (3, -1), (7, 7)]
+        l[0] = (8, 9)
+        del l[1:3]
+        assert l == [(8, 9), (1, 2), (0, 5)]
+        assert l.pop(1) == (1, 2)
+        l.extend([(4, 4)] * 2)
+        assert l * 2 == [(8, 9), (0, 5), (4, 4), (4, 4)] * 2
+        del l[::2]
+        assert l == [(0, 5), (4, 4)]
+        l.reverse()
+        assert l == [(4, 4), (0, 5)]
+        l[1:] = [(1, 1), (2, 2)]
+        assert l == [(4, 4), (1, 1), (2, 2)]
+        l.append((1.5, 2.5))
+        l.append('x')
+        assert l == [(4, 4), (1, 1), (2, 2), (1.5, 2.5), 'x']
+        #
+        l = [(1.5, 2.5), (0.5, float('inf'))]
+        l += [(1.5, -2.5)]
+        l.sort()
+        assert l == [(0.5, float('inf')), (1.5, -2.5), (1.5, 2.5)]
+        assert sum([b for a, b in l[1:]]) == 0.0
+        l.append((1, 2))
+        assert l[-1] == (1, 2) and type(l[-1][0]) is int
+
     def test_resizelist_hint(self):
         if self.on_cpython:
             skip('pypy-only test')
@@ -1573,6 +1641,32 @@ class AppTestListObjectWithRangeList(AppTestListObject):
     spaceconfig = {"objspace.std.withrangelist": True}
 
 
+class AppTestListObjectWithSpecialisedTupleList(AppTestListObject):
+    """Run the list object tests with the unboxed lists of specialised
+    tuples enabled."""
+    spaceconfig = {"objspace.std.withspecialisedtuple": True,
+                   "objspace.std.withspecialisedtuplelist": True}
+
+
+class AppTestListObjectWithCopyOnWrite(AppTestListObject):
+    """Run the list object tests with copy-on-write copies enabled."""
+    spaceconfig = {"objspace.std.withcopyonwrite": True}
+
+    def test_copies_are_independent(self):
+        l = [1, 2, 3]
+        for l2 in [l[:], list(l)]:
+            l2.append(4)
+            l2[0] = 'x'
+            assert l == [1, 2, 3]
+            assert l2 == ['x', 2, 3, 4]
+        l2 = l[:]
+        l.sort(key=lambda x: -x)
+        assert l == [3, 2, 1]
+        assert l2 == [1, 2, 3]
+        del l2[:]
+        assert l == [3, 2, 1]
+
+
 class AppTestRangeListForcing:
     """Tests for range lists that test forcing. Regular tests should go in
     AppTestListObject so they can be run -A against CPython as well. Separate
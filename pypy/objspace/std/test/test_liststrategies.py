@@ -1,8 +1,10 @@
 import sys
+import py
 from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
-    SimpleRangeListStrategy, make_range_list, UnicodeListStrategy)
+    SimpleRangeListStrategy, make_range_list, UnicodeListStrategy,
+    IntOrFloatListStrategy)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -86,6 +88,108 @@ class TestW_ListStrategies(TestW_ListObject):
         l.append(self.space.wrap("a"))
         assert isinstance(l.strategy, ObjectListStrategy)
 
+    def test_int_or_float_from_list_objects(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2.5), w(-3)])
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1, 2.5, -3]
+        assert type(space.unwrap(l.getitem(0))) is int
+        assert type(space.unwrap(l.getitem(1))) is float
+        if sys.maxint > 2 ** 31:
+            # ints that don't fit in 32 bits are not stored unboxed
+            l = W_ListObject(space, [w(2 ** 40), w(2.5)])
+            assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_from_int(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.append(w(4.5))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        l.append(w(5))
+        l.insert(0, w(-0.0))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [-0.0, 1, 2, 3, 4.5, 5]
+        l.append(w('a'))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == [-0.0, 1, 2, 3, 4.5, 5, 'a']
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.setitem(1, w(0.5))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1, 0.5, 3]
+
+        if sys.maxint > 2 ** 31:
+            l = W_ListObject(space, [w(1), w(2 ** 40)])
+            l.append(w(0.5))
+            assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_from_float(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1.5), w(2.5)])
+        l.append(w(3))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1.5, 2.5, 3]
+        assert type(space.unwrap(l.getitem(2))) is int
+        if sys.maxint > 2 ** 31:
+            l = W_ListObject(space, [w(1.5), w(2.5)])
+            l.append(w(2 ** 40))
+            assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_special_values(self):
+        from rpython.rlib.longlong2float import (longlong2float,
+            encode_int32_into_longlong_nan)
+        space = self.space
+        w = space.wrap
+        inf = 1e300 * 1e300
+        l = W_ListObject(space, [w(1), w(inf), w(-inf), w(inf / inf)])
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l.getitem(1)) == inf
+        assert space.unwrap(l.getitem(2)) == -inf
+        w_nan = l.getitem(3)
+        assert space.float_w(w_nan) != space.float_w(w_nan)
+        # the NaN used to box ints cannot be stored as a float
+        strange_nan = longlong2float(encode_int32_into_longlong_nan(42))
+        l.append(w(strange_nan))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l.getitem(0)) == 1
+
+    def test_int_or_float_extend(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        l.extend(W_ListObject(space, [w(3.5), w(4.5)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        l.extend(W_ListObject(space, [w(5), w(6)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        l.extend(W_ListObject(space, [w(7.5)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1, 2, 3.5, 4.5, 5, 6, 7.5]
+
+        l = W_ListObject(space, [w(1.5)])
+        l.extend(W_ListObject(space, [w(2), w(3)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1.5, 2, 3]
+
+    def test_int_or_float_find_and_sort(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(3), w(-0.0), w(2.5), w(1), w(0)])
+        assert l.find(w(1.0)) == 3
+        assert l.find(w(2.5)) == 2
+        assert l.find(w(0)) == 1
+        assert l.find(w(0.0)) == 1
+        py.test.raises(ValueError, l.find, w(1.5))
+        l.sort(False)
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [-0.0, 0, 1, 2.5, 3]
+        assert type(space.unwrap(l.getitem(0))) is float
+        assert type(space.unwrap(l.getitem(1))) is int
+        l.sort(True)
+        assert space.unwrap(l) == [3, 2.5, 1, 0, -0.0]
+
     def test_setitem(self):
         space = self.space
         w = space.wrap
@@ -318,7 +422,7 @@ class TestW_ListStrategies(TestW_ListObject):
         l = W_ListObject(space, [w(1.1), w(2.2), w(3.3)])
         assert isinstance(l.strategy, FloatListStrategy)
         l.extend(W_ListObject(space, [w(4), w(5), w(6)]))
-        assert isinstance(l.strategy, ObjectListStrategy)
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
 
     def test_empty_extend_with_any(self):
         space = self.space
@@ -638,6 +742,13 @@ class TestW_ListStrategies(TestW_ListObject):
         assert isinstance(w_l.strategy, BytesListStrategy)
         assert space.listview_bytes(w_l) is l
 
+    def test_newlist_float(self):
+        space = self.space
+        l = [1.5, -2.0]
+        w_l = self.space.newlist_float(l)
+        assert isinstance(w_l.strategy, FloatListStrategy)
+        assert space.listview_float(w_l) is l
+
     def test_string_uses_newlist_bytes(self):
         space = self.space
         w_s = space.wrap("a b c")
@@ -734,6 +845,118 @@ class TestW_ListStrategies(TestW_ListObject):
         assert list_orig == [1, 2, 3]
 
 
+class TestW_ListStrategiesSpecialisedTuple:
+    spaceconfig = {"objspace.std.withspecialisedtuple": True,
+                   "objspace.std.withspecialisedtuplelist": True}
+
+    def test_check_strategy(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w((1, 2)), w((3, 4))])
+        assert isinstance(l.strategy,
+                          listobject.SpecialisedTupleListStrategy_ii)
+        l = W_ListObject(space, [w((1.5, 2.0)), w((3.0, 4.0))])
+        assert isinstance(l.strategy,
+                          listobject.SpecialisedTupleListStrategy_ff)
+        l = W_ListObject(space, [w((1, 2)), w((3.0, 4.0))])
+        assert isinstance(l.strategy, ObjectListStrategy)
+        l = W_ListObject(space, [w((1, 2, 3))])
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_unboxed_storage(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [])
+        l.append(w((1, 2)))
+        l.append(w((3, 4)))
+        assert isinstance(l.strategy,
+                          listobject.SpecialisedTupleListStrategy_ii)
+        columns = l.strategy.unerase(l.lstorage)
+        assert columns.col0 == [1, 3]
+        assert columns.col1 == [2, 4]
+        w_item = l.getitem(1)
+        assert space.eq_w(w_item, w((3, 4)))
+        assert w_item is not l.getitem(1)    # rebuilt on every access
+        l.append(w((5, 'x')))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == [(1, 2), (3, 4), (5, 'x')]
+
+    def test_extend_and_slices(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w((1, 2)), w((3, 4))])
+        l.extend(l)
+        assert isinstance(l.strategy,
+                          listobject.SpecialisedTupleListStrategy_ii)
+        assert space.unwrap(l) == [(1, 2), (3, 4)] * 2
+        l2 = l.getslice(1, 4, 1, 3)
+        assert l2.strategy is l.strategy
+        assert space.unwrap(l2) == [(3, 4), (1, 2), (3, 4)]
+        l.extend(W_ListObject(space, [w((1.5, 2.5))]))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l)[-1] == (1.5, 2.5)
+
+    def test_sort_is_stable(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w((0.0, 1.0)), w((2.0, 0.0)),
+                                 w((-0.0, 1.0))])
+        l.sort(False)
+        assert [repr(x) for x, y in space.unwrap(l)] == ['0.0', '-0.0',
+                                                          '2.0']
+        l.sort(True)
+        assert [repr(x) for x, y in space.unwrap(l)] == ['2.0', '0.0',
+                                                          '-0.0']
+
+
+class TestW_ListStrategiesCopyOnWrite:
+    spaceconfig = {"objspace.std.withcopyonwrite": True}
+
+    def test_copies_share_storage(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l2 = l.getslice(0, 3, 1, 3)
+        assert l2.lstorage is l.lstorage
+        assert l.lstorage_shared and l2.lstorage_shared
+        l3 = W_ListObject(space, [])
+        l3.extend(l)
+        assert l3.strategy is l.strategy
+        assert l3.lstorage is l.lstorage
+        # a partial slice is still copied
+        l4 = l.getslice(0, 2, 1, 2)
+        assert not l4.lstorage_shared
+
+    def test_mutation_copies_storage(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l2 = l.getslice(0, 3, 1, 3)
+        l2.setitem(0, w(5))
+        assert l2.lstorage is not l.lstorage
+        assert not l2.lstorage_shared
+        assert space.unwrap(l) == [1, 2, 3]
+        assert space.unwrap(l2) == [5, 2, 3]
+        # 'l' still thinks that its storage is shared
+        storage = l.lstorage
+        l.append(w(4))
+        assert l.lstorage is not storage
+        assert space.unwrap(l) == [1, 2, 3, 4]
+
+    def test_mutation_switching_strategy(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        l2 = l.getslice(0, 2, 1, 2)
+        l2.append(w('a'))
+        assert isinstance(l2.strategy, ObjectListStrategy)
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert space.unwrap(l) == [1, 2]
+        l.sort(True)
+        assert space.unwrap(l) == [2, 1]
+        assert space.unwrap(l2) == [1, 2, 'a']
+
+
 class TestW_ListStrategiesDisabled:
     spaceconfig = {"objspace.std.withliststrategies": False}
 
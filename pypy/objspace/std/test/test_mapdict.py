@@ -9,6 +9,7 @@ class Config:
             withmethodcache = False
             withidentitydict = False
             withmapdict = True
+            withunboxedattributes = False
 
 space = FakeSpace()
 space.config = Config
@@ -1111,6 +1112,41 @@ class AppTestGlobalCaching(AppTestWithMapDict):
         else:
             assert 0, "failed: got %r" % ([got[1] for got in seen],)
 
+    def test_megamorphic_site(self):
+        import __pypy__
+        classes = []
+        for i in range(100):
+            class A(object):
+                def __init__(self):
+                    self.x = 42
+            classes.append(A)
+        l = [cls() for cls in classes]
+        __pypy__.reset_method_cache_counter()
+        for a in l:
+            assert a.x == 42
+        hits, misses, megamorphic = __pypy__.mapdict_global_cache_counter()
+        assert megamorphic == 1
+        assert hits + misses >= 100
+        __pypy__.reset_method_cache_counter()
+        for a in l:
+            assert a.x == 42
+        hits, misses, megamorphic = __pypy__.mapdict_global_cache_counter()
+        assert megamorphic == 0
+        assert hits + misses == 100
+
+    def test_site_with_changing_type(self):
+        import __pypy__
+        class A(object):
+            def __init__(self):
+                self.x = 42
+        a = A()
+        __pypy__.reset_method_cache_counter()
+        for i in range(100):
+            A.y = i    # the cache entry is refilled with the same map
+            assert a.x == 42
+        hits, misses, megamorphic = __pypy__.mapdict_global_cache_counter()
+        assert megamorphic == 0
+
 class TestDictSubclassShortcutBug(object):
     spaceconfig = {"objspace.std.withmapdict": True,
                    "objspace.std.withmethodcachecounter": True}
@@ -1125,6 +1161,112 @@ class TestDictSubclassShortcutBug(object):
                 """)
         assert w_dict.user_overridden_class
 
+class AppTestWithUnboxedAttributes(AppTestWithMapDict):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withunboxedattributes": True}
+
+    def test_int_and_float_attributes(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 0
+        a.f = 0.0
+        a.o = None
+        for i in range(10):
+            a.x += 1
+            a.f += 0.5
+            a.o = i
+        assert a.x == 10
+        assert a.f == 5.0
+        assert a.o == 9
+        assert a.__dict__ == {"x": 10, "f": 5.0, "o": 9}
+        b = A()
+        b.x = 0
+        b.x = 1
+        assert a.x == 10     # the cells are not shared
+        a.x = 1.5
+        assert a.x == 1.5
+        a.x = "abc"
+        assert a.x == "abc"
+        a.x = 42
+        a.x = 43
+        assert a.x == 43
+        assert getattr(a, "x") is 43
+        assert sorted(vars(a).items()) == [("f", 5.0), ("o", 9), ("x", 43)]
+        del a.f
+        assert a.x == 43
+        assert not hasattr(a, "f")
+
+    def test_materialize_dict(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.x = 2
+        d = a.__dict__
+        d[5] = 6       # devolves the dict
+        assert d["x"] == 2
+        a.x = 3
+        assert d["x"] == 3
+        assert a.x == 3
+
+    def test_cached_read_of_new_cell(self):
+        class A(object):
+            pass
+        def f(a):
+            return a.x
+        a = A()
+        a.x = 1
+        assert f(a) == 1
+        assert f(a) == 1     # from the cache
+        a.x = 2              # the attribute now contains a cell
+        assert f(a) == 2
+        a.x = 3
+        assert f(a) == 3
+
+
+class TestUnboxedAttributes(object):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withunboxedattributes": True}
+
+    def test_cells(self):
+        from pypy.objspace.std.typeobject import (IntMutableCell,
+            FloatMutableCell)
+        space = self.space
+        w_a = space.appexec([], """():
+            class A(object):
+                pass
+            a = A()
+            a.x = 1
+            a.f = 1.5
+            return a
+        """)
+        map = w_a._get_mapdict_map()
+        attr = map.find_map_attr(("x", DICT))
+        assert not attr.can_contain_mutable_cell
+        assert space.int_w(w_a._mapdict_read_storage(attr.storageindex)) == 1
+        space.setattr(w_a, space.wrap("x"), space.wrap(2))
+        w_cell = w_a._mapdict_read_storage(attr.storageindex)
+        assert isinstance(w_cell, IntMutableCell)
+        assert attr.can_contain_mutable_cell
+        space.setattr(w_a, space.wrap("x"), space.wrap(3))
+        assert w_a._mapdict_read_storage(attr.storageindex) is w_cell
+        assert w_cell.intvalue == 3
+        assert space.int_w(space.getattr(w_a, space.wrap("x"))) == 3
+        #
+        space.setattr(w_a, space.wrap("f"), space.wrap(2.5))
+        space.setattr(w_a, space.wrap("f"), space.wrap(3.5))
+        attr = map.find_map_attr(("f", DICT))
+        w_cell = w_a._mapdict_read_storage(attr.storageindex)
+        assert isinstance(w_cell, FloatMutableCell)
+        assert w_cell.floatvalue == 3.5
+        assert space.float_w(space.getattr(w_a, space.wrap("f"))) == 3.5
+        #
+        space.setattr(w_a, space.wrap("f"), space.wrap("abc"))
+        assert space.str_w(w_a._mapdict_read_storage(attr.storageindex)) == "abc"
+        assert space.str_w(space.getattr(w_a, space.wrap("f"))) == "abc"
+
+
 def test_newdict_instance():
     w_dict = space.newdict(instance=True)
     assert type(w_dict.strategy) is MapDictStrategy
@@ -81,6 +81,7 @@ class TestW_SetObject:
     def test_create_set_from_list(self):
         from pypy.interpreter.baseobjspace import W_Root
         from pypy.objspace.std.setobject import BytesSetStrategy, ObjectSetStrategy, UnicodeSetStrategy
+        from pypy.objspace.std.setobject import FloatSetStrategy
         from pypy.objspace.std.floatobject import W_FloatObject
 
         w = self.space.wrap
@@ -117,9 +118,8 @@ class TestW_SetObject:
         w_list = W_ListObject(self.space, [w(1.0), w(2.0), w(3.0)])
         w_set = W_SetObject(self.space)
         _initialize_set(self.space, w_set, w_list)
-        assert w_set.strategy is self.space.fromcache(ObjectSetStrategy)
-        for item in w_set.strategy.unerase(w_set.sstorage):
-            assert isinstance(item, W_FloatObject)
+        assert w_set.strategy is self.space.fromcache(FloatSetStrategy)
+        assert w_set.strategy.unerase(w_set.sstorage) == {1.0:None, 2.0:None, 3.0:None}
 
         # changed cached object, need to change it back for other tests to pass
         intstr.get_storage_from_list = tmp_func
@@ -965,6 +965,24 @@ class AppTestAppSetTest:
         # operands when the first set is larger than the second
         assert type(frozenset([1, 2]) & set([2])) is frozenset
 
+    def test_float_strategy(self):
+        from __pypy__ import strategy
+        s = set([1.5, 2.5, -0.0])
+        assert strategy(s) == "FloatSetStrategy"
+        assert 0.0 in s and 2.5 in s and 3.5 not in s
+        assert strategy(s) == "FloatSetStrategy"
+        s.add(0.0)
+        assert len(s) == 3
+        assert s & set([2.5, 7.0]) == set([2.5])
+        assert strategy(s & set([2.5, 7.0])) == "FloatSetStrategy"
+        assert s - set(["a"]) == s
+        assert set([1.0, 2.0]) == set([1, 2])
+        assert 1 in set([1.0])
+        nan = float('nan')
+        s = set([1.5, nan])
+        assert strategy(s) == "ObjectSetStrategy"
+        assert nan in s
+
     def test_update_bug_strategy(self):
         from __pypy__ import strategy
         s = set([1, 2, 3])
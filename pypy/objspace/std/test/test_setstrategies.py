@@ -1,6 +1,7 @@
 from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (
     BytesIteratorImplementation, BytesSetStrategy, EmptySetStrategy,
+    FloatIteratorImplementation, FloatSetStrategy,
     IntegerIteratorImplementation, IntegerSetStrategy, ObjectSetStrategy,
     UnicodeIteratorImplementation, UnicodeSetStrategy)
 from pypy.objspace.std.listobject import W_ListObject
@@ -29,6 +30,39 @@ class TestW_SetStrategies:
         s = W_SetObject(self.space, self.wrapped([u"a", u"b"]))
         assert s.strategy is self.space.fromcache(UnicodeSetStrategy)
 
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.5, -0.0]))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+
+        s = W_SetObject(self.space, self.wrapped([1.5, float('nan')]))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+
+    def test_float(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([]))
+        s.add(space.wrap(1.5))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        s.add(space.wrap(0.0))
+        s.add(space.wrap(-0.0))
+        assert s.length() == 2
+        assert s.has_key(space.wrap(1.5))
+        assert not s.has_key(space.wrap(2.5))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        # ints can be equal to floats
+        assert s.has_key(space.wrap(0))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+        #
+        s1 = W_SetObject(space, self.wrapped([1.0, 2.5]))
+        s2 = W_SetObject(space, self.wrapped([1, 2]))
+        s3 = s1.intersect(s2)
+        assert s3.length() == 1 and s3.has_key(space.wrap(1))
+        s3 = W_SetObject(space, self.wrapped(["a"]))
+        s4 = s1.intersect(s3)
+        assert s4.strategy is space.fromcache(EmptySetStrategy)
+        #
+        s = W_SetObject(space, self.wrapped([1.5]))
+        s.add(space.wrap(float('nan')))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+
     def test_switch_to_object(self):
         s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s.add(self.space.wrap("six"))
@@ -133,6 +167,11 @@ class TestW_SetStrategies:
         assert isinstance(it, UnicodeIteratorImplementation)
         assert space.unwrap(it.next()) == u"a"
         assert space.unwrap(it.next()) == u"b"
+        #
+        s = W_SetObject(space, self.wrapped([1.5]))
+        it = s.iter()
+        assert isinstance(it, FloatIteratorImplementation)
+        assert space.unwrap(it.next()) == 1.5
 
     def test_listview(self):
         space = self.space
@@ -144,3 +183,6 @@ class TestW_SetStrategies:
         #
         s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         assert sorted(space.listview_unicode(s)) == [u"a", u"b"]
+        #
+        s = W_SetObject(space, self.wrapped([1.5, 2.5]))
+        assert sorted(space.listview_float(s)) == [1.5, 2.5]
@@ -1,6 +1,28 @@
 import py
 
-from pypy.objspace.std.test import test_bytesobject
+from pypy.objspace.std.test import test_bytesobject, test_unicodeobject
+from pypy.objspace.std.strbufobject import (W_StringBufferObject,
+    W_UnicodeBufferObject)
+
+
+class TestStringBufferObject:
+    spaceconfig = {"objspace.std.withstrbuf": True}
+
+    def test_prebuilt(self):
+        space = self.space
+        for w_a, w_b, cls in [
+                (space.wrap("abc"), space.wrap("def"), W_StringBufferObject),
+                (space.wrap(u"abc"), space.wrap(u"def"),
+                 W_UnicodeBufferObject)]:
+            w_s = space.add(w_a, w_b)
+            assert isinstance(w_s, cls)
+            w_s._cleanup_()
+            assert w_s.builder is None
+            w_t = space.add(w_s, w_b)
+            assert isinstance(w_t, cls)
+            assert space.eq_w(w_t, space.add(space.add(w_a, w_b), w_b))
+            assert space.len_w(w_s) == 6
+
 
 class AppTestStringObject(test_bytesobject.AppTestBytesObject):
     spaceconfig = {"objspace.std.withstrbuf": True}
@@ -83,3 +105,73 @@ class AppTestStringObject(test_bytesobject.AppTestBytesObject):
         a = 'a'
         a += 'b'
         raises(TypeError, "a += 5")
+
+    def test_add_unicode(self):
+        a = 'a'.__add__('b')
+        b = a + u'\xe9'
+        assert type(b) is unicode
+        assert b == u'ab\xe9'
+
+    def test_ord(self):
+        s = ''.__add__('x')
+        assert ord(s) == ord('x')
+
+
+class AppTestUnicodeBuffer(test_unicodeobject.AppTestUnicodeString):
+    spaceconfig = {"objspace.std.withstrbuf": True,
+                   "usemodules": ('unicodedata',)}
+
+    def test_basic(self):
+        import __pypy__
+        s = u"Hello, ".__add__(u"World!")
+        assert type(s) is unicode
+        assert 'W_UnicodeBufferObject' in __pypy__.internal_repr(s)
+
+    def test_add(self):
+        import __pypy__
+        all = u""
+        for i in range(20):
+            all += unicode(i)
+        assert 'W_UnicodeBufferObject' in __pypy__.internal_repr(all)
+        assert all == u"012345678910111213141516171819"
+        assert len(all) == 30
+
+    def test_add_twice(self):
+        x = u"a".__add__(u"b")
+        y = x + u"c"
+        c = x + u"d"
+        assert y == u"abc"
+        assert c == u"abd"
+
+    def test_add_str(self):
+        x = u"a".__add__(u"b")
+        y = x + "c"
+        assert type(y) is unicode
+        assert y == u"abc"
+        z = "0" + x
+        assert type(z) is unicode
+        assert z == u"0ab"
+        raises(TypeError, "x + 5")
+
+    def test_methods_and_operations(self):
+        x = u"\xe9a".__add__(u"b")
+        assert x.upper() == u"\xc9AB"
+        assert x[1:] == u"ab"
+        assert hash(x) == hash(u"\xe9ab")
+        assert {x: 1}[u"\xe9ab"] == 1
+        assert u"\xe9ab" == x and x == u"\xe9ab"
+        assert u"-".join([x, x]) == u"\xe9ab-\xe9ab"
+        assert u"%s!" % x == u"\xe9ab!"
+        assert x.encode('utf-8') == '\xc3\xa9ab'
+        assert "ab" in x
+        assert ord(u"".__add__(u"\xe9")) == 0xe9
+        assert int(u"1".__add__(u"2")) == 12
+
+    def test_subclass_and_marshal(self):
+        import marshal
+        class U(unicode):
+            pass
+        x = u"a".__add__(u"b")
+        assert U(x) == u"ab"
+        assert type(U(x)) is U
+        assert marshal.loads(marshal.dumps(x)) == u"ab"
@@ -0,0 +1,122 @@
+from pypy.objspace.std.test import test_bytesobject, test_unicodeobject
+from pypy.objspace.std.strsliceobject import (W_StringSliceObject,
+    W_UnicodeSliceObject, slice_is_worth_a_view)
+
+
+def test_slice_is_worth_a_view():
+    assert not slice_is_worth_a_view(100, 0, 10)
+    assert slice_is_worth_a_view(100, 0, 80)
+    assert not slice_is_worth_a_view(100000, 0, 1000)
+    assert slice_is_worth_a_view(100000, 50000, 100000)
+
+
+class TestStringSliceObject:
+    spaceconfig = {"objspace.std.withstrslice": True}
+
+    def test_force_drops_original(self):
+        space = self.space
+        for s, cls in [("x" * 1000, W_StringSliceObject),
+                       (u"x" * 1000, W_UnicodeSliceObject)]:
+            w_s = space.getslice(space.wrap(s), space.wrap(100),
+                                 space.wrap(900))
+            assert isinstance(w_s, cls)
+            assert w_s.str is s
+            assert space.len_w(w_s) == 800
+            w_s.force()
+            assert len(w_s.str) == 800
+            assert (w_s.start, w_s.stop) == (0, 800)
+            assert space.len_w(w_s) == 800
+
+
+class AppTestStringSlice(test_bytesobject.AppTestBytesObject):
+    spaceconfig = {"objspace.std.withstrslice": True}
+
+    def setup_class(cls):
+        cls.w_s = cls.space.wrap("0123456789" * 20)
+
+    def test_basic(self):
+        import __pypy__
+        s = self.s[10:150]
+        assert type(s) is str
+        assert 'W_StringSliceObject' in __pypy__.internal_repr(s)
+        assert s == ("0123456789" * 20)[10:150]
+        assert 'W_StringSliceObject' not in __pypy__.internal_repr(s[2:8])
+
+    def test_slice_of_slice(self):
+        import __pypy__
+        s = self.s[10:190]
+        t = s[5:-5]
+        assert 'W_StringSliceObject' in __pypy__.internal_repr(t)
+        assert t == self.s[15:185]
+        assert s[::2] == self.s[10:190:2]
+        assert s[-1] == "9"
+        assert s[0] == "0"
+        raises(IndexError, "s[180]")
+        raises(IndexError, "s[-181]")
+        assert s[3:3] == ""
+
+    def test_partition_strip(self):
+        import __pypy__
+        a, sep, b = self.s.partition("0")
+        assert a == ""
+        assert 'W_StringSliceObject' in __pypy__.internal_repr(b)
+        assert b == self.s[1:]
+        s = ("  " + self.s + "  ").strip()
+        assert 'W_StringSliceObject' in __pypy__.internal_repr(s)
+        assert s == self.s
+
+    def test_operations(self):
+        s = self.s[10:150]
+        t = ("0123456789" * 20)[10:150]
+        assert len(s) == 140
+        assert hash(s) == hash(t)
+        assert s == t and t == s
+        assert s.upper() == t
+        assert s + "x" == t + "x"
+        assert s.split("9") == t.split("9")
+        assert s.find("5") == 5
+        assert int(self.s[:100]) == int("0123456789" * 10)
+        assert buffer(s) == buffer(t)
+        assert {s: 1}[t] == 1
+
+
+class AppTestUnicodeSlice(test_unicodeobject.AppTestUnicodeString):
+    spaceconfig = {"objspace.std.withstrslice": True,
+                   "usemodules": ('unicodedata',)}
+
+    def setup_class(cls):
+        cls.w_s = cls.space.wrap(u"0123456789" * 20)
+
+    def test_basic(self):
+        import __pypy__
+        s = self.s[10:150]
+        assert type(s) is unicode
+        assert 'W_UnicodeSliceObject' in __pypy__.internal_repr(s)
+        assert s == (u"0123456789" * 20)[10:150]
+        assert 'W_UnicodeSliceObject' not in __pypy__.internal_repr(s[2:8])
+
+    def test_slice_of_slice(self):
+        import __pypy__
+        s = self.s[10:190]
+        t = s[5:-5]
+        assert 'W_UnicodeSliceObject' in __pypy__.internal_repr(t)
+        assert t == self.s[15:185]
+        assert s[::2] == self.s[10:190:2]
+        assert s[-1] == u"9"
+        raises(IndexError, "s[180]")
+        assert s.__getslice__(3, 3) == u""
+
+    def test_operations(self):
+        s = self.s[10:150]
+        t = (u"0123456789" * 20)[10:150]
+        assert len(s) == 140
+        assert hash(s) == hash(t)
+        assert s == t and t == s
+        assert s == str(t)
+        assert s.upper() == t
+        assert s + u"x" == t + u"x"
+        assert "x" + s == "x" + t
+        assert s.split(u"9") == t.split(u"9")
+        assert t in u"x" + s
+        assert s.encode("ascii") == str(t)
+        assert {s: 1}[t] == 1
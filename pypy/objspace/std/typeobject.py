@@ -37,6 +37,17 @@ class IntMutableCell(MutableCell):
         return "<IntMutableCell: %s>" % (self.intvalue, )
 
 
+class FloatMutableCell(MutableCell):
+    def __init__(self, floatvalue):
+        self.floatvalue = floatvalue
+
+    def unwrap_cell(self, space):
+        return space.wrap(self.floatvalue)
+
+    def __repr__(self):
+        return "<FloatMutableCell: %s>" % (self.floatvalue, )
+
+
 def unwrap_cell(space, w_value):
     if space.config.objspace.std.withtypeversion:
         if isinstance(w_value, MutableCell):
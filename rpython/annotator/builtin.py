@@ -301,8 +301,7 @@ def robjmodel_instantiate(s_clspbc):
             clsdef = clsdef.commonbase(cdef)
     return SomeInstance(clsdef)
 
-@analyzer_for(rpython.rlib.objectmodel.r_dict)
-def robjmodel_r_dict(s_eqfn, s_hashfn, s_force_non_null=None):
+def _r_dictdef(s_eqfn, s_hashfn, s_force_non_null):
     if s_force_non_null is None:
         force_non_null = False
     else:
@@ -311,13 +310,15 @@ def robjmodel_r_dict(s_eqfn, s_hashfn, s_force_non_null=None):
     dictdef = getbookkeeper().getdictdef(is_r_dict=True,
                                          force_non_null=force_non_null)
     dictdef.dictkey.update_rdict_annotations(s_eqfn, s_hashfn)
-    return SomeDict(dictdef)
+    return dictdef
+
+@analyzer_for(rpython.rlib.objectmodel.r_dict)
+def robjmodel_r_dict(s_eqfn, s_hashfn, s_force_non_null=None):
+    return SomeDict(_r_dictdef(s_eqfn, s_hashfn, s_force_non_null))
 
 @analyzer_for(rpython.rlib.objectmodel.r_ordereddict)
-def robjmodel_r_ordereddict(s_eqfn, s_hashfn):
-    dictdef = getbookkeeper().getdictdef(is_r_dict=True)
-    dictdef.dictkey.update_rdict_annotations(s_eqfn, s_hashfn)
-    return SomeOrderedDict(dictdef)
+def robjmodel_r_ordereddict(s_eqfn, s_hashfn, s_force_non_null=None):
+    return SomeOrderedDict(_r_dictdef(s_eqfn, s_hashfn, s_force_non_null))
 
 @analyzer_for(rpython.rlib.objectmodel.hlinvoke)
 def robjmodel_hlinvoke(s_repr, s_llcallable, *args_s):
@@ -171,6 +171,12 @@ translation_optiondescription = OptionDescription(
     IntOption("make_jobs", "Specify -j argument to make for compilation"
               " (C backend only)",
               cmdline="--make-jobs", default=detect_number_of_processors()),
+    IntOption("source_jobs", "Number of processes used to generate the C"
+              " source files (C backend only, needs fork())",
+              cmdline="--source-jobs", default=1),
+    BoolOption("object_cache", "Reuse the object files of C files that did"
+               " not change since a previous translation (C backend only)",
+               cmdline="--object-cache", default=False),
 
     # Flags of the TranslationContext:
     BoolOption("list_comprehension_operations",
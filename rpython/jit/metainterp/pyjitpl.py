@@ -2057,16 +2057,19 @@ class MetaInterp(object):
 
     def aborted_tracing(self, reason):
         self.staticdata.profiler.count(reason)
-        debug_print('~~~ ABORTING TRACING')
         jd_sd = self.jitdriver_sd
         if not self.current_merge_points:
             greenkey = None # we're in the bridge
+            debug_print('~~~ ABORTING TRACING', Counters.counter_names[reason])
         else:
             greenkey = self.current_merge_points[0][0][:jd_sd.num_green_args]
+            location = jd_sd.warmstate.get_location_str(greenkey)
+            debug_print('~~~ ABORTING TRACING', Counters.counter_names[reason],
+                        'at', location)
             self.staticdata.warmrunnerdesc.hooks.on_abort(reason,
                                                           jd_sd.jitdriver,
                                                           greenkey,
-                                                          jd_sd.warmstate.get_location_str(greenkey),
+                                                          location,
                                                           self.staticdata.logger_ops._make_log_operations(),
                                                           self.history.operations)
         self.staticdata.stats.aborted()
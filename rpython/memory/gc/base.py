@@ -181,6 +181,9 @@ class GCBase(object):
     def set_max_heap_size(self, size):
         raise NotImplementedError
 
+    def get_stats(self, stat_no):
+        return -1
+
     def trace(self, obj, callback, arg):
         """Enumerate the locations inside the given obj that can contain
         GC pointers.  For each such location, callback(pointer, arg) is
@@ -63,6 +63,7 @@ from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
 from rpython.rlib.objectmodel import specialize
+from rpython.rlib import rgc
 
 #
 # Handles the objects in 2 generations:
@@ -348,6 +349,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
         self.gc_state = STATE_SCANNING
         #
+        # How many times the marking phase ran out of objects to trace and
+        # started again with the objects modified in the meantime.
+        self.marking_rounds = 0
+        #
         # A list of all objects with finalizers (these are never young).
         self.objects_with_finalizers = self.AddressDeque()
         self.young_objects_with_light_finalizers = self.AddressStack()
@@ -890,6 +895,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.max_heap_size < self.next_major_collection_threshold:
                 self.next_major_collection_threshold = self.max_heap_size
 
+    def get_stats(self, stat_no):
+        if stat_no == rgc.TOTAL_MEMORY:
+            return intmask(self.get_total_memory_used())
+        elif stat_no == rgc.MAJOR_COLLECTIONS:
+            return self.num_major_collects
+        elif stat_no == rgc.PAGES_SWEPT:
+            return self.ac.num_pages_swept
+        elif stat_no == rgc.PAGES_SWEPT_LAZILY:
+            return self.ac.num_pages_swept_lazily
+        return -1
+
     def raw_malloc_memory_pressure(self, sizehint):
         # Decrement by 'sizehint' plus a very little bit extra.  This
         # is needed e.g. for _rawffi, which may allocate a lot of tiny
@@ -2015,6 +2031,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.collect_roots()
             self.gc_state = STATE_MARKING
             self.more_objects_to_trace = self.AddressStack()
+            self.marking_rounds = 0
             #END SCANNING
         elif self.gc_state == STATE_MARKING:
             debug_print("number of objects to mark",
@@ -2026,19 +2043,26 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if estimate_from_nursery > estimate:
                 estimate = estimate_from_nursery
             estimate = intmask(estimate)
+            # Every time we run out of objects to trace, the objects
+            # modified in the meantime are traced again.  To ensure
+            # termination, the steps get longer with each such round,
+            # until the marking catches up with the mutator.
+            try:
+                estimate = ovfcheck(estimate * (self.marking_rounds + 1))
+            except OverflowError:
+                estimate = sys.maxint
             remaining = self.visit_all_objects_step(estimate)
             #
-            if remaining >= estimate // 2:
-                if self.more_objects_to_trace.non_empty():
-                    # We consumed less than 1/2 of our step's time, and
-                    # there are more objects added during the marking steps
-                    # of this major collection.  Visit them all now.
-                    # The idea is to ensure termination at the cost of some
-                    # incrementality, in theory.
-                    swap = self.objects_to_trace
-                    self.objects_to_trace = self.more_objects_to_trace
-                    self.more_objects_to_trace = swap
-                    self.visit_all_objects()
+            if remaining > 0 and self.more_objects_to_trace.non_empty():
+                # There are more objects added during the marking steps
+                # of this major collection.  Use the rest of this step's
+                # budget to visit them, instead of visiting them all now,
+                # which was a potentially long pause.
+                swap = self.objects_to_trace
+                self.objects_to_trace = self.more_objects_to_trace
+                self.more_objects_to_trace = swap
+                self.marking_rounds += 1
+                self.visit_all_objects_step(remaining)
 
             # XXX A simplifying assumption that should be checked,
             # finalizers/weak references are rare and short which means that
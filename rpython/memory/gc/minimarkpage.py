@@ -140,6 +140,16 @@ class ArenaCollection(object):
         # the total memory used, counting every block in use, without
         # the additional bookkeeping stuff.
         self.total_memory_used = r_uint(0)
+        #
+        # true between two steps of mass_free_incremental(): then malloc()
+        # sweeps the old pages of a size class before it takes a new page
+        # for it, using 'lazy_ok_to_free_func'.
+        self.lazy_sweeping = False
+        #
+        # statistics: the number of pages swept so far, and how many of
+        # them were swept by malloc() instead of mass_free_incremental()
+        self.num_pages_swept = 0
+        self.num_pages_swept_lazily = 0
 
 
     def _new_page_ptr_list(self, length):
@@ -160,7 +170,10 @@ class ArenaCollection(object):
         size_class = nsize >> WORD_POWER_2
         page = self.page_for_size[size_class]
         if page == PAGE_NULL:
-            page = self.allocate_new_page(size_class)
+            if self.lazy_sweeping:
+                page = self.sweep_pages_lazily(size_class)
+            if page == PAGE_NULL:
+                page = self.allocate_new_page(size_class)
         #
         # The result is simply 'page.freeblock'
         result = page.freeblock
@@ -243,6 +256,39 @@ class ArenaCollection(object):
         return page
 
 
+    def sweep_pages_lazily(self, size_class):
+        """Sweep the old pages of the given size class until one of them
+        has room for more objects.  Return that page, or PAGE_NULL if all
+        old pages of this size class are still full or freed.
+        """
+        nblocks = self.nblocks_for_size[size_class]
+        block_size = size_class * WORD
+        ok_to_free_func = self.lazy_ok_to_free_func
+        while True:
+            page = self.old_page_for_size[size_class]
+            if page != PAGE_NULL:
+                self.old_page_for_size[size_class] = page.nextpage
+            else:
+                page = self.old_full_page_for_size[size_class]
+                if page == PAGE_NULL:
+                    return PAGE_NULL
+                self.old_full_page_for_size[size_class] = page.nextpage
+            #
+            self.num_pages_swept += 1
+            self.num_pages_swept_lazily += 1
+            surviving = self.walk_page(page, block_size, ok_to_free_func)
+            if surviving == nblocks:
+                page.nextpage = self.full_page_for_size[size_class]
+                self.full_page_for_size[size_class] = page
+            elif surviving > 0:
+                page.nextpage = self.page_for_size[size_class]
+                self.page_for_size[size_class] = page
+                return page
+            else:
+                self.free_page(page)
+    sweep_pages_lazily._dont_inline_ = True
+
+
     def _all_arenas(self):
         """For testing.  Enumerates all arenas."""
         if self.current_arena:
@@ -340,6 +386,7 @@ class ArenaCollection(object):
         'max_pages' is reached.
         """
         size_class = self.size_class_with_old_pages
+        self.lazy_sweeping = False
         #
         while size_class >= 1:
             #
@@ -353,6 +400,8 @@ class ArenaCollection(object):
                                                 max_pages)
             if max_pages <= 0:
                 self.size_class_with_old_pages = size_class
+                self.lazy_ok_to_free_func = ok_to_free_func
+                self.lazy_sweeping = True
                 return False
             #
             size_class -= 1
@@ -432,6 +481,7 @@ class ArenaCollection(object):
                 # Collect the page.
                 surviving = self.walk_page(page, block_size, ok_to_free_func)
                 nextpage = page.nextpage
+                self.num_pages_swept += 1
                 #
                 if surviving == nblocks:
                     #
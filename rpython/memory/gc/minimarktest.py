@@ -20,6 +20,8 @@ class SimpleArenaCollection(object):
         self.small_request_threshold = small_request_threshold
         self.all_objects = []
         self.total_memory_used = 0
+        self.num_pages_swept = 0
+        self.num_pages_swept_lazily = 0
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -667,6 +667,32 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         self.gc.debug_gc_step_until(incminimark.STATE_SCANNING)
         assert self.stackroots[1].x == 13
 
+    def test_marking_steps_stay_bounded(self):
+        for i in range(20):
+            curobj = self.malloc(S)
+            curobj.x = i
+            self.stackroots.append(curobj)
+        self.gc.debug_gc_step_until(incminimark.STATE_MARKING)
+        # the objects modified during the marking phase are traced again
+        # in bounded steps, not all at once
+        def visit_all_objects():
+            raise AssertionError("unbounded marking step")
+        self.gc.visit_all_objects = visit_all_objects
+        steps = 0
+        while self.gc.gc_state == incminimark.STATE_MARKING:
+            for i in range(len(self.stackroots)):
+                newobj = self.malloc(S)
+                newobj.x = i
+                self.write(self.stackroots[i], 'next', newobj)
+            self.gc.debug_gc_step()
+            steps += 1
+            assert steps < 100
+        assert self.gc.marking_rounds > 0
+        del self.gc.visit_all_objects
+        self.gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        for i in range(len(self.stackroots)):
+            assert self.stackroots[i].next.x == i
+
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
     def test_malloc_fixedsize_no_cleanup(self):
@@ -400,6 +400,30 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_mass_free_incremental_sweeps_lazily_on_malloc():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "###", fill_with_objects=2)
+    ok_to_free = OkToFree(ac, False)
+    ac.mass_free_prepare()
+    assert not ac.mass_free_incremental(ok_to_free, 1)
+    assert ac.num_pages_swept == 1
+    assert ac.page_for_size[2] == PAGE_NULL
+    #
+    # the page swept so far is still full: malloc() sweeps the next old
+    # page itself, instead of taking a new page
+    ok_to_free.answer = 0.5
+    obj = ac.malloc(2*WORD)
+    assert ac.num_pages_swept == 2
+    assert ac.num_pages_swept_lazily == 1
+    checkpage(ac, ac.full_page_for_size[2], 1)  # full again after malloc
+    assert obj == pagenum(ac, 1) + hdrsize + 2*WORD
+    assert ac.page_for_size[2] == PAGE_NULL
+    #
+    assert ac.mass_free_incremental(ok_to_free, 10)
+    assert ac.num_pages_swept == 3
+    assert len(ok_to_free.seen) == 9
+    assert not ac.lazy_sweeping
+
 # ____________________________________________________________
 
 def test_random(incremental=False):
@@ -455,9 +479,8 @@ def test_random(incremental=False):
                 while not ac.mass_free_incremental(ok_to_free,
                                                    random.randrange(1, 3)):
                     print '[]'
-                    prev = ac.total_memory_used
                     allocate_object(live_objects_extra)
-                    fresh_extra += ac.total_memory_used - prev
+                fresh_extra = sum(live_objects_extra.values())
             #
             # Check that we have seen all objects
             assert sorted(ok_to_free.seen) == sorted(live_objects)
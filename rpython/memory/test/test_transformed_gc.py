@@ -1297,6 +1297,35 @@ class TestIncrementalMiniMarkGC(TestMiniMarkGC):
         res = run([])
         assert res
 
+    def define_get_stats(cls):
+        S = lltype.GcStruct('S', ('x', lltype.Signed))
+        def f():
+            lst = [lltype.malloc(S) for i in range(100)]
+            lst[99].x = 42
+            rgc.collect()
+            if rgc.get_stats(rgc.TOTAL_MEMORY) <= 0:
+                return 4
+            if lst[99].x != 42:
+                return 6
+            del lst
+            rgc.collect()
+            if rgc.get_stats(rgc.MAJOR_COLLECTIONS) < 2:
+                return 1
+            swept = rgc.get_stats(rgc.PAGES_SWEPT)
+            if swept <= 0:
+                return 2
+            if not (0 <= rgc.get_stats(rgc.PAGES_SWEPT_LAZILY) <= swept):
+                return 3
+            if rgc.get_stats(12345) != -1:
+                return 5
+            return 0
+        return f
+
+    def test_get_stats(self):
+        run = self.runner("get_stats")
+        res = run([])
+        assert res == 0
+
 # ________________________________________________________________
 # tagged pointers
 
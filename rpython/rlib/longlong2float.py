@@ -8,7 +8,7 @@ in which it does not work.
 
 from __future__ import with_statement
 from rpython.annotator import model as annmodel
-from rpython.rlib.rarithmetic import r_int64
+from rpython.rlib.rarithmetic import r_int64, intmask
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rtyper.extregistry import ExtRegistryEntry
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
@@ -99,3 +99,39 @@ class LongLong2FloatEntry(ExtRegistryEntry):
         [v_longlong] = hop.inputargs(lltype.SignedLongLong)
         hop.exception_cannot_occur()
         return hop.genop("convert_longlong_bytes_to_float", [v_longlong], resulttype=lltype.Float)
+
+
+# -------- NaN-boxing of 32-bit integers --------
+# A float64 whose high word is 'nan_high_word_int32' is a nonstandard NaN
+# that no float operation produces (the hardware NaNs are 0x7FF8... and
+# 0xFFF8...).  We use the low word of such NaNs to store a 32-bit integer,
+# which lets a single r_int64 hold either a float or a small integer
+# without losing track of which one:
+#   ff ff ff fe xx xx xx xx  (signed 32-bit int)
+
+nan_high_word_int32 = -2          # -2 == (int)0xfffffffe
+nan_encoded_zero = r_int64(nan_high_word_int32 << 32)
+
+def can_encode_int32(value):
+    return -2147483648 <= value <= 2147483647
+
+def can_encode_float(value):
+    return intmask(float2longlong(value) >> 32) != nan_high_word_int32
+
+def encode_int32_into_longlong_nan(value):
+    return (nan_encoded_zero +
+            rffi.cast(rffi.LONGLONG, rffi.cast(rffi.UINT, value)))
+
+def decode_int32_from_longlong_nan(value):
+    return rffi.cast(lltype.Signed, rffi.cast(rffi.INT, value))
+
+def is_int32_from_longlong_nan(value):
+    return intmask(value >> 32) == nan_high_word_int32
+
+def maybe_decode_longlong_as_float(value):
+    """Return the float value of an r_int64 made by float2longlong() or by
+    encode_int32_into_longlong_nan(); small ints are converted exactly."""
+    if is_int32_from_longlong_nan(value):
+        return float(decode_int32_from_longlong_nan(value))
+    else:
+        return longlong2float(value)
@@ -18,6 +18,18 @@ def set_max_heap_size(nbytes):
     """
     pass
 
+# the statistics that get_stats() can return
+TOTAL_MEMORY = 0
+MAJOR_COLLECTIONS = 1
+PAGES_SWEPT = 2
+PAGES_SWEPT_LAZILY = 3
+
+def get_stats(stat_no):
+    """Return one of the statistics kept by the GC, or -1 if the GC in
+    use doesn't keep it.
+    """
+    return -1
+
 # for test purposes we allow objects to be pinned and use
 # the following list to keep track of the pinned objects
 _pinned_objects = []
@@ -136,6 +148,19 @@ class SetMaxHeapSizeEntry(ExtRegistryEntry):
         return hop.genop('gc_set_max_heap_size', [v_nbytes],
                          resulttype=lltype.Void)
 
+class GetStatsEntry(ExtRegistryEntry):
+    _about_ = get_stats
+
+    def compute_result_annotation(self, s_stat_no):
+        from rpython.annotator import model as annmodel
+        return annmodel.SomeInteger()
+
+    def specialize_call(self, hop):
+        [v_stat_no] = hop.inputargs(lltype.Signed)
+        hop.exception_cannot_occur()
+        return hop.genop('gc_get_stats', [v_stat_no],
+                         resulttype=lltype.Signed)
+
 def can_move(p):
     """Check if the GC object 'p' is at an address that can move.
     Must not be called with None.  With non-moving GCs, it is always False.
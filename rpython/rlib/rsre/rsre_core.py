@@ -5,6 +5,7 @@ from rpython.rlib.rsre import rsre_char
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.objectmodel import we_are_translated
 from rpython.rlib import jit
+from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rlib.rsre.rsre_jit import install_jitdriver, install_jitdriver_spec
 
 
@@ -63,6 +64,7 @@ def specializectx(func):
     # concrete subclass
     specialized_methods = []
     for prefix, concreteclass in [('buf', BufMatchContext),
+                                  ('raw', RawMatchContext),
                                   ('str', StrMatchContext),
                                   ('uni', UnicodeMatchContext)]:
         newfunc = func_with_new_name(func, prefix + specname)
@@ -89,6 +91,8 @@ class AbstractMatchContext(object):
     match_end = 0
     match_marks = None
     match_marks_flat = None
+    prefilter = None      # a Prefilter from rsre_prefilter.py, or None
+    nfa = None            # an NFAProgram from rsre_nfa.py, or None
 
     def __init__(self, pattern, match_start, end, flags):
         # 'match_start' and 'end' must be known to be non-negative
@@ -192,8 +196,46 @@ class BufMatchContext(AbstractMatchContext):
         return rsre_char.getlower(c, self.flags)
 
     def fresh_copy(self, start):
-        return BufMatchContext(self.pattern, self._buffer, start,
-                               self.end, self.flags)
+        ctx = BufMatchContext(self.pattern, self._buffer, start,
+                             self.end, self.flags)
+        ctx.prefilter = self.prefilter
+        ctx.nfa = self.nfa
+        return ctx
+
+class RawMatchContext(AbstractMatchContext):
+    """Concrete subclass for matching in a buffer that exposes its memory
+    as a raw address (mmap, array.array...).  The characters are read
+    directly from memory instead of via the Buffer interface."""
+
+    _immutable_fields_ = ["_buffer"]
+    _ptr = lltype.nullptr(rffi.CCHARP.TO)
+
+    def __init__(self, pattern, buf, match_start, end, flags):
+        AbstractMatchContext.__init__(self, pattern, match_start, end, flags)
+        self._buffer = buf     # also keeps the memory alive
+        self._ptr = buf.get_raw_address()
+
+    def refresh_address(self):
+        """The buffer may have been resized or reallocated since the
+        context was made, e.g. between two steps of finditer()."""
+        if self._buffer.getlength() < self.end:
+            raise Error("buffer size changed during matching")
+        self._ptr = self._buffer.get_raw_address()
+
+    def str(self, index):
+        check_nonneg(index)
+        return ord(self._ptr[index])
+
+    def lowstr(self, index):
+        c = self.str(index)
+        return rsre_char.getlower(c, self.flags)
+
+    def fresh_copy(self, start):
+        ctx = RawMatchContext(self.pattern, self._buffer, start,
+                              self.end, self.flags)
+        ctx.prefilter = self.prefilter
+        ctx.nfa = self.nfa
+        return ctx
 
 class StrMatchContext(AbstractMatchContext):
     """Concrete subclass for matching in a plain string."""
@@ -215,8 +257,11 @@ class StrMatchContext(AbstractMatchContext):
         return rsre_char.getlower(c, self.flags)
 
     def fresh_copy(self, start):
-        return StrMatchContext(self.pattern, self._string, start,
-                               self.end, self.flags)
+        ctx = StrMatchContext(self.pattern, self._string, start,
+                             self.end, self.flags)
+        ctx.prefilter = self.prefilter
+        ctx.nfa = self.nfa
+        return ctx
 
 class UnicodeMatchContext(AbstractMatchContext):
     """Concrete subclass for matching in a unicode string."""
@@ -236,8 +281,11 @@ class UnicodeMatchContext(AbstractMatchContext):
         return rsre_char.getlower(c, self.flags)
 
     def fresh_copy(self, start):
-        return UnicodeMatchContext(self.pattern, self._unicodestr, start,
-                                   self.end, self.flags)
+        ctx = UnicodeMatchContext(self.pattern, self._unicodestr, start,
+                                 self.end, self.flags)
+        ctx.prefilter = self.prefilter
+        ctx.nfa = self.nfa
+        return ctx
 
 # ____________________________________________________________
 
@@ -1008,8 +1056,10 @@ def match(pattern, string, start=0, end=sys.maxint, flags=0):
         return None
 
 def search(pattern, string, start=0, end=sys.maxint, flags=0):
+    from rpython.rlib.rsre.rsre_prefilter import compute_prefilter
     start, end = _adjust(start, end, len(string))
     ctx = StrMatchContext(pattern, string, start, end, flags)
+    ctx.prefilter = compute_prefilter(pattern)
     if search_context(ctx):
         return ctx
     else:
@@ -1023,6 +1073,9 @@ def match_context(ctx):
     ctx.original_pos = ctx.match_start
     if ctx.end < ctx.match_start:
         return False
+    if ctx.nfa is not None:
+        from rpython.rlib.rsre.rsre_nfa import nfa_match
+        return nfa_match(ctx, ctx.nfa, True)
     ctx.jitdriver_Match.jit_merge_point(ctx=ctx)
     return sre_match(ctx, 0, ctx.match_start, None) is not None
 
@@ -1030,6 +1083,9 @@ def search_context(ctx):
     ctx.original_pos = ctx.match_start
     if ctx.end < ctx.match_start:
         return False
+    if ctx.nfa is not None:
+        from rpython.rlib.rsre.rsre_nfa import nfa_match
+        return nfa_match(ctx, ctx.nfa, False)
     base = 0
     charset = False
     if ctx.pat(base) == OPCODE_INFO:
@@ -1040,10 +1096,15 @@ def search_context(ctx):
         else:
             charset = (flags & rsre_char.SRE_INFO_CHARSET)
         base += 1 + ctx.pat(1)
+    prefilter = ctx.prefilter
+    if prefilter is not None and prefilter.skips_positions:
+        return prefilter_search(ctx, base)
     if ctx.pat(base) == OPCODE_LITERAL:
         return literal_search(ctx, base)
     if charset:
         return charset_search(ctx, base)
+    if prefilter is not None:
+        return prefilter_search(ctx, base)
     return regular_search(ctx, base)
 
 install_jitdriver('RegularSearch',
@@ -1062,6 +1123,73 @@ def regular_search(ctx, base):
         start += 1
     return False
 
+install_jitdriver_spec("PrefilterSearch",
+                       greens=['base', 'ctx.pattern'],
+                       reds=['start', 'found', 'ctx'],
+                       debugprint=(1, 0))
+@specializectx
+def prefilter_search(ctx, base):
+    # only try to match at the positions allowed by ctx.prefilter: close
+    # enough before an occurrence of one of its literals
+    from rpython.rlib.rsre.rsre_prefilter import DOTSTAR_LINE, DOTSTAR_ALL
+    start = ctx.match_start
+    found = -1     # position of the next literal, or -1 if not searched yet
+    while start <= ctx.end:
+        ctx.jitdriver_PrefilterSearch.jit_merge_point(ctx=ctx, start=start,
+                                                      found=found, base=base)
+        prefilter = ctx.prefilter
+        if len(prefilter.literals) > 0:
+            if found < start + prefilter.offset_min:
+                found = find_literals(ctx, start + prefilter.offset_min)
+                if found < 0:
+                    return False
+            if prefilter.offset_max >= 0:
+                first = found - prefilter.offset_max
+                if start < first:
+                    assert first >= 0
+                    start = first
+        if sre_match(ctx, base, start, None) is not None:
+            ctx.match_start = start
+            return True
+        if prefilter.dotstar == DOTSTAR_ALL:
+            return False
+        elif prefilter.dotstar == DOTSTAR_LINE:
+            # all positions up to the end of the line fail too
+            start = find_end_of_line(ctx, start)
+        start += 1
+    return False
+
+@specializectx
+def find_end_of_line(ctx, start):
+    while start < ctx.end and ctx.str(start) != 10:    # '\n'
+        start += 1
+    return start
+
+@specializectx
+def find_literals(ctx, start):
+    # return the first position >= start where one of the literals of
+    # ctx.prefilter occurs, or -1
+    assert start >= 0
+    literals = ctx.prefilter.literals
+    firstchars = ctx.prefilter.firstchars
+    while start < ctx.end:
+        c = ctx.str(start)
+        if c >= 256 or firstchars[c]:
+            for literal in literals:
+                if literal[0] == c and match_literal(ctx, start, literal):
+                    return start
+        start += 1
+    return -1
+
+@specializectx
+def match_literal(ctx, start, literal):
+    if start + len(literal) > ctx.end:
+        return False
+    for i in range(1, len(literal)):
+        if ctx.str(start + i) != literal[i]:
+            return False
+    return True
+
 install_jitdriver_spec("LiteralSearch",
                        greens=['base', 'character', 'ctx.pattern'],
                        reds=['start', 'ctx'],
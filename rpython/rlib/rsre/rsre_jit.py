@@ -34,9 +34,11 @@ def install_jitdriver(name, **kwds):
 
 def install_jitdriver_spec(name, **kwds):
     from rpython.rlib.rsre.rsre_core import BufMatchContext
+    from rpython.rlib.rsre.rsre_core import RawMatchContext
     from rpython.rlib.rsre.rsre_core import StrMatchContext
     from rpython.rlib.rsre.rsre_core import UnicodeMatchContext
     for prefix, concreteclass in [('Buf', BufMatchContext),
+                                  ('Raw', RawMatchContext),
                                   ('Str', StrMatchContext),
                                   ('Uni', UnicodeMatchContext)]:
         jitdriver = RSreJitDriver(prefix + name, **kwds)
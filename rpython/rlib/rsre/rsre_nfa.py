@@ -0,0 +1,526 @@
+"""
+A backtracking-free matching engine for rsre.
+
+Patterns without backreferences, lookarounds or conditionals are compiled
+into a small program for a Thompson NFA simulation ("Pike VM").  All
+possible matches are run in lock step over the string, in the same order
+of priority as the backtracking engine of rsre_core would try them, so
+the result (including the groups) is the same.  The time taken is linear
+in the length of the string times the length of the program, whereas
+backtracking can be exponential on ambiguous patterns like '(a+)+$'.
+See compile_nfa().
+"""
+
+from rpython.rlib.rsre import rsre_char
+from rpython.rlib.rsre.rsre_core import (OPCODE_ANY, OPCODE_ANY_ALL,
+    OPCODE_AT, OPCODE_BRANCH, OPCODE_IN, OPCODE_IN_IGNORE, OPCODE_INFO,
+    OPCODE_LITERAL, OPCODE_LITERAL_IGNORE, OPCODE_MARK, OPCODE_MAX_UNTIL,
+    OPCODE_MIN_REPEAT_ONE, OPCODE_MIN_UNTIL, OPCODE_NOT_LITERAL,
+    OPCODE_NOT_LITERAL_IGNORE, OPCODE_REPEAT, OPCODE_REPEAT_ONE,
+    OPCODE_SUCCESS, Mark, find_literals, specializectx, sre_at,
+    unroll_char_checker)
+from rpython.rlib.rsre.rsre_prefilter import UNBOUNDED, get_min_width
+
+
+# instructions of the NFA programs
+I_CHAR  = 0      # match one character with the rsre_core opcode at 'arg'
+I_AT    = 1      # check the AT code 'arg'
+I_MARK  = 2      # set the mark 'arg'
+I_JUMP  = 3      # continue at 'arg'
+I_SPLIT = 4      # continue at 'arg', and with a lower priority at 'arg2'
+I_MATCH = 5
+
+# patterns producing bigger programs are left to the backtracking engine
+MAX_PROGRAM_SIZE = 2000
+
+# the sets of characters computed below are lists of CHARSET_SIZE flags:
+# one for each of the first 256 characters, and one for all the others
+CHARSET_SIZE = 257
+
+
+class NFAProgram(object):
+    _immutable_fields_ = ['ops[*]', 'args[*]', 'args2[*]', 'firstchars']
+
+    def __init__(self, ops, args, args2, firstchars):
+        self.ops = ops
+        self.args = args
+        self.args2 = args2
+        # the characters that can start a match, or None if the pattern
+        # can match the empty string
+        self.firstchars = firstchars
+
+
+class NotSupported(Exception):
+    pass
+
+
+def _ascii_lower(c):
+    if ord('A') <= c <= ord('Z'):
+        return c + (ord('a') - ord('A'))
+    return c
+
+def char_charset(code, ppos):
+    """Return a superset of the characters matched by the rsre_core
+    opcode at 'ppos'."""
+    op = code[ppos]
+    charset = [True] * CHARSET_SIZE
+    if op == OPCODE_LITERAL:
+        charset = [False] * CHARSET_SIZE
+        charset[min(code[ppos + 1], 256)] = True
+    elif op == OPCODE_NOT_LITERAL:
+        if code[ppos + 1] < 256:
+            charset[code[ppos + 1]] = False
+    elif op == OPCODE_ANY:
+        charset[ord('\n')] = False
+    elif op == OPCODE_IN:
+        for c in range(256):
+            charset[c] = rsre_char.check_charset(code, ppos + 2, c)
+    elif op == OPCODE_LITERAL_IGNORE or op == OPCODE_IN_IGNORE:
+        # how the non-ASCII characters are lowercased depends on the flags
+        for c in range(128):
+            if op == OPCODE_LITERAL_IGNORE:
+                charset[c] = _ascii_lower(c) == code[ppos + 1]
+            else:
+                charset[c] = rsre_char.check_charset(code, ppos + 2,
+                                                     _ascii_lower(c))
+    return charset
+
+def _merge(charset, other):
+    for i in range(CHARSET_SIZE):
+        if other[i]:
+            charset[i] = True
+
+def _overlap(charset, other):
+    # the characters above 255 are ignored: the character classes almost
+    # all contain some of them, and it is not worth being more precise
+    for i in range(256):
+        if charset[i] and other[i]:
+            return True
+    return False
+
+def _branch_end(code, ppos):
+    ppos += 1
+    while code[ppos]:
+        ppos += code[ppos]
+    return ppos + 1
+
+
+class _Follow(object):
+    """What can come after a part of the pattern: code[ppos:stop], and
+    then 'outer' (None for the end of the pattern)."""
+
+    def __init__(self, ppos, stop, outer):
+        self.ppos = ppos
+        self.stop = stop
+        self.outer = outer
+        self.charset = None
+
+
+class _Builder(object):
+    def __init__(self, code):
+        self.code = code
+        self.ops = []
+        self.args = []
+        self.args2 = []
+        self.repeat_depth = 0
+        # set if the pattern contains a repetition in which the backtracking
+        # engine may have to try an exponential number of ways to match:
+        # alternatives starting with the same characters, or a nested
+        # repetition that can go on with the same characters as what
+        # follows it
+        self.backtracking_prone = False
+        self.checked = {}
+
+    def emit(self, op, arg=0, arg2=0):
+        if len(self.ops) >= MAX_PROGRAM_SIZE:
+            raise NotSupported
+        self.ops.append(op)
+        self.args.append(arg)
+        self.args2.append(arg2)
+        return len(self.ops) - 1
+
+    def patch_split(self, pc, preferred, other):
+        self.args[pc] = preferred
+        self.args2[pc] = other
+
+    def first(self, ppos, stop):
+        """Return a superset of the characters that can start a match of
+        code[ppos:stop], and whether it can match the empty string."""
+        code = self.code
+        charset = [False] * CHARSET_SIZE
+        while ppos < stop:
+            op = code[ppos]
+            if op == OPCODE_AT or op == OPCODE_MARK:
+                ppos += 2
+            elif op == OPCODE_INFO:
+                ppos += 1 + code[ppos + 1]
+            elif op == OPCODE_BRANCH:
+                nullable = False
+                ppos += 1
+                while code[ppos]:
+                    skip = code[ppos]
+                    altcharset, altnullable = self.first(ppos + 1,
+                                                         ppos + skip - 2)
+                    _merge(charset, altcharset)
+                    nullable = nullable or altnullable
+                    ppos += skip
+                if not nullable:
+                    return charset, False
+                ppos += 1
+            elif (op == OPCODE_REPEAT_ONE or op == OPCODE_MIN_REPEAT_ONE or
+                  op == OPCODE_REPEAT):
+                if op == OPCODE_REPEAT:
+                    stop1 = ppos + 1 + code[ppos + 1]
+                    nextppos = stop1 + 1
+                else:
+                    nextppos = ppos + 1 + code[ppos + 1]
+                    stop1 = nextppos - 1
+                bodycharset, bodynullable = self.first(ppos + 4, stop1)
+                _merge(charset, bodycharset)
+                if code[ppos + 2] > 0 and not bodynullable:
+                    return charset, False
+                ppos = nextppos
+            elif op == OPCODE_SUCCESS:
+                break
+            else:
+                # a single character, or something unsupported
+                _merge(charset, char_charset(code, ppos))
+                return charset, False
+        return charset, True
+
+    def follow_charset(self, follow):
+        if follow is None:
+            return [False] * CHARSET_SIZE
+        if follow.charset is None:
+            charset, nullable = self.first(follow.ppos, follow.stop)
+            if nullable:
+                _merge(charset, self.follow_charset(follow.outer))
+            follow.charset = charset
+        return follow.charset
+
+    def check_ambiguous(self, ppos, follow):
+        # the same part of the pattern is compiled several times for
+        # bounded repetitions, but it only needs to be checked once
+        if self.backtracking_prone or ppos in self.checked:
+            return
+        self.checked[ppos] = None
+        code = self.code
+        if code[ppos] == OPCODE_BRANCH:
+            seen = [False] * CHARSET_SIZE
+            ppos += 1
+            while code[ppos]:
+                skip = code[ppos]
+                charset, nullable = self.first(ppos + 1, ppos + skip - 2)
+                if nullable:
+                    _merge(charset, self.follow_charset(follow))
+                if _overlap(seen, charset):
+                    self.backtracking_prone = True
+                    return
+                _merge(seen, charset)
+                ppos += skip
+        else:
+            # a repetition
+            if code[ppos] == OPCODE_REPEAT:
+                stop = ppos + 1 + code[ppos + 1]
+            else:
+                stop = ppos + code[ppos + 1]
+            charset, _ = self.first(ppos + 4, stop)
+            if _overlap(charset, self.follow_charset(follow)):
+                self.backtracking_prone = True
+
+    def compile_sequence(self, code, ppos, stop, follow):
+        # 'follow' describes what comes after code[ppos:stop]
+        while ppos < stop:
+            op = code[ppos]
+            if op == OPCODE_ANY or op == OPCODE_ANY_ALL:
+                self.emit(I_CHAR, ppos)
+                ppos += 1
+            elif (op == OPCODE_LITERAL or op == OPCODE_LITERAL_IGNORE or
+                  op == OPCODE_NOT_LITERAL or
+                  op == OPCODE_NOT_LITERAL_IGNORE):
+                self.emit(I_CHAR, ppos)
+                ppos += 2
+            elif op == OPCODE_IN or op == OPCODE_IN_IGNORE:
+                self.emit(I_CHAR, ppos)
+                ppos += 1 + code[ppos + 1]
+            elif op == OPCODE_AT:
+                self.emit(I_AT, code[ppos + 1])
+                ppos += 2
+            elif op == OPCODE_MARK:
+                self.emit(I_MARK, code[ppos + 1])
+                ppos += 2
+            elif op == OPCODE_INFO:
+                ppos += 1 + code[ppos + 1]
+            elif op == OPCODE_BRANCH:
+                nextppos = _branch_end(code, ppos)
+                self.compile_branch(code, ppos,
+                                    _Follow(nextppos, stop, follow))
+                ppos = nextppos
+            elif op == OPCODE_REPEAT_ONE or op == OPCODE_MIN_REPEAT_ONE:
+                # <REPEAT_ONE> <skip> <1=min> <2=max> item <SUCCESS> tail
+                nextppos = ppos + 1 + code[ppos + 1]
+                self.compile_repeat(code, ppos, nextppos - 1,
+                                    op == OPCODE_REPEAT_ONE,
+                                    _Follow(nextppos, stop, follow))
+                ppos = nextppos
+            elif op == OPCODE_REPEAT:
+                # <REPEAT> <skip> <1=min> <2=max> item <UNTIL> tail
+                untilppos = ppos + 1 + code[ppos + 1]
+                untilop = code[untilppos]
+                if untilop != OPCODE_MAX_UNTIL and untilop != OPCODE_MIN_UNTIL:
+                    raise NotSupported
+                if get_min_width(code, ppos + 4, untilppos) == 0:
+                    # repeating something that can match the empty string
+                    # has special rules in rsre_core
+                    raise NotSupported
+                self.compile_repeat(code, ppos, untilppos,
+                                    untilop == OPCODE_MAX_UNTIL,
+                                    _Follow(untilppos + 1, stop, follow))
+                ppos = untilppos + 1
+            elif op == OPCODE_SUCCESS:
+                break
+            else:
+                # GROUPREF, ASSERT, GROUPREF_EXISTS, CATEGORY...
+                raise NotSupported
+
+    def compile_branch(self, code, ppos, follow):
+        # <BRANCH> <0=skip> code <JUMP> ... <NULL>
+        if self.repeat_depth > 0:
+            self.check_ambiguous(ppos, follow)
+        jumps = []
+        ppos += 1
+        while code[ppos]:
+            skip = code[ppos]
+            if code[ppos + skip]:
+                split = self.emit(I_SPLIT)
+                self.compile_sequence(code, ppos + 1, ppos + skip - 2, follow)
+                jumps.append(self.emit(I_JUMP))
+                self.patch_split(split, split + 1, len(self.ops))
+            else:
+                # last alternative
+                self.compile_sequence(code, ppos + 1, ppos + skip - 2, follow)
+            ppos += skip
+        for pc in jumps:
+            self.args[pc] = len(self.ops)
+
+    def compile_repeat(self, code, start, stop, greedy, follow):
+        # <REPEAT> <skip> <1=min> <2=max> item ...
+        min = code[start + 2]
+        max = code[start + 3]
+        if self.repeat_depth > 0 and max > 1:
+            self.check_ambiguous(start, follow)
+        if min > MAX_PROGRAM_SIZE:
+            raise NotSupported
+        ppos = start + 4
+        if max > 1:
+            # the item can be followed by itself
+            follow = _Follow(ppos, stop, follow)
+        self.repeat_depth += 1
+        for i in range(min):
+            self.compile_sequence(code, ppos, stop, follow)
+        if max == rsre_char.MAXREPEAT:
+            split = self.emit(I_SPLIT)
+            self.compile_sequence(code, ppos, stop, follow)
+            self.emit(I_JUMP, split)
+            self.patch_repeat_split(split, greedy)
+        else:
+            if max - min > MAX_PROGRAM_SIZE:
+                raise NotSupported
+            splits = []
+            for i in range(max - min):
+                splits.append(self.emit(I_SPLIT))
+                self.compile_sequence(code, ppos, stop, follow)
+            for split in splits:
+                self.patch_repeat_split(split, greedy)
+        self.repeat_depth -= 1
+
+    def patch_repeat_split(self, split, greedy):
+        if greedy:
+            self.patch_split(split, split + 1, len(self.ops))
+        else:
+            self.patch_split(split, len(self.ops), split + 1)
+
+
+def compile_nfa(code, always=False):
+    """Compile the pattern code into an NFAProgram.  Returns None if the
+    pattern uses features that the NFA engine does not support, or (unless
+    'always' is set) if it is not ambiguous, in which case the backtracking
+    engine is not at risk of exponential running times and is usually
+    faster.
+    """
+    builder = _Builder(code)
+    try:
+        builder.compile_sequence(code, 0, len(code), None)
+        builder.emit(I_MATCH)
+    except NotSupported:
+        return None
+    if not always and not builder.backtracking_prone:
+        return None
+    firstchars, nullable = builder.first(0, len(code))
+    if nullable:
+        firstchars = None
+    return NFAProgram(builder.ops[:], builder.args[:], builder.args2[:],
+                      firstchars)
+
+# ____________________________________________________________
+
+class ThreadList(object):
+    def __init__(self, size):
+        self.pcs = [0] * size
+        self.marks = [None] * size
+        self.starts = [0] * size
+        self.count = 0
+
+    def append(self, pc, marks, start):
+        i = self.count
+        self.pcs[i] = pc
+        self.marks[i] = marks
+        self.starts[i] = start
+        self.count = i + 1
+
+
+@specializectx
+def char_ok(ctx, ptr, ppos):
+    assert ppos >= 0
+    op = ctx.pat(ppos)
+    for op1, checkerfn in unroll_char_checker:
+        if op1 == op:
+            return checkerfn(ctx, ptr, ppos)
+    return False
+
+@specializectx
+def add_thread(ctx, prog, threads, visited, stack_pcs, stack_marks,
+               pc, marks, start, ptr):
+    # add to 'threads' the instructions reachable from 'pc' without
+    # consuming a character, in order of priority
+    stack_pcs[0] = pc
+    stack_marks[0] = marks
+    depth = 1
+    while depth > 0:
+        depth -= 1
+        pc = stack_pcs[depth]
+        marks = stack_marks[depth]
+        if visited[pc] == ptr + 1:
+            continue
+        visited[pc] = ptr + 1
+        op = prog.ops[pc]
+        if op == I_JUMP:
+            stack_pcs[depth] = prog.args[pc]
+            stack_marks[depth] = marks
+            depth += 1
+        elif op == I_SPLIT:
+            stack_pcs[depth] = prog.args2[pc]
+            stack_marks[depth] = marks
+            stack_pcs[depth + 1] = prog.args[pc]
+            stack_marks[depth + 1] = marks
+            depth += 2
+        elif op == I_MARK:
+            stack_pcs[depth] = pc + 1
+            stack_marks[depth] = Mark(prog.args[pc], ptr, marks)
+            depth += 1
+        elif op == I_AT:
+            if sre_at(ctx, prog.args[pc], ptr):
+                stack_pcs[depth] = pc + 1
+                stack_marks[depth] = marks
+                depth += 1
+        else:
+            threads.append(pc, marks, start)
+
+@specializectx
+def can_start(ctx, prog, ptr):
+    firstchars = prog.firstchars
+    if firstchars is None:
+        return True
+    if ptr >= ctx.end:
+        return False
+    c = ctx.str(ptr)
+    if c >= 256:
+        c = 256
+    return firstchars[c]
+
+@specializectx
+def next_start(ctx, prog, ptr, found):
+    # return the first position >= ptr where a match can start, or -1.
+    # 'found' is the position of the next literal of ctx.prefilter that
+    # was found by a previous call, or -1
+    prefilter = ctx.prefilter
+    if prefilter is not None and len(prefilter.literals) == 0:
+        prefilter = None
+    while ptr <= ctx.end:
+        if prefilter is not None:
+            if found < ptr + prefilter.offset_min:
+                found = find_literals(ctx, ptr + prefilter.offset_min)
+                if found < 0:
+                    return -1, found
+            if prefilter.offset_max != UNBOUNDED:
+                first = found - prefilter.offset_max
+                if ptr < first:
+                    assert first >= 0
+                    ptr = first
+        if can_start(ctx, prog, ptr):
+            return ptr, found
+        ptr += 1
+    return -1, found
+
+@specializectx
+def nfa_match(ctx, prog, anchored):
+    """Match 'prog' at ctx.match_start, or if not 'anchored', search for
+    the leftmost match starting at ctx.match_start or later."""
+    size = len(prog.ops)
+    clist = ThreadList(size)
+    nlist = ThreadList(size)
+    visited = [0] * size
+    # each instruction is on the stack at most twice
+    stack_pcs = [0] * (2 * size + 1)
+    stack_marks = [None] * (2 * size + 1)
+    matched = False
+    match_start = 0
+    match_end = 0
+    match_marks = None
+    ptr = ctx.match_start
+    found = -1
+    if not anchored:
+        # instead of starting a thread at every position, only start them
+        # where the prefilter and the first character allow a match
+        ptr, found = next_start(ctx, prog, ptr, found)
+        if ptr < 0:
+            return False
+    add_thread(ctx, prog, clist, visited, stack_pcs, stack_marks,
+               0, None, ptr, ptr)
+    while True:
+        nlist.count = 0
+        for i in range(clist.count):
+            pc = clist.pcs[i]
+            if prog.ops[pc] == I_MATCH:
+                matched = True
+                match_start = clist.starts[i]
+                match_end = ptr
+                match_marks = clist.marks[i]
+                # the remaining threads have a lower priority
+                break
+            # I_CHAR
+            if ptr < ctx.end and char_ok(ctx, ptr, prog.args[pc]):
+                add_thread(ctx, prog, nlist, visited, stack_pcs, stack_marks,
+                           pc + 1, clist.marks[i], clist.starts[i], ptr + 1)
+        if ptr >= ctx.end:
+            break
+        ptr += 1
+        if not matched and not anchored:
+            if nlist.count == 0:
+                # no match in progress: skip to the next possible start
+                ptr, found = next_start(ctx, prog, ptr, found)
+                if ptr < 0:
+                    break
+                add_thread(ctx, prog, nlist, visited, stack_pcs, stack_marks,
+                           0, None, ptr, ptr)
+            elif can_start(ctx, prog, ptr):
+                add_thread(ctx, prog, nlist, visited, stack_pcs, stack_marks,
+                           0, None, ptr, ptr)
+        elif nlist.count == 0:
+            break
+        clist, nlist = nlist, clist
+    if matched:
+        ctx.match_start = match_start
+        ctx.match_end = match_end
+        ctx.match_marks = match_marks
+    return matched
@@ -0,0 +1,250 @@
+"""
+Search prefilters for rsre.
+
+Searching for a pattern tries to match it at every position of the
+string, except if the pattern starts with a known literal prefix or
+charset.  This module analyses the compiled pattern code once, looking
+for a set of literal strings such that every match has to contain one of
+them, at a known range of offsets from the start of the match.  The
+searcher can then scan for these literals and only try to match around
+the places where one of them occurs.  For example, in '(foo|bar)\d+' the
+candidates are the positions of 'foo' and 'bar', and '.*ERROR.*' only
+needs to run the matcher on lines containing 'ERROR'.
+"""
+
+from rpython.rlib.rsre import rsre_char
+from rpython.rlib.rsre.rsre_core import (OPCODE_ANY, OPCODE_ANY_ALL,
+    OPCODE_ASSERT, OPCODE_ASSERT_NOT, OPCODE_AT, OPCODE_BRANCH,
+    OPCODE_CATEGORY, OPCODE_FAILURE, OPCODE_GROUPREF, OPCODE_GROUPREF_IGNORE,
+    OPCODE_IN, OPCODE_IN_IGNORE, OPCODE_INFO, OPCODE_LITERAL,
+    OPCODE_LITERAL_IGNORE, OPCODE_MARK, OPCODE_MIN_REPEAT_ONE,
+    OPCODE_NOT_LITERAL, OPCODE_NOT_LITERAL_IGNORE, OPCODE_REPEAT,
+    OPCODE_REPEAT_ONE, OPCODE_SUCCESS)
+
+
+UNBOUNDED = -1
+
+# the pattern starts with '.*' or '.*?': if matching at some position
+# fails, it also fails at all following positions up to the next newline
+# (DOTSTAR_LINE), or up to the end of the string (DOTSTAR_ALL)
+DOTSTAR_NONE = 0
+DOTSTAR_LINE = 1
+DOTSTAR_ALL = 2
+
+# don't scan for more literals than that at once
+MAX_LITERALS = 16
+
+
+class Prefilter(object):
+    """Literal strings (as lists of character codes), one of which must
+    appear in every match at an offset between 'offset_min' and
+    'offset_max' (which can be UNBOUNDED) from the start of the match.
+    """
+    _immutable_fields_ = ['literals[*]', 'offset_min', 'offset_max',
+                          'dotstar', 'firstchars[*]', 'skips_positions']
+
+    def __init__(self, literals, offset_min, offset_max, dotstar):
+        self.literals = literals[:]
+        self.offset_min = offset_min
+        self.offset_max = offset_max
+        self.dotstar = dotstar
+        # if False, the literals only tell when to give up: the matcher
+        # still runs at every position before the last one of them
+        self.skips_positions = (offset_max != UNBOUNDED or
+                                dotstar != DOTSTAR_NONE)
+        # firstchars[c] is True if a literal starts with chr(c), for c < 256
+        firstchars = [False] * 256
+        for literal in literals:
+            if literal[0] < 256:
+                firstchars[literal[0]] = True
+        self.firstchars = firstchars
+
+
+class _Candidate(object):
+    def __init__(self, literals, offset_min, offset_max):
+        self.literals = literals
+        self.offset_min = offset_min
+        self.offset_max = offset_max
+
+    def min_length(self):
+        result = len(self.literals[0])
+        for literal in self.literals:
+            if len(literal) < result:
+                result = len(literal)
+        return result
+
+    def is_better_than(self, other):
+        if other is None:
+            return True
+        length1 = self.min_length()
+        length2 = other.min_length()
+        if length1 != length2:
+            return length1 > length2
+        bounded1 = self.offset_max != UNBOUNDED
+        bounded2 = other.offset_max != UNBOUNDED
+        if bounded1 != bounded2:
+            return bounded1
+        return len(self.literals) < len(other.literals)
+
+
+def _add_width(offset, width):
+    if offset == UNBOUNDED or width == UNBOUNDED:
+        return UNBOUNDED
+    return offset + width
+
+def _analyse_sequence(code, ppos, stop):
+    """Analyse the opcodes between 'ppos' and 'stop'.  Returns a tuple
+    (width_min, width_max, best_candidate, prefix), where 'prefix' is the
+    literal string that every match of the sequence starts with, or None.
+    """
+    offset_min = 0
+    offset_max = 0
+    best = None
+    prefix = None
+    run = None
+    run_min = 0
+    run_max = 0
+    while ppos < stop:
+        op = code[ppos]
+        if op == OPCODE_LITERAL:
+            if run is None:
+                run = []
+                run_min = offset_min
+                run_max = offset_max
+            run.append(code[ppos + 1])
+            offset_min += 1
+            offset_max = _add_width(offset_max, 1)
+            ppos += 2
+            continue
+        if op == OPCODE_MARK or op == OPCODE_AT:
+            # zero-width, doesn't interrupt a run of literals
+            ppos += 2
+            continue
+        if run is not None:
+            candidate = _Candidate([run], run_min, run_max)
+            if candidate.is_better_than(best):
+                best = candidate
+            if run_min == 0 and run_max == 0:
+                prefix = run
+            run = None
+        #
+        if op == OPCODE_SUCCESS or op == OPCODE_FAILURE:
+            break
+        elif op == OPCODE_ANY or op == OPCODE_ANY_ALL:
+            width_min = width_max = 1
+            ppos += 1
+        elif (op == OPCODE_LITERAL_IGNORE or op == OPCODE_NOT_LITERAL or
+              op == OPCODE_NOT_LITERAL_IGNORE or op == OPCODE_CATEGORY):
+            width_min = width_max = 1
+            ppos += 2
+        elif op == OPCODE_IN or op == OPCODE_IN_IGNORE:
+            width_min = width_max = 1
+            ppos += 1 + code[ppos + 1]
+        elif (op == OPCODE_INFO or op == OPCODE_ASSERT or
+              op == OPCODE_ASSERT_NOT):
+            width_min = width_max = 0
+            ppos += 1 + code[ppos + 1]
+        elif op == OPCODE_REPEAT_ONE or op == OPCODE_MIN_REPEAT_ONE:
+            # <REPEAT_ONE> <skip> <1=min> <2=max> item <SUCCESS> tail
+            width_min = code[ppos + 2]
+            width_max = code[ppos + 3]
+            if width_max == rsre_char.MAXREPEAT:
+                width_max = UNBOUNDED
+            ppos += 1 + code[ppos + 1]
+        elif op == OPCODE_REPEAT:
+            # <REPEAT> <skip> <1=min> <2=max> item <UNTIL> tail
+            untilppos = ppos + 1 + code[ppos + 1]
+            item_min, item_max, _, _ = _analyse_sequence(code, ppos + 4,
+                                                         untilppos)
+            width_min = code[ppos + 2] * item_min
+            width_max = code[ppos + 3]
+            if width_max == rsre_char.MAXREPEAT or item_max == UNBOUNDED:
+                width_max = UNBOUNDED
+            else:
+                width_max *= item_max
+            ppos = untilppos + 1
+        elif op == OPCODE_GROUPREF or op == OPCODE_GROUPREF_IGNORE:
+            width_min = 0
+            width_max = UNBOUNDED
+            ppos += 2
+        elif op == OPCODE_BRANCH:
+            # <BRANCH> <0=skip> code <JUMP> ... <NULL>
+            width_min = -1
+            width_max = 0
+            prefixes = []
+            ppos += 1
+            while code[ppos]:
+                skip = code[ppos]
+                alt_min, alt_max, _, alt_prefix = _analyse_sequence(
+                    code, ppos + 1, ppos + skip - 2)
+                if width_min < 0 or alt_min < width_min:
+                    width_min = alt_min
+                if width_max != UNBOUNDED:
+                    if alt_max == UNBOUNDED or alt_max > width_max:
+                        width_max = alt_max
+                if prefixes is not None:
+                    if alt_prefix is None or len(prefixes) == MAX_LITERALS:
+                        prefixes = None
+                    else:
+                        prefixes.append(alt_prefix)
+                ppos += skip
+            ppos += 1
+            if width_min < 0:
+                width_min = 0
+            if prefixes:
+                candidate = _Candidate(prefixes, offset_min, offset_max)
+                if candidate.is_better_than(best):
+                    best = candidate
+        else:
+            # GROUPREF_EXISTS or anything unexpected: give up on the
+            # rest of the sequence
+            offset_max = UNBOUNDED
+            break
+        offset_min += width_min
+        offset_max = _add_width(offset_max, width_max)
+    if run is not None:
+        candidate = _Candidate([run], run_min, run_max)
+        if candidate.is_better_than(best):
+            best = candidate
+        if run_min == 0 and run_max == 0:
+            prefix = run
+    return offset_min, offset_max, best, prefix
+
+def get_min_width(code, ppos, stop):
+    """Return the minimum number of characters matched by the opcodes
+    between 'ppos' and 'stop'."""
+    width_min, _, _, _ = _analyse_sequence(code, ppos, stop)
+    return width_min
+
+def _dotstar_kind(code, ppos):
+    # <REPEAT_ONE> <skip> <min=0> <max=MAXREPEAT> <ANY or ANY_ALL> <SUCCESS>
+    if ppos + 5 < len(code):
+        op = code[ppos]
+        if ((op == OPCODE_REPEAT_ONE or op == OPCODE_MIN_REPEAT_ONE) and
+                code[ppos + 2] == 0 and
+                code[ppos + 3] == rsre_char.MAXREPEAT and
+                code[ppos + 5] == OPCODE_SUCCESS):
+            if code[ppos + 4] == OPCODE_ANY:
+                return DOTSTAR_LINE
+            if code[ppos + 4] == OPCODE_ANY_ALL:
+                return DOTSTAR_ALL
+    return DOTSTAR_NONE
+
+def compute_prefilter(code):
+    """Return a Prefilter for the given pattern code, or None if searching
+    for this pattern cannot be sped up by scanning for literals."""
+    ppos = 0
+    if len(code) > 1 and code[0] == OPCODE_INFO:
+        ppos = 1 + code[1]
+    dotstar = _dotstar_kind(code, ppos)
+    _, _, best, _ = _analyse_sequence(code, ppos, len(code))
+    if best is not None and best.min_length() < 2:
+        # single characters are already handled by literal_search()
+        # and charset_search()
+        best = None
+    if best is None:
+        if dotstar == DOTSTAR_NONE:
+            return None
+        return Prefilter([], 0, UNBOUNDED, dotstar)
+    return Prefilter(best.literals, best.offset_min, best.offset_max,
+                     dotstar)
@@ -0,0 +1,157 @@
+import re, random
+from rpython.rlib.rsre import rsre_core
+from rpython.rlib.rsre.rsre_nfa import compile_nfa, nfa_match
+from rpython.rlib.rsre.rsre_prefilter import compute_prefilter
+from rpython.rlib.rsre.test.test_match import get_code
+
+
+def nfa_search(regexp, string, start=0, anchored=False):
+    code = get_code(regexp)
+    prog = compile_nfa(code, always=True)
+    assert prog is not None
+    ctx = rsre_core.StrMatchContext(code, string, start, len(string), 0)
+    ctx.prefilter = compute_prefilter(code)
+    if nfa_match(ctx, prog, anchored):
+        return ctx
+    return None
+
+
+class TestCompile:
+
+    def test_not_supported(self):
+        for regexp in [r'(a)\1', r'a(?=b)', r'(?<!a)b', r'(a)?(?(1)b|c)',
+                       r'(?:a?)*b', r'(?:x|)+']:
+            assert compile_nfa(get_code(regexp), always=True) is None
+
+    def test_only_when_backtracking_prone(self):
+        for regexp in [r'abc', r'a*b+c?', r'(foo|bar)\d+', r'(?:ab)*c',
+                       r'.*ERROR.*', r'(\w+\.)+\w+', r'(?:\s*,\s*\w+)*',
+                       r'(foo|bar)+', r'(?:x\d{2,}){3}', r'(?:a(b|)c)+?',
+                       r'(?i)(?:a[b-d])+x']:
+            assert compile_nfa(get_code(regexp)) is None
+            assert compile_nfa(get_code(regexp), always=True) is not None
+        for regexp in [r'(a+)+$', r'(?:a|aa)*c', r'(\w+\s?)*$',
+                       r'(?:\d{2,}){3}', r'(?:a\d|\wb)+', r'(?:a?b|b)+',
+                       r'(?:\w+\s*)*x', r'(?i)(?:a\d|A\w)+b']:
+            assert compile_nfa(get_code(regexp)) is not None
+
+    def test_firstchars(self):
+        prog = compile_nfa(get_code(r'(?:[a-c]|\d)+x'), always=True)
+        assert [chr(c) for c in range(256)
+                if prog.firstchars[c]] == list('0123456789abc')
+        prog = compile_nfa(get_code(r'(?:x|(y))?(?:a|bc)+'), always=True)
+        assert [chr(c) for c in range(256)
+                if prog.firstchars[c]] == list('abxy')
+        assert not prog.firstchars[256]
+        assert compile_nfa(get_code(r'a*'), always=True).firstchars is None
+
+    def test_too_big(self):
+        assert compile_nfa(get_code(r'(?:a+b){1000}')) is None
+
+
+class TestNFAMatch:
+
+    def check(self, regexp, strings):
+        # compare with the backtracking engine, which gives the groups in
+        # some corner cases differently than CPython
+        r = re.compile(regexp)
+        code = get_code(regexp)
+        for s in strings:
+            for start in range(len(s) + 1):
+                for anchored in [False, True]:
+                    res = nfa_search(regexp, s, start, anchored)
+                    if anchored:
+                        expected = rsre_core.match(code, s, start)
+                    else:
+                        expected = rsre_core.search(code, s, start)
+                    if expected is None:
+                        assert res is None, (s, start)
+                        continue
+                    assert res is not None, (s, start)
+                    if expected.match_marks is None:
+                        assert res.match_marks is None
+                    else:
+                        # same 'lastindex'
+                        assert (res.match_marks.gid ==
+                                expected.match_marks.gid)
+                    for i in range(r.groups + 1):
+                        assert res.span(i) == expected.span(i), (s, start)
+
+    def test_simple(self):
+        self.check(r'ab|cd', ['', 'ab', 'xxcdab', 'acbd'])
+        self.check(r'a*?b+', ['aaab', 'b', 'abbb', 'xaaabba'])
+
+    def test_groups(self):
+        self.check(r'(a|ab)(c|bcd)(d*)', ['abcd', 'xabcdd', 'acd'])
+        self.check(r'((a)|b)+', ['ab', 'aab', 'bba', 'xbax'])
+        self.check(r'(a+?)(a*)', ['aaa', 'baa'])
+
+    def test_repeat(self):
+        self.check(r'(?:ab){2,3}?c', ['ababc', 'abababc', 'abc', 'abababab'])
+        self.check(r'(?:a|bc){2,}', ['abca', 'bc', 'aa', 'xbcbcbc'])
+        self.check(r'x\d{2,4}', ['x1', 'x12345', 'ax123x'])
+
+    def test_at(self):
+        self.check(r'(?m)^\w+$', ['ab\ncd', 'a b\n\nc'])
+        self.check(r'\bab\B', ['abc ab', 'xab abab'])
+
+    def test_ignorecase(self):
+        self.check(r'(?i)(?:a[b-d])+x', ['ABcDx', 'aBx', 'aex'])
+
+    def test_linear(self):
+        s = 'a' * 5000 + 'b'
+        assert nfa_search(r'(a+)+$', s) is None
+        assert nfa_search(r'(?:a|aa)*c', s) is None
+        res = nfa_search(r'(a+)+b', s)
+        assert res.span() == (0, 5001)
+        assert res.span(1) == (0, 5000)
+
+    def test_start_positions(self, monkeypatch):
+        # threads are only started where the first character or the
+        # prefilter allow a match
+        from rpython.rlib.rsre import rsre_nfa
+        starts = []
+        def add_thread(ctx, prog, threads, visited, stack_pcs, stack_marks,
+                       pc, marks, start, ptr):
+            if pc == 0:
+                starts.append(ptr)
+            return original(ctx, prog, threads, visited, stack_pcs,
+                            stack_marks, pc, marks, start, ptr)
+        original = rsre_nfa.add_thread
+        monkeypatch.setattr(rsre_nfa, 'add_thread', add_thread)
+        res = nfa_search(r'(?:a+)+b', 'xx-a-x-aab')
+        assert res.span() == (7, 10)
+        assert starts == [3, 7, 8]
+        del starts[:]
+        res = nfa_search(r'(?:ab|a)\dERROR', 'ab1 ab1 ab2ERROR')
+        assert res.span() == (8, 16)
+        assert starts == [8]
+        del starts[:]
+        assert nfa_search(r'(?:\w+\s*)*ERROR', 'foo bar baz') is None
+        assert starts == []
+
+    def test_random(self):
+        atoms = ['a', 'b', '.', r'\d', '[ab]', '(ab|ba)', '(a|bb|ab)', 'a*',
+                 '.*?', 'b+', '(?:ab){1,2}', r'\b', 'a{2,3}', '(a+)+', '$',
+                 '(?:a|b)*?', '(b)']
+        rnd = random.Random(42)
+        for i in range(300):
+            regexp = ''.join([rnd.choice(atoms)
+                              for j in range(rnd.randint(1, 4))])
+            strings = [''.join([rnd.choice('ab1\n ')
+                                for k in range(rnd.randint(0, 8))])
+                       for j in range(3)]
+            self.check(regexp, strings)
+
+
+def test_translates():
+    from rpython.rtyper.test.test_llinterp import interpret
+    code = get_code(r'((a)|b)+$')
+    def f(n):
+        string = 'ab' * n
+        ctx = rsre_core.StrMatchContext(code, string, 0, len(string), 0)
+        ctx.nfa = compile_nfa(code, always=True)
+        if not rsre_core.search_context(ctx):
+            return -1
+        return ctx.match_end * 100 + ctx.match_marks.gid
+    assert interpret(f, [3]) == 601
@@ -0,0 +1,103 @@
+import re
+from rpython.rlib.rsre import rsre_core
+from rpython.rlib.rsre.rsre_prefilter import (compute_prefilter, UNBOUNDED,
+    DOTSTAR_NONE, DOTSTAR_LINE, DOTSTAR_ALL)
+from rpython.rlib.rsre.test.test_match import get_code
+
+
+def literals(prefilter):
+    return sorted([''.join([chr(c) for c in lit])
+                   for lit in prefilter.literals])
+
+
+class TestComputePrefilter:
+
+    def test_no_prefilter(self):
+        assert compute_prefilter(get_code(r'\d+')) is None
+        assert compute_prefilter(get_code(r'a\d+b')) is None
+        assert compute_prefilter(get_code(r'(?i)foo')) is None
+        assert compute_prefilter(get_code(r'(foo|\d)x')) is None
+
+    def test_branch(self):
+        p = compute_prefilter(get_code(r'(foo|bar|baz)\d+'))
+        assert literals(p) == ['bar', 'baz', 'foo']
+        assert (p.offset_min, p.offset_max) == (0, 0)
+        assert p.dotstar == DOTSTAR_NONE
+
+    def test_literal_after_repeat(self):
+        p = compute_prefilter(get_code(r'\d{2,4}-ERROR\d'))
+        assert literals(p) == ['-ERROR']
+        assert (p.offset_min, p.offset_max) == (2, 4)
+        p = compute_prefilter(get_code(r'x(?:ab)*ERROR'))
+        assert literals(p) == ['ERROR']
+        assert (p.offset_min, p.offset_max) == (1, UNBOUNDED)
+        assert not p.skips_positions
+        p = compute_prefilter(get_code(r'\d{2,4}-ERROR\d'))
+        assert p.skips_positions
+
+    def test_longest_literal(self):
+        p = compute_prefilter(get_code(r'ab\d+(cdef|ghij)\s*klm'))
+        assert literals(p) == ['cdef', 'ghij']
+        assert (p.offset_min, p.offset_max) == (3, UNBOUNDED)
+
+    def test_dotstar(self):
+        p = compute_prefilter(get_code(r'.*ERROR.*'))
+        assert literals(p) == ['ERROR']
+        assert (p.offset_min, p.offset_max) == (0, UNBOUNDED)
+        assert p.dotstar == DOTSTAR_LINE
+        p = compute_prefilter(get_code(r'(?s).*?\d'))
+        assert p.literals == []
+        assert p.dotstar == DOTSTAR_ALL
+
+
+class TestPrefilterSearch:
+
+    def check(self, regexp, strings):
+        r = re.compile(regexp)
+        code = get_code(regexp)
+        assert compute_prefilter(code) is not None
+        for s in strings:
+            for start in range(len(s) + 1):
+                res = rsre_core.search(code, s, start)
+                expected = r.search(s, start)
+                if expected is None:
+                    assert res is None, (s, start)
+                else:
+                    assert res is not None, (s, start)
+                    assert res.span() == expected.span(), (s, start)
+
+    def test_branch(self):
+        self.check(r'(foo|bar|baz)\d+', ["", "foo", "xxbar12", "fo1 baz3",
+                                         "bazbar9", "foo bar baz 1"])
+
+    def test_bounded_offset(self):
+        self.check(r'\d{2,4}-ERROR', ["12-ERROR", "1-ERROR", "123456-ERROR",
+                                      "12-ERRO 12345-ERROR", "-ERROR"])
+
+    def test_dotstar(self):
+        self.check(r'.*ERROR.*', ["", "ERROR", "abc\nxERRORy\nz",
+                                  "a\nb\nc", "ERRO\nR", "a\n\nERROR"])
+        self.check(r'.*?[xy]\d', ["abc\nx1", "x\n1", "xy\nyz2"])
+        self.check(r'(?s).*[xy]\d', ["abc\nx1", "x\n1", "x", "y\n2y3"])
+
+    def test_unbounded_offset(self, monkeypatch):
+        # the prefilter cannot skip positions here: literal_search() and
+        # charset_search() are used instead
+        def prefilter_search(ctx, base):
+            raise AssertionError("should not be called")
+        monkeypatch.setattr(rsre_core, 'prefilter_search', prefilter_search)
+        for regexp in [r'a\w+xyz', r'[ab]\w+xyz']:
+            code = get_code(regexp)
+            assert not compute_prefilter(code).skips_positions
+            res = rsre_core.search(code, "b a_ abcxyz")
+            assert res.span() == (5, 11)
+            assert rsre_core.search(code, "abc xyz") is None
+
+    def test_unicode(self):
+        r = u'(\u1234\u5678|ab)c'
+        code = get_code(r)
+        res = rsre_core.search(code, u'xx\u1234\u5678c')
+        assert res.span() == (2, 5)
+        res = rsre_core.search(code, u'xx\u1234\u5678abc')
+        assert res.span() == (4, 7)
+        assert rsre_core.search(code, u'\u1234abxc') is None
@@ -209,3 +209,31 @@ class TestSearch:
                 else:
                     assert match is None
                     assert res is None
+
+    def test_raw_buffer(self):
+        from rpython.rlib.buffer import Buffer
+        from rpython.rtyper.lltypesystem import lltype, rffi
+        class RawBuffer(Buffer):
+            def __init__(self, ptr, size):
+                self.ptr = ptr
+                self.size = size
+            def getlength(self):
+                return self.size
+            def get_raw_address(self):
+                return self.ptr
+        s = "foo bar <item>  <title>abc</title>def"
+        ptr = rffi.str2charp(s)
+        try:
+            buf = RawBuffer(ptr, len(s))
+            r_code = get_code(r'<item>\s*<title>(.*?)</title>')
+            ctx = rsre_core.RawMatchContext(r_code, buf, 0, len(s), 0)
+            assert rsre_core.search_context(ctx)
+            assert ctx.span() == (8, 34)
+            assert ctx.span(1) == (23, 26)
+            ctx = ctx.fresh_copy(9)
+            assert not rsre_core.search_context(ctx)
+            #
+            buf.size = 5
+            py.test.raises(rsre_core.Error, ctx.refresh_address)
+        finally:
+            lltype.free(ptr, flavor='raw')
@@ -106,6 +106,13 @@ class TestJitRSre(support.LLJitMixin):
         res = self.meta_interp_search(r"<\w+>", "EIOFWEOXDIWHDOH<FOOBAR>UA")
         assert res == 15
 
+    def test_prefilter_search(self):
+        res = self.meta_interp_search(r"(foo|bar)\d", "fo1ba2" * 10 + "bar3")
+        assert res == 60
+        res = self.meta_interp_search(r"\w\w-ERR\d", "ab-ERRx" * 10 +
+                                                     "ab-ERR1")
+        assert res == 70
+
     def test_max_until_1(self):
         res = self.meta_interp_match(r"(ab)*abababababc",
                                      "ababababababababababc")
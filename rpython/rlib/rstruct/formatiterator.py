@@ -79,6 +79,25 @@ class FormatIterator(object):
                 self.operate(fmtdesc, repetitions)
         self.finished()
 
+    @jit.look_inside_iff(lambda self, plan: jit.isconstant(plan))
+    def execute(self, plan):
+        """Like interpret(), but for a FormatPlan from compile_format().
+        Only for subclasses with a specialized operate() and a seek(offset)
+        method, which replaces align()."""
+        if plan.native:
+            table = unroll_native_fmtdescs
+        else:
+            table = unroll_standard_fmtdescs
+        self.bigendian = plan.bigendian
+        for i in range(len(plan.codes)):
+            c = plan.codes[i]
+            for fmtdesc in table:
+                if c == fmtdesc.fmtchar:
+                    self.seek(plan.offsets[i])
+                    self.operate(fmtdesc, plan.counts[i])
+                    break
+        self.finished()
+
     def finished(self):
         pass
 
@@ -101,6 +120,57 @@ class CalcSizeFormatIterator(FormatIterator):
             raise StructError("total struct size too long")
 
 
+class FormatPlan(object):
+    """A format string parsed once: the format codes with their repetition
+    counts and the offset at which each of them starts, once aligned.
+    """
+    _immutable_fields_ = ['native', 'bigendian', 'codes[*]', 'counts[*]',
+                          'offsets[*]', 'size', 'fieldcount']
+
+    def __init__(self, native, bigendian, codes, counts, offsets, size,
+                 fieldcount):
+        self.native = native
+        self.bigendian = bigendian
+        self.codes = codes
+        self.counts = counts
+        self.offsets = offsets
+        self.size = size
+        self.fieldcount = fieldcount
+
+
+class CompileFormatIterator(CalcSizeFormatIterator):
+    fieldcount = 0
+
+    def __init__(self):
+        self.codes = []
+        self.counts = []
+        self.offsets = []
+
+    def operate(self, fmtdesc, repetitions):
+        self.codes.append(fmtdesc.fmtchar)
+        self.counts.append(repetitions)
+        self.offsets.append(self.totalsize)
+        CalcSizeFormatIterator.operate(self, fmtdesc, repetitions)
+        # the number of values produced by unpacking
+        if fmtdesc.fmtchar == 'x':
+            pass
+        elif fmtdesc.needcount:
+            self.fieldcount += 1
+        else:
+            self.fieldcount += repetitions
+
+
+def compile_format(fmt):
+    """Parse the format string into a FormatPlan.  Raises StructError
+    (or StructOverflowError) if it is invalid."""
+    fmtiter = CompileFormatIterator()
+    fmtiter.interpret(fmt)
+    native = not (len(fmt) > 0 and fmt[0] in '=<>!')
+    return FormatPlan(native, fmtiter.bigendian, fmtiter.codes[:],
+                      fmtiter.counts[:], fmtiter.offsets[:],
+                      fmtiter.totalsize, fmtiter.fieldcount)
+
+
 class FmtDesc(object):
     def __init__(self, fmtchar, attrs):
         self.fmtchar = fmtchar
@@ -0,0 +1,35 @@
+import py
+from rpython.rlib.rstruct.error import StructError
+from rpython.rlib.rstruct.formatiterator import compile_format
+from rpython.rlib.rstruct.nativefmttable import native_is_bigendian
+
+
+def test_compile_standard():
+    plan = compile_format('<h2x3s ?2d')
+    assert not plan.native
+    assert not plan.bigendian
+    assert plan.codes == ['h', 'x', 's', '?', 'd']
+    assert plan.counts == [1, 2, 3, 1, 2]
+    assert plan.offsets == [0, 2, 4, 7, 8]
+    assert plan.size == 24
+    assert plan.fieldcount == 5
+    plan = compile_format('!i')
+    assert not plan.native
+    assert plan.bigendian
+
+def test_compile_native():
+    plan = compile_format('bib')
+    assert plan.native
+    assert plan.bigendian == native_is_bigendian
+    assert plan.offsets == [0, 4, 8]
+    assert plan.size == 9
+    plan = compile_format('@0i')
+    assert plan.native
+    assert plan.counts == [0]
+    assert plan.size == 0
+    assert plan.fieldcount == 0
+
+def test_compile_errors():
+    py.test.raises(StructError, compile_format, 'z')
+    py.test.raises(StructError, compile_format, '12')
+    py.test.raises(StructError, compile_format, '%dq' % (2**60,))
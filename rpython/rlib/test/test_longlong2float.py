@@ -1,6 +1,12 @@
+import math
 from rpython.translator.c.test.test_genc import compile
 from rpython.rlib.longlong2float import longlong2float, float2longlong
 from rpython.rlib.longlong2float import uint2singlefloat, singlefloat2uint
+from rpython.rlib.longlong2float import can_encode_float, can_encode_int32
+from rpython.rlib.longlong2float import encode_int32_into_longlong_nan
+from rpython.rlib.longlong2float import decode_int32_from_longlong_nan
+from rpython.rlib.longlong2float import is_int32_from_longlong_nan
+from rpython.rlib.longlong2float import maybe_decode_longlong_as_float
 from rpython.rlib.rarithmetic import r_singlefloat
 from rpython.rtyper.test.test_llinterp import interpret
 
@@ -63,3 +69,29 @@ def test_compiled_single():
     for x in enum_floats():
         res = fn2(x)
         assert repr(res) == repr(float(r_singlefloat(x)))
+
+# ____________________________________________________________
+
+def fn_encode_nan(f1, i2):
+    assert can_encode_float(f1)
+    assert can_encode_int32(i2)
+    l1 = float2longlong(f1)
+    l2 = encode_int32_into_longlong_nan(i2)
+    assert not is_int32_from_longlong_nan(l1)
+    assert is_int32_from_longlong_nan(l2)
+    f1b = longlong2float(l1)
+    assert f1b == f1 or (math.isnan(f1b) and math.isnan(f1))
+    assert decode_int32_from_longlong_nan(l2) == i2
+    assert maybe_decode_longlong_as_float(l2) == float(i2)
+    return 42
+
+def test_nan_encoding():
+    for x in enum_floats():
+        for y in [0, 1, -1, 42, -2147483648, 2147483647]:
+            assert fn_encode_nan(x, y) == 42
+
+def test_nan_encoding_interpreted():
+    for x in [0.0, -2.5, 1e100]:
+        for y in [0, -1, 2147483647]:
+            res = interpret(fn_encode_nan, [x, y])
+            assert res == 42
@@ -75,3 +75,9 @@ def try_compile_cache(c_files, eci):
             platform.log_errors = _previous
     path.write('True')
     return True
+
+def object_cache_path(key):
+    "Builds a filename to cache a compiled object file"
+    from rpython.config.translationoption import CACHE_DIR
+    cache_dir = py.path.local(CACHE_DIR).join('object_cache').ensure(dir=1)
+    return cache_dir.join(md5(key).hexdigest())
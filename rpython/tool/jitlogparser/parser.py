@@ -466,7 +466,8 @@ def parse_log_counts(input, loops):
     for line in lines:
         if line:
             num, count = line.split(':', 2)
-            mapping[num].count = int(count)
+            if num in mapping:    # the loop may be missing from the log
+                mapping[num].count = int(count)
 
 
 def mangle_descr(descr):
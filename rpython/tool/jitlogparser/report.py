@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+""" Rank the loops and bridges of a jit log by how often they ran.
+Usage:
+
+report.py [--json] [--limit=N] <logfile.log>
+
+The log must contain the jit-log-opt and jit-backend-counts sections, e.g.
+PYPYLOG=jit-log-opt,jit-backend-counts,jit-abort,jit-tracing:logfile.log
+(jit-abort and jit-tracing are only needed for the list of aborts).  With
+--json, the report is written to stdout as JSON, using the same names for
+loops and bridges as logparser2json.py, so that the reports of two
+different runs can be compared.
+"""
+
+import os
+import re
+import sys
+import json
+from rpython.tool.jitlogparser.parser import (import_log, parse_log_counts,
+    mangle_descr, Function)
+from rpython.tool.logparser import extract_category
+from rpython.tool.jitlogparser.storage import LoopStorage
+
+def loop_kind(descr):
+    if descr.startswith('entry'):
+        return 'entry'
+    if descr.startswith('bridge'):
+        return 'bridge'
+    return 'loop'
+
+def describe_loop(loop, storage):
+    ops = [op for op in loop.operations if op.name != 'debug_merge_point']
+    d = {
+        'name': mangle_descr(loop.descr),
+        'kind': loop_kind(loop.descr),
+        'count': getattr(loop, 'count', 0),
+        'ops': len(ops),
+        'guards': len([op for op in ops if op.is_guard()]),
+        'location': None,
+        'linerange': None,
+    }
+    func = Function.from_operations(loop.operations, storage,
+                                    loopname=loop.comment)
+    if func.chunks:
+        d['location'] = func.repr()
+    if func.filename is not None and func.has_valid_code():
+        d['linerange'] = list(func.linerange)
+    return d
+
+def collect_aborts(log):
+    """ Return a list of (reason, location) for all the aborted traces, and
+    a list of the messages of the loops that the optimizer gave up on.
+    """
+    r_abort = re.compile('~~~ ABORTING TRACING(?: (\w+))?(?: at (.*))?$')
+    aborts = []
+    for entry in extract_category(log, 'jit-tracing'):
+        for line in entry.splitlines():
+            m = r_abort.match(line.strip())
+            if m:
+                aborts.append((m.group(1) or 'unknown', m.group(2)))
+    invalid = [entry.strip() for entry in extract_category(log, 'jit-abort')]
+    return aborts, invalid
+
+def count_by(items):
+    counts = {}
+    for item in items:
+        counts[item] = counts.get(item, 0) + 1
+    return sorted(counts.items(), key=lambda (item, n): (-n, item))
+
+def build_report(logname, storage=None):
+    if storage is None:
+        storage = LoopStorage(extrapath=os.path.dirname(logname))
+    log, loops = import_log(logname)
+    parse_log_counts(extract_category(log, 'jit-backend-count'), loops)
+    entries = [describe_loop(loop, storage) for loop in loops]
+    by_name = dict([(d['name'], d) for d in entries])
+    # connect the bridges to the guards they come from
+    guards = []
+    for loop in loops:
+        for op in loop.operations:
+            if not op.is_guard():
+                continue
+            bridge = by_name.get('bridge-%d' % op.guard_no)
+            if bridge is None:
+                continue
+            bridge['parent'] = mangle_descr(loop.descr)
+            guards.append({
+                'guard': '0x%x' % op.guard_no,
+                'op': op.name,
+                'loop': mangle_descr(loop.descr),
+                'bridge': bridge['name'],
+                'count': bridge['count'],
+            })
+    total = sum([d['count'] for d in entries if d['kind'] != 'entry'])
+    for d in entries:
+        if total and d['kind'] != 'entry':
+            d['percentage'] = d['count'] * 100.0 / total
+        else:
+            d['percentage'] = 0.0
+    key = lambda d: (-d['count'], d['name'])
+    aborts, invalid = collect_aborts(log)
+    return {
+        'total_count': total,
+        'loops': sorted([d for d in entries if d['kind'] != 'bridge'],
+                        key=key),
+        'bridges': sorted([d for d in entries if d['kind'] == 'bridge'],
+                          key=key),
+        'guards': sorted(guards, key=lambda d: (-d['count'], d['guard'])),
+        'aborts': [{'reason': reason, 'location': location, 'count': n}
+                   for (reason, location), n in count_by(aborts)],
+        'invalid_loops': [{'message': msg, 'count': n}
+                          for msg, n in count_by(invalid)],
+    }
+
+def format_entry(d):
+    line = '%10d %5.1f%% %-20s %4d ops %3d guards' % (
+        d['count'], d['percentage'], d['name'], d['ops'], d['guards'])
+    if d.get('parent'):
+        line += '  from %s' % d['parent']
+    if d['location']:
+        line += '  %s' % d['location']
+    if d['linerange']:
+        line += ' (lines %d-%d)' % tuple(d['linerange'])
+    return line
+
+def format_report(report, out, limit=None):
+    print >>out, 'Total iterations of loops and bridges: %d' % (
+        report['total_count'],)
+    for title, key in [('Loops', 'loops'), ('Bridges', 'bridges')]:
+        print >>out
+        print >>out, '%s (by count):' % title
+        for d in report[key][:limit]:
+            print >>out, format_entry(d)
+    print >>out
+    print >>out, 'Guards with the most used bridges:'
+    for d in report['guards'][:limit]:
+        print >>out, '%10d %s %s in %s -> %s' % (d['count'], d['guard'],
+                                                d['op'], d['loop'],
+                                                d['bridge'])
+    print >>out
+    print >>out, 'Aborted traces:'
+    for d in report['aborts'][:limit]:
+        print >>out, '%10d %s %s' % (d['count'], d['reason'],
+                                     d['location'] or '')
+    if report['invalid_loops']:
+        print >>out
+        print >>out, 'Loops rejected by the optimizer:'
+        for d in report['invalid_loops'][:limit]:
+            print >>out, '%10d %s' % (d['count'], d['message'])
+
+def main(argv):
+    as_json = False
+    limit = None
+    args = []
+    for arg in argv[1:]:
+        if arg == '--json':
+            as_json = True
+        elif arg.startswith('--limit='):
+            limit = int(arg[len('--limit='):])
+        else:
+            args.append(arg)
+    if len(args) != 1:
+        print __doc__
+        sys.exit(1)
+    report = build_report(args[0])
+    if as_json:
+        json.dump(report, sys.stdout, indent=4)
+    else:
+        format_report(report, sys.stdout, limit)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,92 @@
+import py
+import json
+from cStringIO import StringIO
+from rpython.tool.jitlogparser.report import build_report, format_report
+
+SOURCE = '''\
+def f():
+    i = 0
+    while i < 10000:
+        i += 1
+'''
+
+LOG = '''\
+[1cffd8feb691] {jit-tracing
+~~~ ABORTING TRACING ABORT_TOO_LONG at <code object g. file 'y.py'. line 7> #3 LOAD_GLOBAL
+[1cffd8feb692] jit-tracing}
+[1cffd8feb693] {jit-tracing
+~~~ ABORTING TRACING ABORT_TOO_LONG at <code object g. file 'y.py'. line 7> #3 LOAD_GLOBAL
+[1cffd8feb694] jit-tracing}
+[1cffd8feb695] {jit-abort
+cannot handle this loop
+[1cffd8feb696] jit-abort}
+[1cffd8feb697] {jit-log-opt-loop
+# Loop 0 (<code object f. file 'x.py'. line 1> #9 LOAD_FAST) : loop with 8 ops
+[p0, i1]
+debug_merge_point(0, 0, '<code object f. file 'x.py'. line 1> #9 LOAD_FAST')
+label(p0, i1, descr=TargetToken(1000))
+debug_merge_point(0, 0, '<code object f. file 'x.py'. line 1> #12 COMPARE_OP')
++100: i2 = int_lt(i1, 10000)
+guard_true(i2, descr=<Guard0xa>) [p0, i1]
+debug_merge_point(0, 0, '<code object f. file 'x.py'. line 1> #27 INPLACE_ADD')
++110: i3 = int_add(i1, 1)
+guard_no_overflow(descr=<Guard0xb>) [p0, i1]
++120: jump(p0, i3, descr=TargetToken(1000))
++130: --end of the loop--
+[1cffd8feb698] jit-log-opt-loop}
+[1cffd8feb699] {jit-log-opt-bridge
+# bridge out of Guard 0xa with 2 ops
+[p0, i1]
+debug_merge_point(0, 0, '<code object f. file 'x.py'. line 1> #38 RETURN_VALUE')
++10: finish(i1)
++20: --end of the loop--
+[1cffd8feb69a] jit-log-opt-bridge}
+[1cffd8feb69b] {jit-backend-counts
+entry 0:3
+TargetToken(1000):9000
+bridge 10:3
+bridge 99:1
+[1cffd8feb69c] jit-backend-counts}
+'''
+
+def make_log(name):
+    tmpdir = py.test.ensuretemp(name)
+    tmpdir.join('x.py').write(SOURCE)
+    logfile = tmpdir.join('log')
+    logfile.write(LOG.replace("'x.py'", "'%s'" % tmpdir.join('x.py')))
+    return str(logfile)
+
+def test_build_report():
+    report = build_report(make_log('report'))
+    assert report['total_count'] == 9003
+    loops = report['loops']
+    assert [d['name'] for d in loops] == ['1000', 'entry-0']
+    assert loops[0]['count'] == 9000
+    assert loops[0]['guards'] == 2
+    assert loops[0]['linerange'] == [3, 4]
+    assert loops[0]['location'].startswith('f, file ')
+    [bridge] = report['bridges']
+    assert bridge['name'] == 'bridge-10'
+    assert bridge['count'] == 3
+    assert bridge['parent'] == '1000'
+    assert report['guards'] == [{'guard': '0xa', 'op': 'guard_true',
+                                 'loop': '1000', 'bridge': 'bridge-10',
+                                 'count': 3}]
+    [abort] = report['aborts']
+    assert abort['reason'] == 'ABORT_TOO_LONG'
+    assert abort['count'] == 2
+    assert 'LOAD_GLOBAL' in abort['location']
+    assert report['invalid_loops'] == [{'message': 'cannot handle this loop',
+                                        'count': 1}]
+    json.loads(json.dumps(report))    # can be serialized
+
+def test_format_report():
+    report = build_report(make_log('format_report'))
+    out = StringIO()
+    format_report(report, out, limit=1)
+    text = out.getvalue()
+    assert 'Total iterations of loops and bridges: 9003' in text
+    assert '(lines 3-4)' in text
+    assert 'entry-0' not in text     # cut by the limit
+    assert '0xa guard_true in 1000 -> bridge-10' in text
+    assert 'ABORT_TOO_LONG' in text
@@ -67,6 +67,10 @@ class BasicGcPolicy(object):
     def OP_GC_SET_MAX_HEAP_SIZE(self, funcgen, op):
         return ''
 
+    def OP_GC_GET_STATS(self, funcgen, op):
+        # only the framework GCs keep statistics
+        return '%s = -1;' % funcgen.expr(op.result)
+
     def OP_GC_THREAD_PREPARE(self, funcgen, op):
         return ''
 
@@ -1,6 +1,6 @@
 import contextlib
 import py
-import sys, os
+import sys, os, re
 from rpython.rlib import exports
 from rpython.rlib.entrypoint import entrypoint
 from rpython.rtyper.typesystem import getfunctionptr
@@ -241,7 +241,8 @@ class CBuilder(object):
                 defines['PYPY_MAIN_FUNCTION'] = "pypy_main_startup"
         self.eci, cfile, extra, headers_to_precompile = \
                 gen_source(db, modulename, targetdir,
-                           self.eci, defines=defines, split=self.split)
+                           self.eci, defines=defines, split=self.split,
+                           jobs=self.config.translation.source_jobs)
         self.c_source_filename = py.path.local(cfile)
         self.extrafiles = self.eventually_copy(extra)
         self.gen_makefile(targetdir, exe_name=exe_name,
@@ -371,8 +372,13 @@ class CStandaloneBuilder(CBuilder):
             extra_opts += ["lldebug"]
         elif self.config.translation.lldebug0:
             extra_opts += ["lldebug0"]
+        if self.config.translation.object_cache:
+            cached_objects = self.get_cached_objects(extra_opts)
+            self.restore_cached_objects(cached_objects)
         self.translator.platform.execute_makefile(self.targetdir,
                                                   extra_opts)
+        if self.config.translation.object_cache:
+            self.store_cached_objects(cached_objects)
         if shared:
             self.shared_library_name = self.executable_name.new(
                 purebasename='lib' + self.executable_name.purebasename,
@@ -380,6 +386,110 @@ class CStandaloneBuilder(CBuilder):
         self._compiled = True
         return self.executable_name
 
+    def get_cached_objects(self, extra_opts):
+        """Return a list of (object file, cache file) for the C files
+        written in the target directory.  The key of each cache file covers
+        the C file, the headers it includes (directly or not) and the
+        Makefile lines that say how to compile it, with the target
+        directory left out, so that it stays the same between two
+        translations as long as none of these change.
+        """
+        from rpython.tool.gcc_cache import object_cache_path
+        targetdir = self.targetdir
+        include_dirs = [targetdir]
+        for dir in self.eci.include_dirs:
+            dir = py.path.local(dir)
+            if dir.check(dir=1):
+                include_dirs.append(dir)
+        common_key = [self.translator.platform.key(),
+                      self._get_compile_makefile_lines(extra_opts)]
+        suffixes = ['.o']
+        if self.config.translation.gcrootfinder == 'asmgcc':
+            suffixes.append('.gcmap')
+        includes = {}
+        result = []
+        for cfile in targetdir.listdir('*.c'):
+            key = common_key + [cfile.read()]
+            headers = self._get_included_headers(cfile, include_dirs, includes)
+            for header in sorted(headers):
+                key.append((header.relto(targetdir) or str(header),
+                            header.read()))
+            key = repr(key).replace(str(targetdir), '$(TARGETDIR)')
+            path = object_cache_path(key)
+            for suffix in suffixes:
+                result.append((cfile.new(ext=suffix),
+                               path.new(ext=suffix)))
+        return result
+
+    def _get_compile_makefile_lines(self, extra_opts):
+        """Return the lines of the Makefile that change the way a C file is
+        compiled: the compiler and its flags, the '%.o' rules, and the
+        rules of the targets given in 'extra_opts' (e.g. 'lldebug')."""
+        lines = []
+        for line in self.targetdir.join('Makefile').read().split('\n'):
+            if (lines and lines[-1].endswith('\\')) or (
+                    line.startswith('\t') and lines):
+                lines[-1] += '\n' + line
+            else:
+                lines.append(line)
+        result = []
+        for line in lines:
+            if line.startswith('#') or ':' not in line and '=' not in line:
+                continue
+            if '=' in line.split(':', 1)[0]:
+                name = line.split('=', 1)[0].strip()
+                if name in COMPILE_MAKEFILE_VARS:
+                    result.append(line)
+            else:
+                targets = line.split(':', 1)[0].split()
+                if '%.o' in targets or [t for t in targets
+                                        if t in extra_opts]:
+                    result.append(line)
+        return result
+
+    def _get_included_headers(self, cfile, include_dirs, includes):
+        """Return the set of the headers that 'cfile' includes, directly
+        or indirectly, and that can be found next to the including file or
+        in 'include_dirs'.  System headers are not looked for.  'includes'
+        caches the direct includes of each file already seen."""
+        seen = set()
+        pending = [cfile]
+        while pending:
+            path = pending.pop()
+            if path not in includes:
+                found = []
+                for line in path.readlines():
+                    match = INCLUDE_RE.match(line)
+                    if match is None:
+                        continue
+                    name = match.group(1) or match.group(2)
+                    for dir in [path.dirpath()] + include_dirs:
+                        header = dir.join(name)
+                        if header.check(file=1):
+                            found.append(header)
+                            break
+                includes[path] = found
+            for header in includes[path]:
+                if header not in seen:
+                    seen.add(header)
+                    pending.append(header)
+        return seen
+
+    def restore_cached_objects(self, cached_objects):
+        count = 0
+        for objfile, cachefile in cached_objects:
+            if cachefile.check() and not objfile.check():
+                cachefile.copy(objfile)
+                count += 1
+        log.objectcache('reusing %d of %d files' % (count,
+                                                    len(cached_objects)))
+
+    def store_cached_objects(self, cached_objects):
+        from rpython.tool.gcc_cache import try_atomic_write
+        for objfile, cachefile in cached_objects:
+            if objfile.check() and not cachefile.check():
+                try_atomic_write(cachefile, objfile.read('rb'))
+
     def gen_makefile(self, targetdir, exe_name=None, headers_to_precompile=[]):
         module_files = self.eventually_copy(self.eci.separate_module_files)
         self.eci.separate_module_files = []
@@ -480,6 +590,12 @@ class CStandaloneBuilder(CBuilder):
 
 # ____________________________________________________________
 
+# the Makefile variables used to compile a C file into an object file
+COMPILE_MAKEFILE_VARS = ['CC', 'CFLAGS', 'CFLAGSEXTRA', 'INCLUDEDIRS',
+                         'DEBUGFLAGS']
+
+INCLUDE_RE = re.compile(r'\s*#\s*include\s*(?:"([^"]+)"|<([^>]+)>)')
+
 SPLIT_CRITERIA = 65535 # support VC++ 7.2
 #SPLIT_CRITERIA = 32767 # enable to support VC++ 6.0
 
@@ -495,7 +611,7 @@ class SourceGenerator:
         self.path = None
         self.namespace = NameManager()
 
-    def set_strategy(self, path, split=True):
+    def set_strategy(self, path, split=True, jobs=1):
         all_nodes = list(self.database.globalcontainers())
         # split off non-function nodes. We don't try to optimize these, yet.
         funcnodes = []
@@ -510,6 +626,7 @@ class SourceGenerator:
         self.funcnodes = funcnodes
         self.othernodes = othernodes
         self.path = path
+        self.jobs = jobs
 
     def uniquecname(self, name):
         assert name.endswith('.c')
@@ -559,8 +676,7 @@ class SourceGenerator:
                 return "data_" + name
         return basecname
 
-    def splitnodesimpl(self, basecname, nodes, nextra, nbetween,
-                       split_criteria=SPLIT_CRITERIA):
+    def groupnodes(self, basecname, nodes):
         # Gather nodes by some criteria:
         nodes_by_base_cfile = {}
         for node in nodes:
@@ -569,28 +685,71 @@ class SourceGenerator:
                 nodes_by_base_cfile[c_filename].append(node)
             else:
                 nodes_by_base_cfile[c_filename] = [node]
+        return [(basecname, nodes_by_base_cfile[basecname])
+                for basecname in sorted(nodes_by_base_cfile)]
+
+    def splitgroupimpl(self, nodes, nextra, nbetween, split_criteria):
+        # produce a sequence of iterators over the implementation of the
+        # nodes, one per file, each having no more than SPLIT_CRITERIA lines
+        iternodes = iter(nodes)
+        done = [False]
+        def subiter():
+            used = nextra
+            for node in iternodes:
+                impl = '\n'.join(list(node.implementation())).split('\n')
+                if not impl:
+                    continue
+                cost = len(impl) + nbetween
+                yield '\n'.join(impl)
+                del impl
+                if used + cost > split_criteria:
+                    # split if criteria met, unless we would produce nothing.
+                    raise StopIteration
+                used += cost
+            done[0] = True
+        while not done[0]:
+            yield subiter()
 
-        # produce a sequence of nodes, grouped into files
-        # which have no more than SPLIT_CRITERIA lines
-        for basecname in sorted(nodes_by_base_cfile):
-            iternodes = iter(nodes_by_base_cfile[basecname])
-            done = [False]
-            def subiter():
-                used = nextra
-                for node in iternodes:
-                    impl = '\n'.join(list(node.implementation())).split('\n')
-                    if not impl:
-                        continue
-                    cost = len(impl) + nbetween
-                    yield node, impl
-                    del impl
-                    if used + cost > split_criteria:
-                        # split if criteria met, unless we would produce nothing.
-                        raise StopIteration
-                    used += cost
-                done[0] = True
-            while not done[0]:
-                yield self.uniquecname(basecname), subiter()
+    def splitnodesimpl(self, basecname, nodes, nextra, nbetween,
+                       split_criteria=SPLIT_CRITERIA):
+        groups = self.groupnodes(basecname, nodes)
+        if self.jobs > 1 and not self.one_source_file and hasattr(os, 'fork'):
+            groupiter = self._splitgroups_parallel(groups, nextra, nbetween,
+                                                   split_criteria)
+        else:
+            groupiter = [(basecname, self.splitgroupimpl(group, nextra,
+                                                         nbetween,
+                                                         split_criteria))
+                         for basecname, group in groups]
+        for basecname, chunks in groupiter:
+            for chunk in chunks:
+                yield self.uniquecname(basecname), chunk
+
+    def _splitgroups_parallel(self, groups, nextra, nbetween, split_criteria):
+        # The database is complete at this point, so the implementation of
+        # each group of nodes can be computed independently in a forked
+        # process.  The results are collected in the original order, so
+        # that the files and their names are the same as when generating
+        # sequentially.  The only side-effects of node.implementation()
+        # on the database are sent back too.
+        import multiprocessing
+        global _parallel_state
+        _parallel_state = (self, groups, nextra, nbetween, split_criteria)
+        pool = multiprocessing.Pool(self.jobs)
+        try:
+            for i, result in enumerate(pool.imap(_gen_group_impl,
+                                                 range(len(groups)),
+                                                 chunksize=1)):
+                chunks, late_initializations, instrument_ncounter = result
+                db = self.database
+                db.late_initializations.extend(late_initializations)
+                db.instrument_ncounter = max(db.instrument_ncounter,
+                                             instrument_ncounter)
+                yield groups[i][0], chunks
+        finally:
+            pool.terminate()
+            pool.join()
+            _parallel_state = None
 
     @contextlib.contextmanager
     def write_on_included_file(self, f, name):
@@ -656,8 +815,8 @@ class SourceGenerator:
                     print >> fc, '#include "src/g_include.h"'
                     print >> fc
                 print >> fc, MARKER
-                for node, impl in nodeiter:
-                    print >> fc, '\n'.join(impl)
+                for impl in nodeiter:
+                    print >> fc, impl
                     print >> fc, MARKER
                 print >> fc, '/***********************************************************/'
 
@@ -679,13 +838,27 @@ class SourceGenerator:
                     print >> fc, '#include "src/g_include.h"'
                     print >> fc
                 print >> fc, MARKER
-                for node, impl in nodeiter:
-                    print >> fc, '\n'.join(impl)
+                for impl in nodeiter:
+                    print >> fc, impl
                     print >> fc, MARKER
                 print >> fc, '/***********************************************************/'
         print >> f
 
 
+_parallel_state = None
+
+def _gen_group_impl(index):
+    # runs in a process forked by SourceGenerator._splitgroups_parallel()
+    sg, groups, nextra, nbetween, split_criteria = _parallel_state
+    db = sg.database
+    num_late_initializations = len(db.late_initializations)
+    chunks = [list(chunk)
+              for chunk in sg.splitgroupimpl(groups[index][1], nextra,
+                                             nbetween, split_criteria)]
+    return (chunks, db.late_initializations[num_late_initializations:],
+            db.instrument_ncounter)
+
+
 def gen_structdef(f, database):
     structdeflist = database.getstructdeflist()
     print >> f, '/***********************************************************/'
@@ -804,7 +977,7 @@ def add_extra_files(eci):
 
 
 def gen_source(database, modulename, targetdir,
-               eci, defines={}, split=False):
+               eci, defines={}, split=False, jobs=1):
     if isinstance(targetdir, str):
         targetdir = py.path.local(targetdir)
 
@@ -834,7 +1007,7 @@ def gen_source(database, modulename, targetdir,
     # 2) Implementation of functions and global structures and arrays
     #
     sg = SourceGenerator(database)
-    sg.set_strategy(targetdir, split)
+    sg.set_strategy(targetdir, split, jobs)
     database.prepare_inline_helpers()
     sg.gen_readable_parts_of_source(f)
     headers_to_precompile = sg.headers_to_precompile[:]
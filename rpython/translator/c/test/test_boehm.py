@@ -215,6 +215,13 @@ class TestUsingBoehm(AbstractGCTestClass):
         res = c_fn()
         assert res == 2
 
+    def test_gc_get_stats(self):
+        def fn():
+            from rpython.rlib import rgc
+            return rgc.get_stats(rgc.TOTAL_MEMORY)
+        c_fn = self.getcompiled(fn, [])
+        assert c_fn() == -1
+
     def test_weakref(self):
         class A:
             pass
@@ -187,3 +187,10 @@ class TestRefcount(object):
         fn = self.compile_func(f, [int])
         res = fn(1)
         assert res == 1
+
+    def test_gc_get_stats(self):
+        from rpython.rlib import rgc
+        def f():
+            return rgc.get_stats(rgc.TOTAL_MEMORY)
+        fn = self.compile_func(f, [])
+        assert fn() == -1
@@ -306,6 +306,87 @@ class TestStandalone(StandaloneTests):
         assert "  ll_strtod.c" in makefile
         assert "  ll_strtod.o" in makefile
 
+    def test_parallel_source_generation(self):
+        class A(object):
+            def __init__(self, x):
+                self.x = x
+        prebuilt = [A(1e300 * 1e300), A(-1e300 * 1e300), A(2.5)]
+        def entry_point(argv):
+            a = prebuilt[len(argv) - 1]
+            print a.x
+            return 0
+
+        def generate(jobs):
+            t = TranslationContext(self.config)
+            t.config.translation.source_jobs = jobs
+            t.buildannotator().build_types(entry_point, [s_list_of_strings])
+            t.buildrtyper().specialize()
+            cbuilder = CStandaloneBuilder(t, entry_point, t.config)
+            cbuilder.generate_source()
+            files = {}
+            for f in cbuilder.targetdir.listdir():
+                if f.ext in ('.c', '.h') and f != cbuilder.c_source_filename:
+                    files[f.basename] = f.read()
+            return cbuilder, files
+
+        # local variable names and gc hashes are not stable across two
+        # translations, so only compare which files are produced
+        cbuilder1, files1 = generate(1)
+        cbuilder3, files3 = generate(3)
+        assert len(files1) > 3
+        assert sorted(files1) == sorted(files3)
+        assert 'patched later with +inf' in ''.join(files3.values())
+        cbuilder3.compile()
+        assert cbuilder3.cmdexec('').strip() == 'inf'
+        assert cbuilder3.cmdexec('a').strip() == '-inf'
+        assert cbuilder3.cmdexec('a b').strip() == '2.500000'
+
+    def test_object_cache(self, monkeypatch):
+        from rpython.config import translationoption
+        cachedir = udir.join('test_object_cache').ensure(dir=1)
+        monkeypatch.setattr(translationoption, 'CACHE_DIR', str(cachedir))
+        def entry_point(argv):
+            print len(argv)
+            return 0
+        t = TranslationContext(self.config)
+        t.config.translation.object_cache = True
+        t.buildannotator().build_types(entry_point, [s_list_of_strings])
+        t.buildrtyper().specialize()
+        cbuilder = CStandaloneBuilder(t, entry_point, t.config)
+        cbuilder.generate_source()
+        cbuilder.compile()
+        cached = cachedir.join('object_cache').listdir()
+        cfiles = cbuilder.targetdir.listdir('*.c')
+        assert len(cached) == len(cfiles)
+        # the objects come back from the cache instead of being recompiled
+        objfile = cbuilder.c_source_filename.new(ext='.o')
+        data = objfile.read('rb')
+        for cfile in cfiles:
+            cfile.new(ext='.o').remove()
+        cbuilder.targetdir.join(cbuilder.executable_name.basename).remove()
+        cbuilder._compiled = False
+        cbuilder.compile()
+        assert objfile.read('rb') == data
+        assert cbuilder.cmdexec('a b').strip() == '3'
+        # each object is keyed only on its C file, the headers it includes
+        # and the Makefile lines used to compile it
+        targetdir = cbuilder.targetdir
+        before = dict(cbuilder.get_cached_objects([]))
+        targetdir.join('unused.h').write('#define UNUSED 1\n')
+        makefile = targetdir.join('Makefile')
+        makefile.write(makefile.read() + '\nLDFLAGSEXTRA2 = -lm\n')
+        assert dict(cbuilder.get_cached_objects([])) == before
+        cfile = cfiles[0]
+        cfile.write('#include "unused.h"\n' + cfile.read())
+        after = dict(cbuilder.get_cached_objects([]))
+        changed = [objfile for objfile in before
+                   if before[objfile] != after[objfile]]
+        assert changed == [cfile.new(ext='.o')]
+        makefile.write(makefile.read() + '\nCFLAGSEXTRA = -DFOO\n')
+        after2 = dict(cbuilder.get_cached_objects([]))
+        assert not [objfile for objfile in before
+                    if after[objfile] == after2[objfile]]
+
     def test_debug_print_start_stop(self):
         import sys
         from rpython.rtyper.lltypesystem import rffi